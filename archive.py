@@ -0,0 +1,327 @@
+# archive.py
+"""
+Armazenamento dos snapshots em arquivos grandes (segmentos) + índice.
+
+Em vez de um arquivo .jpg por veículo, os recortes já codificados são
+acrescentados (append-only) em segmentos `segment-000001.bin`, ... dentro de
+uma pasta. Um índice binário (`index.bin`) guarda, para cada recorte:
+
+    run (id da execução) | zone | track (id do validator) | frame | type | segment | offset | length | time
+
+O `run` é um UUID gerado a cada execução, então IDs repetidos do validator em
+execuções diferentes nunca colidem; com zonas, cada zona tem o seu validator
+(IDs a partir de 1), e (run, zone, track) identifica o veículo. O índice tem registros de tamanho fixo e
+é lido direto como array NumPy (consultas vetorizadas); os bytes de cada
+recorte são lidos por mmap do segmento (acesso aleatório sem copiar o arquivo).
+
+Rotação: quando o segmento ativo passa de `segment_bytes`, ele é fechado e um
+novo é aberto; com `max_segments`, os segmentos mais antigos são apagados.
+Compactação: compact() reescreve os segmentos descartando recortes antigos
+(ou órfãos) e juntando segmentos pequenos. Deve rodar sem escritor ativo.
+"""
+import glob
+import mmap
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import cv2
+
+INDEX_FILE = "index.bin"
+
+# Registro do índice (sem alinhamento: 89 bytes por recorte)
+INDEX_DTYPE = np.dtype([
+    ("run", "S16"),
+    ("zone", "S32"),          # nome da zona (UTF-8); vazio sem zonas
+    ("track", "<i8"),
+    ("frame", "<i8"),
+    ("type", "u1"),
+    ("segment", "<u4"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("time", "<f8"),
+])
+
+# Códigos dos tipos de veículo no índice
+TYPE_CODES = {"car": 1, "truck": 2}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+
+def _segmentPath(path, segment):
+    return os.path.join(path, f"segment-{segment:06d}.bin")
+
+
+def _segments(path):
+    """
+    Números dos segmentos existentes, em ordem.
+    """
+    found = []
+    for name in glob.glob(os.path.join(path, "segment-*.bin")):
+        found.append(int(os.path.basename(name)[8:14]))
+    return sorted(found)
+
+
+def _readIndex(path):
+    """
+    Lê o índice inteiro (ignora um registro final incompleto).
+    """
+    filename = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(filename):
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    raw = np.fromfile(filename, dtype=np.uint8)
+    usable = len(raw) - len(raw) % INDEX_DTYPE.itemsize
+    return raw[:usable].view(INDEX_DTYPE)
+
+
+def _writeIndex(path, index):
+    """
+    Substitui o índice de forma atômica.
+    """
+    tmp = os.path.join(path, INDEX_FILE + ".tmp")
+    index.tofile(tmp)
+    os.replace(tmp, os.path.join(path, INDEX_FILE))
+
+# =====================================================================
+# ESCRITA
+# =====================================================================
+
+class SnapshotStore:
+    """
+    Escritor append-only de recortes codificados. Seguro entre threads.
+    """
+
+    def __init__(self, path, segment_bytes=256 * 1024 * 1024, max_segments=None, run_id=None):
+        """
+        Parâmetros:
+            path         : pasta do arquivo de snapshots (criada se preciso)
+            segment_bytes: tamanho a partir do qual o segmento é rotacionado
+            max_segments : mantém no máximo N segmentos (None = todos)
+            run_id       : id da execução (16 bytes); None = UUID novo
+        """
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.run_id = run_id or uuid.uuid4().bytes
+
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+
+        # Descarta um registro incompleto no fim do índice (queda anterior)
+        index_file = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index_file):
+            size = os.path.getsize(index_file)
+            if size % INDEX_DTYPE.itemsize:
+                os.truncate(index_file, size - size % INDEX_DTYPE.itemsize)
+
+        # Sempre começa um segmento novo (segmentos antigos ficam selados)
+        existing = _segments(path)
+        self.segment = (existing[-1] + 1) if existing else 1
+        self._data = open(_segmentPath(path, self.segment), "ab")
+        self._index = open(index_file, "ab")
+        self.closed = False
+
+    def append(self, data, track, frame, vtype, ts=None, zone=None):
+        """
+        Acrescenta um recorte já codificado (bytes). Retorna o registro.
+        `zone` é o nome da zona do validator que contou o veículo (até 32
+        bytes em UTF-8); None sem zonas.
+        """
+        zone_name = (zone or "").encode("utf-8")
+        if len(zone_name) > INDEX_DTYPE["zone"].itemsize:
+            raise ValueError(f"Nome de zona com mais de {INDEX_DTYPE['zone'].itemsize} bytes: {zone}")
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("SnapshotStore já foi fechado")
+
+            offset = self._data.tell()
+            self._data.write(data)
+            self._data.flush()
+
+            record["run"] = self.run_id
+            record["zone"] = zone_name
+            record["track"] = track
+            record["frame"] = frame
+            record["type"] = TYPE_CODES.get(str(vtype).lower(), 0)
+            record["segment"] = self.segment
+            record["offset"] = offset
+            record["length"] = len(data)
+            record["time"] = time.time() if ts is None else ts
+
+            # Dados primeiro, índice depois: o índice nunca aponta para
+            # bytes ainda não gravados
+            self._index.write(record.tobytes())
+            self._index.flush()
+
+            if self._data.tell() >= self.segment_bytes:
+                self._rotate()
+        return record[0]
+
+    def _rotate(self):
+        """
+        Fecha o segmento ativo, abre o próximo e aplica max_segments.
+        """
+        self._data.close()
+        self.segment += 1
+        self._data = open(_segmentPath(self.path, self.segment), "ab")
+
+        if self.max_segments is None:
+            return
+        segments = _segments(self.path)
+        expired = segments[:max(0, len(segments) - self.max_segments)]
+        if not expired:
+            return
+
+        self._index.close()
+        index = _readIndex(self.path)
+        _writeIndex(self.path, index[~np.isin(index["segment"], expired)])
+        self._index = open(os.path.join(self.path, INDEX_FILE), "ab")
+        for segment in expired:
+            os.remove(_segmentPath(self.path, segment))
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._data.close()
+            self._index.close()
+
+# =====================================================================
+# LEITURA
+# =====================================================================
+
+class SnapshotArchive:
+    """
+    Leitor com consultas vetorizadas no índice e acesso por mmap.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._maps = {}
+        self.refresh()
+
+    def refresh(self):
+        """
+        Relê o índice (para ver recortes gravados depois da abertura).
+        """
+        self.index = _readIndex(self.path)
+        for m, f in self._maps.values():
+            m.close()
+            f.close()
+        self._maps = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def find(self, run=None, track=None, vtype=None, frames=None, since=None, zone=None):
+        """
+        Posições no índice que satisfazem todos os filtros informados.
+
+        Parâmetros:
+            run   : id da execução (bytes de 16 ou uuid.UUID)
+            track : id do objeto no validator
+            vtype : "car" ou "truck"
+            frames: (início, fim) — intervalo [início, fim) de frames
+            since : timestamp mínimo
+            zone  : nome da zona ("" = recortes sem zona)
+        """
+        idx = self.index
+        mask = np.ones(len(idx), dtype=bool)
+        if run is not None:
+            mask &= idx["run"] == (run.bytes if isinstance(run, uuid.UUID) else run)
+        if track is not None:
+            mask &= idx["track"] == track
+        if vtype is not None:
+            mask &= idx["type"] == TYPE_CODES[vtype.lower()]
+        if frames is not None:
+            mask &= (idx["frame"] >= frames[0]) & (idx["frame"] < frames[1])
+        if since is not None:
+            mask &= idx["time"] >= since
+        if zone is not None:
+            mask &= idx["zone"] == zone.encode("utf-8")
+        return np.flatnonzero(mask)
+
+    def runs(self):
+        """
+        Ids das execuções presentes no arquivo.
+        """
+        # O NumPy remove zeros no fim de campos "S": recompõe os 16 bytes
+        return [uuid.UUID(bytes=r.ljust(16, b"\0")) for r in np.unique(self.index["run"])]
+
+    def _map(self, segment):
+        if segment not in self._maps:
+            f = open(_segmentPath(self.path, segment), "rb")
+            self._maps[segment] = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), f)
+        return self._maps[segment][0]
+
+    def read(self, i):
+        """
+        Bytes codificados do recorte na posição i do índice.
+        """
+        rec = self.index[i]
+        segment = int(rec["segment"])
+        start = int(rec["offset"])
+        end = start + int(rec["length"])
+
+        m = self._map(segment)
+        if end > len(m):
+            # Segmento cresceu depois do mmap (escritor ativo): remapeia
+            old, f = self._maps.pop(segment)
+            old.close()
+            f.close()
+            m = self._map(segment)
+        return m[start:end]
+
+    def image(self, i):
+        """
+        Recorte decodificado (imagem BGR).
+        """
+        return cv2.imdecode(np.frombuffer(self.read(i), np.uint8), cv2.IMREAD_COLOR)
+
+    def close(self):
+        for m, f in self._maps.values():
+            m.close()
+            f.close()
+        self._maps = {}
+
+# =====================================================================
+# COMPACTAÇÃO
+# =====================================================================
+
+def compact(path, before=None, segment_bytes=256 * 1024 * 1024):
+    """
+    Reescreve os segmentos mantendo só os recortes referenciados no índice
+    (e com time >= before, se informado), em segmentos novos e cheios.
+    Não deve ser chamada com um SnapshotStore aberto na mesma pasta.
+    Retorna (recortes mantidos, recortes descartados).
+    """
+    index = _readIndex(path)
+    old_segments = _segments(path)
+    keep = np.ones(len(index), dtype=bool) if before is None else index["time"] >= before
+    kept = index[keep].copy()
+
+    reader = SnapshotArchive(path)
+    reader.index = index
+
+    segment = (old_segments[-1] + 1) if old_segments else 1
+    out = open(_segmentPath(path, segment), "wb")
+    for pos, i in enumerate(np.flatnonzero(keep)):
+        data = reader.read(i)
+        if out.tell() + len(data) > segment_bytes and out.tell() > 0:
+            out.close()
+            segment += 1
+            out = open(_segmentPath(path, segment), "wb")
+        kept["segment"][pos] = segment
+        kept["offset"][pos] = out.tell()
+        out.write(data)
+    out.close()
+    reader.close()
+
+    _writeIndex(path, kept)
+    for old in old_segments:
+        os.remove(_segmentPath(path, old))
+
+    return len(kept), len(index) - len(kept)
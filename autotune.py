@@ -0,0 +1,402 @@
+# autotune.py
+"""
+Ajuste automático do background subtractor e dos filtros de uma câmera.
+
+Roda um trecho curto do vídeo da câmera com cada configuração candidata
+(tipo de BGS + parâmetros, kernels, iterações da morfologia, blur mediano)
+e mede, em duas fases:
+    1. em paralelo num pool de processos (um candidato por processo, como
+       o runner.py), a precisão e o flicker de todos;
+    2. um de cada vez (nenhum outro processo do autotune disputando CPU),
+       --repeats vezes, o fps da referência e dos candidatos que atingiram
+       a meta: 1 / mediana do tempo por frame de BGS + limpeza + extração
+       dos blobs (+ validator no modo contador), sem contar a leitura do
+       vídeo; fica a melhor das repetições.
+Medidas:
+    - concordância com a referência: F1 das caixas de cada frame contra as
+      da configuração de referência (IoU >= 0.5) e, no modo contador, a
+      concordância das contagens de carros/caminhões; a precisão do
+      candidato é a menor das duas;
+    - instabilidade (flicker): fração dos pixels da máscara que mudam de
+      um frame para o seguinte (ruído piscando aumenta o valor).
+
+A referência é a configuração atual da câmera (padrões do modo + --config
++ opções da linha de comando), a escolha feita à mão até agora. Entre os
+candidatos com precisão >= --target (e flicker <= --max-flicker vezes o
+da referência, se informado), o mais rápido vira o perfil da câmera; se
+nenhum atingir a meta, o perfil fica com a própria referência. A precisão
+é só a concordância com a referência, não com a contagem real: se a
+referência detecta mal, o perfil herda os mesmos erros.
+
+Os primeiros --warmup frames do trecho (aprendizado do fundo; o GMG
+precisa de 120) ficam fora da conta de precisão (caixas e contagens) e
+de flicker.
+
+Cada processo usa um núcleo (cv2.setNumThreads(1)), nas duas fases.
+
+O perfil é um JSON com bgs, bgs_params, kernels, iterations e median_blur
+(engine.PROFILE_KEYS) mais as medidas; o headless.py o carrega com
+--camera-profile (ou "camera_profile" no --config) e os scripts com
+CAMERA_PROFILE.
+
+Uso:
+    python autotune.py contador --video cam01.mp4 --roi 100,200,640,300 --output profiles/cam01.json
+    python autotune.py movimento --config cam02.json --bgs MOG2 KNN --kernels 3x3 5x5 --target 0.95
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import cv2
+
+import engine                    # usa engine.saveProfile
+import blobs                     # usa blobs.centroids
+import headless                  # usa headless.FrameProcessor / headless.buildConfig
+
+# Kernels (closing, opening, dilation) candidatos, por nome
+KERNEL_PRESETS = {
+    "3x3": [[3, 3], [3, 3], [3, 3]],
+    "5x5": [[5, 5], [5, 5], [5, 5]],
+    "sem-closing": [None, [3, 3], [3, 3]],
+    "distanciamento": [None, [3, 5], [2, 2]],
+}
+
+# BGS candidatos (TIPO ou TIPO:param=valor,...); os do contrib só se instalado
+DEFAULT_BGS = ["MOG2", "MOG2:detectShadows=false,varThreshold=100", "KNN", "MOG", "GMG", "CNT"]
+
+# IoU mínimo para uma caixa do candidato valer como a mesma da referência
+MIN_IOU = 0.5
+
+
+def parseBGS(text):
+    """
+    "MOG2:varThreshold=100,detectShadows=false" -> ("MOG2", {...}).
+    Valores em JSON (números, true/false); o resto fica como texto.
+    """
+    name, _, rest = text.partition(":")
+    if name not in engine.BGS_TYPES:
+        raise argparse.ArgumentTypeError(f"BGS inválido: {name}")
+    params = {}
+    for item in filter(None, rest.split(",")):
+        key, _, value = item.partition("=")
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return name, params
+
+
+def available(bgs):
+    """
+    False para os BGS do contrib sem o opencv-contrib instalado.
+    """
+    return bgs not in engine.CONTRIB_BGS or getattr(cv2, "bgsegm", None) is not None
+
+
+def candidates(cfg, bgs_list, kernel_names, iterations, median_blurs):
+    """
+    Configurações candidatas (produto das opções) a partir de `cfg`, sem
+    repetir a própria referência. bgs_params fica {} (não None) quando o
+    candidato não tem parâmetros: com None, o headless.buildConfig trocaria
+    pelos parâmetros padrão do modo ao carregar o perfil.
+    """
+    found = []
+    for (bgs, params), kernels, it, blur in itertools.product(bgs_list, kernel_names, iterations,
+                                                              median_blurs):
+        if not available(bgs):
+            continue
+        candidate = dict(cfg, bgs=bgs, bgs_params=params, kernels=KERNEL_PRESETS[kernels],
+                         iterations=it, median_blur=blur)
+        if all((candidate[key] or None) == (cfg[key] or None) if key == "bgs_params"
+               else candidate[key] == cfg[key] for key in engine.PROFILE_KEYS):
+            continue
+        found.append(candidate)
+    return found
+
+
+def describe(cfg):
+    """
+    Rótulo curto de uma configuração (tabela do resultado).
+    """
+    params = ",".join(f"{k}={v}" for k, v in (cfg["bgs_params"] or {}).items())
+    kernels = next((name for name, k in KERNEL_PRESETS.items() if k == cfg["kernels"]),
+                   json.dumps(cfg["kernels"]))
+    return (f"{cfg['bgs']}{':' + params if params else ''} {kernels} "
+            f"it={cfg['iterations']} blur={cfg['median_blur']}")
+
+
+def _evaluate(mode, cfg, start, frames, warmup):
+    """
+    Processa o trecho com uma configuração (em processo separado).
+    Retorna fps, caixas de cada frame depois do warmup, contagens (só os
+    veículos contados depois do warmup) e flicker.
+    """
+    # Um núcleo por processo: o paralelismo vem do pool
+    cv2.setNumThreads(1)
+
+    cap = cv2.VideoCapture(cfg["video"])
+    if not cap.isOpened():
+        raise IOError(f"Erro ao abrir o vídeo de entrada: {cfg['video']}")
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    processor = headless.FrameProcessor(mode, cfg, frame_size)
+
+    times = []
+    boxes_per_frame = []
+    flicker = []
+    previous = None
+    frame = None
+    validator = processor.validator
+    baseline = (0, 0)
+    for index in range(frames):
+        ok, frame = cap.read(frame)
+        if not ok:
+            break
+        if index == warmup and validator is not None:
+            # Veículos contados no warmup ficam fora, como as caixas
+            baseline = validator.get_counts()
+        t0 = time.perf_counter()
+        fgmask = processor.mask(frame)
+        boxes, areas = processor.blobs(fgmask)
+        if processor.validator is not None:
+            processor.validator.register_frame(blobs.centroids(boxes), areas.astype(np.int64))
+        times.append(time.perf_counter() - t0)
+
+        moving = fgmask > 0
+        if index >= warmup:
+            boxes_per_frame.append(boxes.copy())
+        if index >= warmup and previous is not None:
+            union = np.count_nonzero(moving | previous)
+            if union:
+                flicker.append(np.count_nonzero(moving ^ previous) / union)
+        previous = moving
+    processor.close()
+    cap.release()
+
+    counts = None
+    if validator is not None:
+        counts = tuple(total - before for total, before in zip(validator.get_counts(), baseline))
+    median = float(np.median(times)) if times else 0.0
+    return {
+        "fps": 1.0 / median if median > 0 else 0.0,
+        "boxes": boxes_per_frame,
+        "counts": counts,
+        "flicker": float(np.mean(flicker)) if flicker else 0.0,
+    }
+
+
+def boxIoU(a, b):
+    """
+    Matriz de IoU entre as caixas (x, y, w, h) de `a` e de `b`.
+    """
+    ax0, ay0 = a[:, 0, None], a[:, 1, None]
+    ax1, ay1 = ax0 + a[:, 2, None], ay0 + a[:, 3, None]
+    bx0, by0, bx1, by1 = b[:, 0], b[:, 1], b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+    inter = np.clip(np.minimum(ax1, bx1) - np.maximum(ax0, bx0), 0, None) * \
+        np.clip(np.minimum(ay1, by1) - np.maximum(ay0, by0), 0, None)
+    union = (a[:, 2] * a[:, 3])[:, None] + b[:, 2] * b[:, 3] - inter
+    return inter / np.maximum(union, 1)
+
+
+def boxAgreement(found, reference):
+    """
+    F1 das caixas de todos os frames contra as da referência (associação
+    gulosa por IoU). 1.0 se nenhum dos dois tem caixas.
+    """
+    matched = total_found = total_ref = 0
+    for f, r in zip(found, reference):
+        total_found += len(f)
+        total_ref += len(r)
+        if not len(f) or not len(r):
+            continue
+        iou = boxIoU(f, r)
+        used_f, used_r = set(), set()
+        for k in np.argsort(-iou, axis=None, kind="stable"):
+            i, j = divmod(int(k), iou.shape[1])
+            if iou[i, j] < MIN_IOU:
+                break
+            if i not in used_f and j not in used_r:
+                used_f.add(i)
+                used_r.add(j)
+        matched += len(used_f)
+    if total_found + total_ref == 0:
+        return 1.0
+    return 2 * matched / (total_found + total_ref)
+
+
+def countAgreement(counts, reference):
+    """
+    1 - erro absoluto das contagens / total da referência (modo contador).
+    """
+    total = sum(reference)
+    if total == 0:
+        return 1.0 if sum(counts) == 0 else 0.0
+    return max(0.0, 1.0 - sum(abs(c - r) for c, r in zip(counts, reference)) / total)
+
+
+def score(result, reference):
+    """
+    Acrescenta ao resultado a precisão contra a referência.
+    """
+    result["box_f1"] = boxAgreement(result["boxes"], reference["boxes"])
+    result["accuracy"] = result["box_f1"]
+    if reference["counts"] is not None:
+        result["count_agreement"] = countAgreement(result["counts"], reference["counts"])
+        result["accuracy"] = min(result["accuracy"], result["count_agreement"])
+    return result
+
+
+def tune(mode, cfg, candidate_list, start=0, frames=400, warmup=120, target=0.9,
+         max_flicker=None, workers=None, repeats=3, log=sys.stderr):
+    """
+    Avalia a referência (`cfg`) e os candidatos em paralelo, mede o fps dos
+    que atingem a meta um de cada vez e escolhe o mais rápido. Retorna
+    (configuração escolhida, referência, resultados de todos, em ordem de
+    fps; fps None = não medido, abaixo da meta).
+    """
+    # 1. Precisão e flicker em paralelo; o fps desta fase tem disputa de CPU
+    # entre os processos e é descartado
+    configs = [cfg] + candidate_list
+    workers = min(workers or os.cpu_count() or 1, len(configs))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_evaluate, mode, c, start, frames, warmup) for c in configs]
+        results = []
+        for c, future in zip(configs, futures):
+            result = future.result()
+            result.update(config=c, fps=None)
+            results.append(result)
+            if log is not None:
+                print(f"[OK] {describe(c)}", file=log)
+
+    reference = results[0]
+    reference.update(box_f1=1.0, accuracy=1.0)
+    if reference["counts"] is not None:
+        reference["count_agreement"] = 1.0
+    for result in results[1:]:
+        score(result, reference)
+
+    flicker_limit = None if max_flicker is None else reference["flicker"] * max_flicker
+    accepted = [r for r in results
+                if r["accuracy"] >= target and (flicker_limit is None or r["flicker"] <= flicker_limit)]
+
+    # 2. fps da referência e dos aceitos, um processo de cada vez; a melhor
+    # das repetições (as outras foram atrapalhadas por algo na máquina)
+    timed = [reference] + [r for r in accepted if r is not reference]
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        for r in timed:
+            runs = [pool.submit(_evaluate, mode, r["config"], start, frames, warmup).result()["fps"]
+                    for _ in range(max(1, repeats))]
+            r["fps"] = max(runs)
+            if log is not None:
+                print(f"[FPS] {describe(r['config'])}: {r['fps']:.1f} "
+                      f"(melhor de {len(runs)}: {', '.join(f'{x:.1f}' for x in runs)})", file=log)
+
+    best = max(accepted, key=lambda r: r["fps"]) if accepted else reference
+    results.sort(key=lambda r: -(r["fps"] or 0.0))
+    return best, reference, results
+
+
+def buildProfile(camera, mode, best, reference, results, target, frames):
+    """
+    Perfil de câmera (engine.PROFILE_KEYS + medidas) para engine.saveProfile.
+    """
+    cfg = best["config"]
+
+    def measures(r):
+        m = {"fps": round(r["fps"], 1), "accuracy": round(r["accuracy"], 4),
+             "box_f1": round(r["box_f1"], 4), "flicker": round(r["flicker"], 4)}
+        if r["counts"] is not None:
+            m["counts"] = list(r["counts"])
+        return m
+
+    profile = {key: cfg[key] for key in engine.PROFILE_KEYS}
+    # {} explícito: None seria trocado pelos parâmetros padrão do modo
+    profile["bgs_params"] = cfg["bgs_params"] or {}
+    profile["camera"] = camera
+    profile["autotune"] = {
+        "mode": mode,
+        "video": cfg["video"],
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "frames": frames,
+        "target": target,
+        "candidates": len(results),
+        "chosen": measures(best),
+        "reference": dict(measures(reference), config=describe(reference["config"])),
+    }
+    return profile
+
+
+def buildParser():
+    parser = argparse.ArgumentParser(description="Escolhe o BGS e os filtros mais rápidos para uma câmera.")
+    parser.add_argument("mode", choices=sorted(headless.DEFAULTS))
+    parser.add_argument("--config", help="configuração da câmera (JSON do headless.py): a referência")
+    parser.add_argument("--video", help="vídeo da câmera")
+    parser.add_argument("--roi", type=headless.parseROI, help="x,y,largura,altura")
+    parser.add_argument("--scale", type=float, help="fator de redimensionamento do frame")
+    parser.add_argument("--camera", help="nome da câmera no perfil (padrão: nome do vídeo)")
+    parser.add_argument("--output", help="arquivo do perfil (padrão: profiles/<câmera>.json)")
+    parser.add_argument("--bgs", type=parseBGS, nargs="+", default=[parseBGS(b) for b in DEFAULT_BGS],
+                        help="BGS candidatos: TIPO ou TIPO:param=valor,...")
+    parser.add_argument("--kernels", nargs="+", default=list(KERNEL_PRESETS), choices=list(KERNEL_PRESETS))
+    parser.add_argument("--iterations", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--median-blur", type=int, nargs="+", default=[0, 5])
+    parser.add_argument("--start", type=int, default=0, help="frame inicial do trecho")
+    parser.add_argument("--frames", type=int, default=400, help="frames do trecho")
+    parser.add_argument("--warmup", type=int, default=120, help="frames fora da conta de precisão")
+    parser.add_argument("--target", type=float, default=0.9, help="precisão mínima (0 a 1)")
+    parser.add_argument("--max-flicker", type=float,
+                        help="flicker máximo em relação ao da referência (ex.: 1.5)")
+    parser.add_argument("--workers", type=int,
+                        help="processos simultâneos na fase de precisão (padrão: núcleos)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="medições de fps de cada candidato aceito (fica a melhor)")
+    return parser
+
+
+def main(argv=None):
+    args = buildParser().parse_args(argv)
+    if args.frames <= args.warmup:
+        raise SystemExit("--frames deve ser maior que --warmup")
+
+    from_file = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            from_file = json.load(f)
+    cfg = headless.buildConfig(args.mode, from_file, {"video": args.video, "roi": args.roi,
+                                                      "scale": args.scale})
+    if cfg["zones"]:
+        raise SystemExit("autotune usa a ROI da câmera (sem zones)")
+    cfg.update(detections=False, gate=False, pipeline=False, checkpoint=None, count_store=None)
+
+    camera = args.camera or os.path.splitext(os.path.basename(cfg["video"]))[0]
+    output = args.output or os.path.join("profiles", f"{camera}.json")
+
+    candidate_list = candidates(cfg, args.bgs, args.kernels, args.iterations, args.median_blur)
+    print(f"{len(candidate_list)} candidatos + referência, {args.frames} frames "
+          f"(warmup {args.warmup})", file=sys.stderr)
+    best, reference, results = tune(args.mode, cfg, candidate_list, args.start, args.frames,
+                                    args.warmup, args.target, args.max_flicker, args.workers,
+                                    args.repeats)
+
+    print(f"{'fps':>8} {'precisão':>9} {'flicker':>8}  configuração")
+    for r in results:
+        mark = " <- escolhida" if r is best else (" (referência)" if r is reference else "")
+        fps = f"{r['fps']:>8.1f}" if r["fps"] is not None else f"{'-':>8}"
+        print(f"{fps} {r['accuracy']:>9.3f} {r['flicker']:>8.3f}  {describe(r['config'])}{mark}")
+    print(f"fps '-': abaixo da meta, não medido. Precisão = concordância com a referência "
+          f"({describe(reference['config'])}), não com a contagem real: se a referência "
+          f"detecta mal, o perfil herda os mesmos erros.")
+
+    engine.saveProfile(output, buildProfile(camera, args.mode, best, reference, results,
+                                            args.target, args.frames))
+    print(f"Perfil gravado em {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/coarse.py
+"""
+Benchmark da detecção em duas resoluções (coarse.CoarseToFine).
+
+Processa a mesma cena sintética (1080p com veículos pequenos, por padrão)
+com headless.FrameProcessor (BGS + filtros + extração dos blobs) de três
+jeitos:
+    - nativa:   resolução cheia
+    - reduzida: frame inteiro reduzido por --scale (limiares de área também)
+    - coarse:   BGS reduzido por --coarse + blobs refinados na resolução cheia
+e mede o FPS e, contra as caixas reais da cena (depois de --warmup frames
+de aprendizado do fundo), o recall e a precisão das caixas (IoU >= 0.5) e
+o IoU médio das caixas encontradas, em px nativos.
+
+Uso:
+    python benchmarks/coarse.py
+    python benchmarks/coarse.py --resolution 4k --vehicle-scale 0.25 --coarse 0.2 --bgs KNN
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import headless                  # usa headless.FrameProcessor / headless.buildConfig
+from synthetic import RESOLUTIONS, SyntheticScene
+
+# IoU mínimo para uma caixa detectada valer como acerto
+MIN_IOU = 0.5
+
+
+def iou(a, b):
+    """
+    Interseção sobre união de duas caixas (x, y, w, h).
+    """
+    w = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    h = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / (a[2] * a[3] + b[2] * b[3] - inter)
+
+
+def matchBoxes(found, truth):
+    """
+    Associação gulosa (maior IoU primeiro). Retorna os IoUs dos pares >= MIN_IOU.
+    """
+    pairs = sorted(((iou(f, t), i, j) for i, f in enumerate(found) for j, t in enumerate(truth)),
+                   reverse=True)
+    used_f, used_t, matched = set(), set(), []
+    for value, i, j in pairs:
+        if value < MIN_IOU:
+            break
+        if i not in used_f and j not in used_t:
+            used_f.add(i)
+            used_t.add(j)
+            matched.append(value)
+    return matched
+
+
+def runMode(scene, cfg, size, warmup):
+    """
+    Processa a cena e devolve o resultado (dicionário).
+    """
+    processor = headless.FrameProcessor("contador", cfg, size)
+    scale = cfg["scale"]
+    busy = 0.0
+    index = 0
+    found_total = truth_total = 0
+    matched = []
+    while True:
+        ok, frame = scene.read()
+        if not ok:
+            break
+        t0 = time.perf_counter()
+        boxes = processor.blobs(processor.mask(frame))[0]
+        busy += time.perf_counter() - t0
+        if index >= warmup:
+            found = (boxes / scale).round().astype(int).tolist() if scale != 1.0 else boxes.tolist()
+            truth = scene.boxes(index)
+            matched += matchBoxes(found, truth)
+            found_total += len(found)
+            truth_total += len(truth)
+        index += 1
+    stats = processor.coarse.stats() if processor.coarse is not None else None
+    processor.close()
+    return {
+        "fps": index / busy,
+        "recall": len(matched) / max(1, truth_total),
+        "precision": len(matched) / max(1, found_total),
+        "iou": float(np.mean(matched)) if matched else 0.0,
+        "coarse": stats,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara a detecção nativa, reduzida e coarse-to-fine.")
+    parser.add_argument("--resolution", default="1080p", choices=list(RESOLUTIONS))
+    parser.add_argument("--vehicle-scale", type=float, default=0.35,
+                        help="tamanho dos veículos em relação ao padrão da cena")
+    parser.add_argument("--scale", type=float, default=0.5, help="redução do modo 'reduzida'")
+    parser.add_argument("--coarse", type=float, default=0.25, help="redução da passada grosseira")
+    parser.add_argument("--bgs", default="MOG2", choices=headless.BGS_TYPES)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30, help="frames fora da conta (aprendizado do fundo)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    width, height = RESOLUTIONS[args.resolution]
+
+    def scene():
+        return SyntheticScene(width, height, args.frames, seed=args.seed, vehicle_scale=args.vehicle_scale)
+
+    areas = scene().counter_config()
+    base = headless.buildConfig("contador", areas, {"bgs": args.bgs, "scale": 1.0, "detections": False})
+    shrink = args.scale ** 2
+    modes = [
+        ("nativa", base),
+        (f"reduzida {args.scale:g}", dict(base, scale=args.scale,
+                                          **{k: int(v * shrink) for k, v in areas.items()})),
+        (f"coarse {args.coarse:g}", dict(base, coarse=args.coarse)),
+    ]
+
+    print(f"{args.resolution} ({width}x{height}), carro {scene().car_size}, {args.frames} frames, {args.bgs}")
+    print(f"{'modo':>14} {'fps':>8} {'recall':>7} {'precisão':>9} {'IoU':>6}  coarse")
+    for name, cfg in modes:
+        r = runMode(scene(), cfg, (width, height), args.warmup)
+        print(f"{name:>14} {r['fps']:>8.1f} {r['recall']:>7.3f} {r['precision']:>9.3f} "
+              f"{r['iou']:>6.3f}  {r['coarse'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
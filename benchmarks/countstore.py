@@ -0,0 +1,103 @@
+# benchmarks/countstore.py
+"""
+Benchmark do count store (countstore.CountStore).
+
+Simula --days dias de contagens (eventos com instantes crescentes, zonas,
+tipos e um contador com dois sentidos), mede a vazão de add() e o tempo
+das consultas (janela móvel de 1 h, total de 30 dias, série por hora)
+feitas na pasta gravada, e compara com a varredura vetorizada (NumPy) de
+todos os eventos guardados em memória, que é o que o store evita manter.
+Confere que os resultados batem.
+
+Uso:
+    python benchmarks/countstore.py
+    python benchmarks/countstore.py --days 180 --events-per-minute 40 --interval 300
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import countstore                # usa countstore.CountStore
+
+ZONES = ["norte", "sul"]
+TYPES = ["car", "truck"]
+DIRECTIONS = ["desce", "sobe"]
+
+
+def timed(fn, repeat=20):
+    """
+    (resultado, ms por chamada).
+    """
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - t0) * 1000 / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vazão e consultas do count store.")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--events-per-minute", type=float, default=20)
+    parser.add_argument("--interval", type=float, default=60, help="segundos por bucket")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    seconds = args.days * 86400
+    n = int(args.days * 1440 * args.events_per_minute)
+    stamps = np.sort(rng.uniform(0, seconds, n)) + 1_700_000_000
+    zone = rng.integers(0, len(ZONES), n)
+    vtype = rng.integers(0, len(TYPES), n)
+    direction = rng.integers(0, len(DIRECTIONS), n)
+
+    path = tempfile.mkdtemp(prefix="countstore-")
+    try:
+        store = countstore.CountStore(path, args.interval)
+        t0 = time.perf_counter()
+        for ts, z, t, d in zip(stamps.tolist(), zone.tolist(), vtype.tolist(), direction.tolist()):
+            store.add(ts, ZONES[z], TYPES[t])
+            store.add(ts, ZONES[z], TYPES[t], "faixa1", DIRECTIONS[d])
+        elapsed = time.perf_counter() - t0
+        store.close()
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        print(f"{args.days} dias, {n} veículos ({2 * n} add), {store.stats()['buckets']} buckets, "
+              f"{size / 1e6:.2f} MB em disco")
+        print(f"add: {2 * n / elapsed:,.0f} eventos/s")
+
+        reader = countstore.CountStore(path, readonly=True)
+        # Limites alinhados aos buckets: os totais batem exatamente com a varredura
+        end = reader.origin + reader.interval * (reader.last + 1)
+        hour = (end - 3600, end)
+        month = (end - 30 * 86400, end)
+        is_sul_car = (zone == ZONES.index("sul")) & (vtype == TYPES.index("car"))
+        hours = int(-(-(end - reader.origin) // 3600))
+
+        queries = [
+            ("janela 1 h", lambda: reader.rolling(3600),
+             lambda: int(np.count_nonzero((stamps >= hour[0]) & (stamps < hour[1])))),
+            ("30 dias sul/car", lambda: reader.total(*month, zone="sul", vtype="car"),
+             lambda: int(np.count_nonzero(is_sul_car & (stamps >= month[0]) & (stamps < month[1])))),
+            ("série por hora", lambda: reader.series(step=3600)[1],
+             lambda: np.bincount(((stamps - reader.origin) // 3600).astype(np.int64), minlength=hours)),
+            ("cruzamentos sobe", lambda: reader.total(counter=countstore.ANY, direction="sobe"),
+             lambda: int(np.count_nonzero(direction == DIRECTIONS.index("sobe")))),
+        ]
+        print(f"{'consulta':>18} {'store':>10} {'varredura':>10}")
+        for name, query, scan in queries:
+            value, ms = timed(query)
+            expected, scan_ms = timed(scan, 3)
+            if not np.array_equal(value, expected):
+                raise AssertionError(f"{name}: resultado diferente da varredura")
+            print(f"{name:>18} {ms:>7.3f} ms {scan_ms:>7.3f} ms")
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/extraction.py
+"""
+Benchmark dos backends de extração de blobs (blobs.findBlobs).
+
+Gera máscaras com N elipses aleatórias (de poucos blobs a uma cena lotada)
+e mede o tempo por frame de "contours" e "components". findContours só
+percorre as bordas e tem custo por contorno em Python; components rotula
+todos os pixels (custo fixo por resolução) mas não faz nada em Python por
+blob. O ponto de virada depende da resolução e da densidade da cena.
+
+Uso:
+    python benchmarks/extraction.py
+    python benchmarks/extraction.py --resolution 1080p --blobs 10 100 1000 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import blobs                     # usa blobs.findBlobs
+import buffers                   # usa buffers.FrameBuffers
+from synthetic import RESOLUTIONS
+
+
+def crowdMask(width, height, count, seed=0):
+    """
+    Máscara binária com `count` elipses pequenas em posições aleatórias.
+    """
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((height, width), np.uint8)
+    for _ in range(count):
+        cx, cy = int(rng.integers(0, width)), int(rng.integers(0, height))
+        ax, ay = (int(v) for v in rng.integers(2, 10, 2))
+        cv2.ellipse(mask, (cx, cy), (ax, ay), 0, 0, 360, 255, -1)
+    return mask
+
+
+def timeBackend(mask, backend, min_area, repeat):
+    bufs = buffers.FrameBuffers()
+    found = blobs.findBlobs(mask, backend, min_area, bufs=bufs)   # aquecimento
+    start = time.perf_counter()
+    for _ in range(repeat):
+        blobs.findBlobs(mask, backend, min_area, bufs=bufs)
+    return 1000 * (time.perf_counter() - start) / repeat, len(found[0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara os backends de extração de blobs.")
+    parser.add_argument("--resolution", default="720p", choices=list(RESOLUTIONS))
+    parser.add_argument("--blobs", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--min-area", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    width, height = RESOLUTIONS[args.resolution]
+    print(f"{'elipses':>8} " + " ".join(f"{b:>22}" for b in blobs.EXTRACTION_BACKENDS))
+    for count in args.blobs:
+        mask = crowdMask(width, height, count)
+        cols = []
+        for backend in blobs.EXTRACTION_BACKENDS:
+            ms, found = timeBackend(mask, backend, args.min_area, args.repeat)
+            cols.append(f"{ms:>9.3f} ms ({found:>5} blobs)")
+        print(f"{count:>8} " + " ".join(f"{c:>22}" for c in cols))
+
+
+if __name__ == "__main__":
+    main()
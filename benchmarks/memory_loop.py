@@ -0,0 +1,104 @@
+# benchmarks/memory_loop.py
+"""
+Benchmark de memória do loop de processamento.
+
+Processa uma cena sintética com headless.FrameProcessor duas vezes — com e
+sem buffers pré-alocados (reuse_buffers) — e mede, em regime (depois do
+aquecimento), para cada frame:
+    - pico de memória alocada durante process() (tracemalloc, que vê os
+      arrays NumPy devolvidos pelo OpenCV);
+    - memória que ficou alocada depois do frame (deve ser ~0: sem vazamento);
+    - coletas do GC e tempo médio por frame.
+
+Com reuse_buffers, o pico por frame fica em poucos KB (listas de contornos
+e eventos), em vez de várias cópias da máscara/frame.
+
+Uso:
+    python benchmarks/memory_loop.py
+    python benchmarks/memory_loop.py --modes contador movimento --resolution 1080p --frames 300
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import headless                  # usa headless.FrameProcessor / headless.buildConfig
+from synthetic import RESOLUTIONS, SyntheticScene
+
+
+def measure(mode, reuse, resolution, frames, warmup, seed=0):
+    """
+    Processa a cena e devolve as medidas de memória/tempo em regime.
+    """
+    width, height = RESOLUTIONS[resolution]
+    scene = SyntheticScene(width, height, frames + warmup, seed=seed)
+    overrides = scene.counter_config() if mode == "contador" else {}
+    cfg = headless.buildConfig(mode, overrides, {"detections": False, "reuse_buffers": reuse})
+    processor = headless.FrameProcessor(mode, cfg, (width, height))
+
+    for _ in range(warmup):
+        ok, frame = scene.read()
+        processor.process(frame)
+
+    peaks = []
+    retained = 0
+    busy = 0.0
+    collections = sum(s["collections"] for s in gc.get_stats())
+
+    tracemalloc.start()
+    while True:
+        ok, frame = scene.read()
+        if not ok:
+            break
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+        t0 = time.perf_counter()
+        processor.process(frame)
+        busy += time.perf_counter() - t0
+
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        retained += current - before
+        del frame
+    tracemalloc.stop()
+
+    peaks.sort()
+    n = len(peaks)
+    return {
+        "mode": mode,
+        "reuse_buffers": reuse,
+        "resolution": resolution,
+        "frames": n,
+        "peak_kb_p50": round(peaks[n // 2] / 1024, 1),
+        "peak_kb_max": round(peaks[-1] / 1024, 1),
+        "retained_kb": round(retained / 1024, 1),
+        "gc_collections": sum(s["collections"] for s in gc.get_stats()) - collections,
+        "ms_per_frame": round(1000 * busy / n, 3),
+        "buffer_kb": round(processor.buffers.nbytes() / 1024, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Alocação por frame com e sem buffers pré-alocados.")
+    parser.add_argument("--modes", nargs="+", default=sorted(headless.DEFAULTS), choices=sorted(headless.DEFAULTS))
+    parser.add_argument("--resolution", default="720p", choices=list(RESOLUTIONS))
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    print(f"{'modo':>15} {'buffers':>8} {'pico p50':>11} {'pico máx':>11} {'retido':>10} "
+          f"{'gc':>4} {'ms/frame':>9} {'mantido':>10}")
+    for mode in args.modes:
+        for reuse in (False, True):
+            r = measure(mode, reuse, args.resolution, args.frames, args.warmup)
+            print(f"{mode:>15} {'sim' if reuse else 'não':>8} {r['peak_kb_p50']:>8.1f} KB "
+                  f"{r['peak_kb_max']:>8.1f} KB {r['retained_kb']:>7.1f} KB {r['gc_collections']:>4} "
+                  f"{r['ms_per_frame']:>9.3f} {r['buffer_kb']:>7.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
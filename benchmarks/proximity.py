@@ -0,0 +1,58 @@
+# benchmarks/proximity.py
+"""
+Benchmark do motor de proximidade (proximity.closePairs).
+
+Espalha N pessoas aleatoriamente num frame e mede o tempo por frame dos
+métodos "dense" (matriz N x N) e "grid" (grade espacial), conferindo que os
+dois encontram exatamente os mesmos pares.
+
+Uso:
+    python benchmarks/proximity.py
+    python benchmarks/proximity.py --people 10 100 1000 --min-distance 40
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import proximity                 # usa proximity.closePairs
+from synthetic import RESOLUTIONS
+
+
+def timeMethod(points, min_distance, method, repeat):
+    pairs = proximity.closePairs(points, min_distance, method)   # aquecimento
+    start = time.perf_counter()
+    for _ in range(repeat):
+        proximity.closePairs(points, min_distance, method)
+    return 1000 * (time.perf_counter() - start) / repeat, pairs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara os métodos de proximidade.")
+    parser.add_argument("--resolution", default="720p", choices=list(RESOLUTIONS))
+    parser.add_argument("--people", type=int, nargs="+", default=[10, 50, 200, 1000, 3000])
+    parser.add_argument("--min-distance", type=float, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    width, height = RESOLUTIONS[args.resolution]
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'pessoas':>8} {'pares':>7} {'dense':>12} {'grid':>12}")
+    for n in args.people:
+        points = rng.uniform((0, 0), (width, height), (n, 2))
+        dense_ms, dense = timeMethod(points, args.min_distance, "dense", args.repeat)
+        grid_ms, grid = timeMethod(points, args.min_distance, "grid", args.repeat)
+
+        same = set(zip(dense[0].tolist(), dense[1].tolist())) == set(zip(grid[0].tolist(), grid[1].tolist()))
+        if not same:
+            raise AssertionError(f"Pares diferentes entre dense e grid com {n} pessoas")
+        print(f"{n:>8} {len(grid[0]):>7} {dense_ms:>9.3f} ms {grid_ms:>9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# benchmarks/run_benchmarks.py
+"""
+Harness de benchmark: velocidade E precisão da contagem.
+
+Para cada combinação de cena sintética (resolução), tipo de background
+subtractor (BGS_TYPES) e configuração de filtro (kernels de getFilter),
+processa a cena com headless.FrameProcessor no modo "contador" e mede:
+    - FPS de processamento (sem contar a geração dos frames);
+    - custo por estágio (p50/p95 de bg_apply, filter, find_contours, validator);
+    - contagem de carros/caminhões contra o ground truth da cena.
+
+Uso:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --bgs MOG2 KNN --filters 3x3 --resolutions 720p \\
+        --frames 900 --output resultados.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import headless                  # usa headless.FrameProcessor / headless.buildConfig
+import profiler                  # usa profiler.StageProfiler
+from synthetic import RESOLUTIONS, SyntheticScene
+
+# Configurações de filtro: kernels (closing, opening, dilation)
+FILTERS = {
+    "3x3": [[3, 3], [3, 3], [3, 3]],
+    "5x5": [[5, 5], [5, 5], [5, 5]],
+    "distanciamento": [None, [3, 5], [2, 2]],
+}
+
+# Estágios mostrados na tabela
+STAGES = ["bg_apply", "filter", "find_contours", "validator"]
+
+
+def accuracy(counted, truth):
+    """
+    1 - erro absoluto total / total real (0 se errar tudo, 1 se exato).
+    """
+    total = truth["cars"] + truth["trucks"]
+    if total == 0:
+        return 1.0
+    error = abs(counted["cars"] - truth["cars"]) + abs(counted["trucks"] - truth["trucks"])
+    return max(0.0, 1.0 - error / total)
+
+
+def benchOne(bgs, filter_name, resolution, frames, seed=0):
+    """
+    Processa uma cena e devolve o resultado (dicionário).
+    """
+    width, height = RESOLUTIONS[resolution]
+    scene = SyntheticScene(width, height, frames, seed=seed)
+
+    cfg = headless.buildConfig("contador", scene.counter_config(), {
+        "bgs": bgs,
+        "kernels": FILTERS[filter_name],
+        "detections": False,
+    })
+    prof = profiler.StageProfiler(enabled=True)
+    processor = headless.FrameProcessor("contador", cfg, (width, height), prof)
+
+    busy = 0.0
+    while True:
+        ok, frame = scene.read()
+        if not ok:
+            break
+        t0 = time.perf_counter()
+        processor.process(frame)
+        busy += time.perf_counter() - t0
+
+    cars, trucks = processor.validator.get_counts()
+    counted = {"cars": cars, "trucks": trucks}
+    truth = scene.ground_truth()
+    stages = prof.snapshot()["stages"]
+
+    return {
+        "bgs": bgs,
+        "filter": filter_name,
+        "resolution": resolution,
+        "frames": frames,
+        "fps": round(frames / busy, 1) if busy > 0 else 0.0,
+        "stages": {name: stages[name] for name in STAGES if name in stages},
+        "counted": counted,
+        "truth": truth,
+        "accuracy": round(accuracy(counted, truth), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de velocidade e precisão.")
+    parser.add_argument("--bgs", nargs="+", default=headless.BGS_TYPES, choices=headless.BGS_TYPES)
+    parser.add_argument("--filters", nargs="+", default=list(FILTERS), choices=list(FILTERS))
+    parser.add_argument("--resolutions", nargs="+", default=["360p", "720p"], choices=list(RESOLUTIONS))
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="grava os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    header = f"{'res':>6} {'bgs':>5} {'filtro':>15} {'fps':>8} " + \
+             " ".join(f"{s + ' p50':>16}" for s in STAGES) + f" {'cars':>9} {'trucks':>9} {'acc':>6}"
+    print(header)
+
+    results = []
+    for resolution in args.resolutions:
+        for bgs in args.bgs:
+            for filter_name in args.filters:
+                r = benchOne(bgs, filter_name, resolution, args.frames, args.seed)
+                results.append(r)
+
+                stage_cols = " ".join(f"{r['stages'].get(s, {}).get('p50_ms', 0):>13.3f} ms"
+                                      for s in STAGES)
+                print(f"{resolution:>6} {bgs:>5} {filter_name:>15} {r['fps']:>8.1f} {stage_cols} "
+                      f"{r['counted']['cars']:>4}/{r['truth']['cars']:<4} "
+                      f"{r['counted']['trucks']:>4}/{r['truth']['trucks']:<4} {r['accuracy']:>6.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# benchmarks/synthetic.py
+"""
+Gerador determinístico de cenas sintéticas para os benchmarks.
+
+Desenha veículos (retângulos) de tamanhos e velocidades definidos descendo
+por faixas sobre um fundo com textura e ruído por frame. Cada veículo aparece
+inteiro logo abaixo da borda superior (como se saísse de trás de um prédio),
+com o centróide já fora da zona morta da regra de entrada do validator (um
+objeto novo conta se cy > 10; um que surgisse pela borda seria detectado
+primeiro com cy entre 5 e 10 e nunca contaria) e com a área toda visível
+(o tipo é decidido pela área no frame da contagem). Assim a contagem real
+(ground truth) é simplesmente quantos "car" e quantos "truck" há na cena.
+
+A mesma semente gera sempre os mesmos frames. Os tamanhos são definidos para
+640x360 e escalados para as outras resoluções.
+
+Uso:
+    python benchmarks/synthetic.py saida.avi --resolution 1280x720 --frames 900
+"""
+import argparse
+
+import numpy as np
+import cv2
+
+# Resoluções usadas pelo harness
+RESOLUTIONS = {
+    "360p": (640, 360),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+
+# Tamanhos (w, h) em 640x360
+CAR_SIZE = (36, 48)
+TRUCK_SIZE = (52, 110)
+
+
+class SyntheticScene:
+    """
+    Cena sintética com veículos descendo por faixas verticais.
+
+    Expõe read() como um cv2.VideoCapture, para ser usada direto no
+    lugar do vídeo.
+    """
+
+    def __init__(self, width=640, height=360, frames=600, lanes=4, speed=4.0,
+                 spawn_every=45, truck_every=3, noise=6, seed=0, vehicle_scale=1.0, entry=16):
+        """
+        Parâmetros:
+            width, height: resolução do frame
+            frames       : número de frames da cena
+            lanes        : faixas (veículos de faixas diferentes nunca se tocam)
+            speed        : deslocamento vertical por frame em 640x360 (escalado)
+            spawn_every  : frames entre veículos na mesma faixa
+            truck_every  : a cada N veículos de uma faixa, um é caminhão
+            noise        : amplitude do ruído por pixel em cada frame
+            seed         : semente (cena totalmente determinística)
+            vehicle_scale: multiplica o tamanho dos veículos (< 1 = veículos
+                           pequenos/distantes para a resolução)
+            entry        : y (em 640x360, escalado) do topo do veículo no
+                           frame em que ele aparece
+        """
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.noise = noise
+        self.seed = seed
+
+        scale = width / 640.0
+        self.scale = scale
+        self.speed = speed * scale
+        size = scale * vehicle_scale
+        self.car_size = (int(CAR_SIZE[0] * size), int(CAR_SIZE[1] * size))
+        self.truck_size = (int(TRUCK_SIZE[0] * size), int(TRUCK_SIZE[1] * size))
+        self.entry = int(entry * scale)
+
+        rng = np.random.default_rng(seed)
+
+        # Fundo fixo com textura suave
+        base = rng.integers(50, 110, (height // 8 + 1, width // 8 + 1, 3)).astype(np.uint8)
+        self.background = cv2.resize(base, (width, height), interpolation=cv2.INTER_LINEAR)
+
+        # Agenda de veículos: (frame de entrada, x, tipo, cor)
+        lane_w = width / lanes
+        self.vehicles = []
+        for lane in range(lanes):
+            offset = int(rng.integers(0, spawn_every))
+            n = 0
+            for start in range(offset, frames, spawn_every):
+                vtype = "truck" if n % truck_every == truck_every - 1 else "car"
+                w = (self.truck_size if vtype == "truck" else self.car_size)[0]
+                x = int(lane * lane_w + (lane_w - w) / 2)
+                color = tuple(int(c) for c in rng.integers(170, 255, 3))
+                self.vehicles.append((start, x, vtype, color))
+                n += 1
+
+        self._index = 0
+        self._rng = np.random.default_rng(seed + 1)
+
+    # -----------------------------
+    # Ground truth
+    # -----------------------------
+    def ground_truth(self):
+        """
+        Veículos que aparecem durante a cena, por tipo. Todos aparecem
+        inteiros com o centróide abaixo de 10 px: o validator conta cada um
+        ao criá-lo, com o tipo pela área inteira.
+        """
+        truth = {"car": 0, "truck": 0}
+        for _, _, vtype, _ in self.vehicles:
+            truth[vtype] += 1
+        return {"cars": truth["car"], "trucks": truth["truck"]}
+
+    def _top(self, index, start):
+        """
+        y do topo de um veículo no frame `index`.
+        """
+        return int(self.entry + (index - start) * self.speed)
+
+    # -----------------------------
+    # Frames
+    # -----------------------------
+    def render(self, index):
+        """
+        Desenha o frame `index` (sem ruído).
+        """
+        img = self.background.copy()
+        for start, x, vtype, color in self.vehicles:
+            if start > index:
+                continue
+            w, h = self.truck_size if vtype == "truck" else self.car_size
+            y = self._top(index, start)
+            if y >= self.height:
+                continue
+            cv2.rectangle(img, (x, y), (x + w, y + h), color, -1)
+        return img
+
+    def boxes(self, index):
+        """
+        Caixas (x, y, w, h) dos veículos visíveis no frame `index`,
+        recortadas pela borda inferior da imagem.
+        """
+        out = []
+        for start, x, vtype, _ in self.vehicles:
+            if start > index:
+                continue
+            w, h = self.truck_size if vtype == "truck" else self.car_size
+            y = self._top(index, start)
+            y0, y1 = y, min(self.height, y + h + 1)
+            if y1 > y0:
+                out.append((x, y0, w + 1, y1 - y0))
+        return out
+
+    def read(self):
+        """
+        Mesmo contrato de cv2.VideoCapture.read().
+        """
+        if self._index >= self.frames:
+            return False, None
+        img = self.render(self._index)
+        if self.noise:
+            noise = self._rng.integers(0, self.noise, img.shape, dtype=np.uint8)
+            img = cv2.add(img, noise)
+        self._index += 1
+        return True, img
+
+    def isOpened(self):
+        return self._index < self.frames
+
+    def release(self):
+        self._index = self.frames
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frames)
+        if prop == cv2.CAP_PROP_FPS:
+            return 30.0
+        return 0.0
+
+    def counter_config(self):
+        """
+        Limiares do contador adequados a esta cena (escalados com a resolução).
+        """
+        car_area = self.car_size[0] * self.car_size[1]
+        truck_area = self.truck_size[0] * self.truck_size[1]
+        return {
+            "min_area": int(car_area * 0.3),
+            "max_area": int(truck_area * 2),
+            "truck_area_threshold": int((car_area + truck_area) / 2),
+        }
+
+    def write(self, path, fourcc="MJPG", fps=30):
+        """
+        Grava a cena inteira num arquivo de vídeo.
+        """
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps,
+                              (self.width, self.height))
+        while True:
+            ok, img = self.read()
+            if not ok:
+                break
+            out.write(img)
+        out.release()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um vídeo sintético com ground truth.")
+    parser.add_argument("output", help="arquivo de vídeo de saída (ex.: cena.avi)")
+    parser.add_argument("--resolution", default="640x360", help="LARGURAxALTURA")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    scene = SyntheticScene(width, height, args.frames, seed=args.seed)
+    scene.write(args.output)
+    print(f"Ground truth: {scene.ground_truth()}  limiares: {scene.counter_config()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/tiles.py
+"""
+Benchmark do processamento em blocos (tiles.TiledMask).
+
+Processa a mesma cena sintética (4K por padrão) com headless.FrameProcessor
+sem blocos e com cada grade pedida, e mede o FPS do BGS + filtros. Confere
+também que a máscara limpa e os blobs de cada frame são idênticos aos do
+processamento sem blocos (as margens dos blocos cobrem o alcance dos
+filtros, e os blobs são extraídos da máscara inteira).
+
+O KNN atualiza as amostras de fundo de forma aleatória e não repete a
+própria máscara entre duas execuções iguais; com ele a conferência é pulada.
+
+O ganho depende do número de núcleos: com um núcleo só, os blocos apenas
+somam o custo das threads.
+
+Uso:
+    python benchmarks/tiles.py
+    python benchmarks/tiles.py --resolution 1080p --grids 2x1 2x2 4x2 --bgs KNN
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import headless                  # usa headless.FrameProcessor / headless.buildConfig
+from synthetic import RESOLUTIONS, SyntheticScene
+
+# BGS não determinísticos (máscaras não comparáveis entre execuções)
+RANDOM_BGS = {"KNN"}
+
+
+def runGrid(frames, cfg, size, grid, workers):
+    """
+    Processa os frames e devolve (fps de BGS + filtros, máscaras limpas, caixas).
+    """
+    cfg = dict(cfg, tiles=grid, tile_workers=workers)
+    processor = headless.FrameProcessor("contador", cfg, size)
+    masks, boxes = [], []
+    busy = 0.0
+    for frame in frames:
+        t0 = time.perf_counter()
+        fgmask = processor.mask(frame)
+        busy += time.perf_counter() - t0
+        masks.append(np.packbits(fgmask > 0))
+        boxes.append(processor.blobs(fgmask)[0])
+    processor.close()
+    return len(frames) / busy, masks, boxes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara o processamento com e sem blocos.")
+    parser.add_argument("--resolution", default="4k", choices=list(RESOLUTIONS))
+    parser.add_argument("--grids", type=headless.parseGrid, nargs="+",
+                        default=[[2, 1], [2, 2], [4, 2]])
+    parser.add_argument("--workers", type=int, help="threads (padrão: uma por bloco)")
+    parser.add_argument("--bgs", default="MOG2", choices=headless.BGS_TYPES)
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    width, height = RESOLUTIONS[args.resolution]
+    scene = SyntheticScene(width, height, args.frames, seed=args.seed)
+    frames = []
+    while True:
+        ok, frame = scene.read()
+        if not ok:
+            break
+        frames.append(frame.copy())
+
+    cfg = headless.buildConfig("contador", scene.counter_config(), {
+        "bgs": args.bgs,
+        "scale": 1.0,
+        "detections": False,
+    })
+
+    print(f"{os.cpu_count()} núcleos, {args.resolution} ({width}x{height}), {len(frames)} frames, {args.bgs}")
+    base_fps, base_masks, base_boxes = runGrid(frames, cfg, (width, height), None, None)
+    print(f"{'grade':>6} {'fps':>8} {'ganho':>7} {'blobs':>7}")
+    print(f"{'1x1':>6} {base_fps:>8.1f} {1.0:>6.2f}x {sum(map(len, base_boxes)):>7}")
+
+    for grid in args.grids:
+        fps, masks, boxes = runGrid(frames, cfg, (width, height), grid, args.workers)
+        name = f"{grid[0]}x{grid[1]}"
+        for i in range(len(frames) if args.bgs not in RANDOM_BGS else 0):
+            if not np.array_equal(base_masks[i], masks[i]):
+                raise AssertionError(f"Máscara diferente na grade {name}, frame {i}")
+            if not np.array_equal(base_boxes[i], boxes[i]):
+                raise AssertionError(f"Blobs diferentes na grade {name}, frame {i}")
+        print(f"{name:>6} {fps:>8.1f} {fps / base_fps:>6.2f}x {sum(map(len, boxes)):>7}")
+
+
+if __name__ == "__main__":
+    main()
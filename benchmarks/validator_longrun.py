@@ -0,0 +1,111 @@
+# benchmarks/validator_longrun.py
+"""
+Benchmark de longa duração do SimpleValidator.
+
+Simula um fluxo contínuo de veículos descendo pela ROI durante muitos frames
+e mede, em janelas ao longo do tempo, o custo médio de register_frame() (a
+API usada pelo headless, chunked, blobcache e autotune) por frame e por
+detecção, além do número de objetos mantidos em memória. Cada frame entrega
+todas as detecções de uma vez, como a extração dos blobs: os veículos na
+ROI mais `--noise` blobs de ruído (a maioria abaixo de min_area, alguns
+acima, que viram objetos de vida curta). Com a expiração de objetos, o
+custo na última janela deve ser próximo ao da primeira.
+
+Com muitas faixas (ROI larga, muitos objetos ao mesmo tempo), a grade
+espacial faz cada detecção ser comparada só com os objetos próximos;
+--dense mede a matriz detecção x objeto inteira, para comparar.
+
+Uso:
+    python benchmarks/validator_longrun.py
+    python benchmarks/validator_longrun.py --frames 500000 --spawn-every 4 --noise 8
+    python benchmarks/validator_longrun.py --lanes 400 --spawn-every 1 --noise 200 --speed 2 [--dense]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import validator                 # usa validator.SimpleValidator
+
+MIN_AREA = 100
+HEIGHT = 400
+
+
+class DenseValidator(validator.SimpleValidator):
+    """
+    SimpleValidator sem a grade no register_frame(): todas as detecções
+    contra todos os objetos (referência do --dense).
+    """
+
+    def _pairs(self, pts, track_ids, last_pos, track_pos, radius):
+        dist = np.hypot(pts[:, None, 0] - track_pos[None, :, 0],
+                        pts[:, None, 1] - track_pos[None, :, 1])
+        det_idx, trk_idx = np.nonzero(dist < radius[None, :])
+        return det_idx, trk_idx, dist[det_idx, trk_idx]
+
+
+def run(frames=200000, window=20000, lanes=6, spawn_every=8, speed=10, noise=4, seed=0,
+        dense=False):
+    rng = np.random.default_rng(seed)
+    v = (DenseValidator if dense else validator.SimpleValidator)(min_area=MIN_AREA)
+
+    active = np.zeros((0, 2))       # (x, y) de cada veículo simulado
+    width = 80 * lanes
+
+    window_time = 0.0
+    window_detections = 0
+
+    print(f"{'frame':>8} {'us/frame':>10} {'us/detecção':>12} {'det/frame':>10} {'objetos':>8}")
+    for f in range(1, frames + 1):
+        if f % spawn_every == 0:
+            lane = rng.integers(lanes)
+            active = np.vstack([active, [40 + lane * 80 + rng.integers(-5, 6), 2 - speed]])
+        active[:, 1] += speed
+        active = active[active[:, 1] < HEIGHT]
+
+        # Ruído: 1 em cada 4 blobs passa de min_area
+        n = rng.poisson(noise)
+        spurious = rng.uniform((0, 0), (width, HEIGHT), (n, 2))
+        spurious_areas = np.where(rng.random(n) < 0.25, MIN_AREA * 2, MIN_AREA // 2)
+
+        centroids = np.vstack([active, spurious])
+        areas = np.concatenate([np.full(len(active), 1500), spurious_areas]).astype(np.int64)
+
+        t0 = time.perf_counter()
+        v.register_frame(centroids, areas)
+        window_time += time.perf_counter() - t0
+        window_detections += len(areas)
+
+        if f % window == 0:
+            print(f"{f:>8} {1e6 * window_time / window:>10.1f} "
+                  f"{1e6 * window_time / max(1, window_detections):>12.2f} "
+                  f"{window_detections / window:>10.1f} {len(v.objects):>8}")
+            window_time = 0.0
+            window_detections = 0
+
+    cars, trucks = v.get_counts()
+    print(f"Contagem final: cars={cars} trucks={trucks} "
+          f"({frames // spawn_every} veículos simulados; o resto é ruído acima de min_area)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Custo de register_frame() ao longo do tempo.")
+    parser.add_argument("--frames", type=int, default=200000)
+    parser.add_argument("--window", type=int, default=20000, help="frames por linha da tabela")
+    parser.add_argument("--lanes", type=int, default=6)
+    parser.add_argument("--spawn-every", type=int, default=8, help="frames entre veículos novos")
+    parser.add_argument("--speed", type=float, default=10, help="px por frame")
+    parser.add_argument("--noise", type=float, default=4, help="blobs de ruído por frame (média)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dense", action="store_true",
+                        help="sem a grade: matriz detecção x objeto inteira")
+    args = parser.parse_args(argv)
+    run(args.frames, args.window, args.lanes, args.spawn_every, args.speed, args.noise, args.seed,
+        args.dense)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+# blobcache.py
+"""
+Cache das detecções por frame + varredura de parâmetros do validator.
+
+Decodificar o vídeo e rodar bg.apply + getFilter é a parte cara. Depois
+disso, cada frame vira uma lista pequena de blobs (x, y, w, h, área). Este
+módulo grava esses registros uma vez, em blocos comprimidos (.npz), e
+depois reexecuta SÓ o estágio do validator sobre o cache, para uma grade de
+parâmetros (minArea, maxArea, truck_area_threshold, raio de matching),
+em paralelo.
+
+Formato do cache (pasta):
+    meta.json          configuração usada, tamanho do frame, nº de frames
+    chunk-000000.npz   frames [0, chunk_frames)
+    chunk-000001.npz   ...
+Cada bloco tem:
+    offsets: int64 (frames + 1) — blobs do frame i em blobs[offsets[i]:offsets[i+1]]
+    blobs  : float32 (N, 5)     — x, y, w, h, área
+    masks  : uint8 (opcional)   — máscaras limpas com np.packbits
+
+Uso:
+    python blobcache.py build contador --video cars.mp4 --cache cache_cars/ --roi 0,200,1280,400
+    python blobcache.py sweep cache_cars/ --min-area 200 400 --max-area 15000 30000 \\
+        --truck-area-threshold 4000 5000 6000 --match-radius 30 50 --truth 120,30
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import cv2
+
+import headless                  # usa headless.FrameProcessor / headless.buildParser
+import blobs                     # usa blobs.findBlobs
+import validator                 # usa validator.SimpleValidator
+
+META_FILE = "meta.json"
+
+# =====================================================================
+# CONSTRUÇÃO DO CACHE
+# =====================================================================
+
+def _writeChunk(path, number, offsets, records, masks):
+    arrays = {
+        "offsets": np.asarray(offsets, dtype=np.int64),
+        "blobs": np.asarray(records, dtype=np.float32).reshape(-1, 5),
+    }
+    if masks is not None:
+        arrays["masks"] = np.stack(masks) if masks else np.zeros((0, 0), np.uint8)
+    np.savez_compressed(os.path.join(path, f"chunk-{number:06d}.npz"), **arrays)
+
+
+def buildCache(mode, cfg, path, chunk_frames=1000, floor_area=10, masks=False):
+    """
+    Decodifica cfg["video"], roda BGS + filtros e grava os blobs de cada frame
+    (extraídos com o backend cfg["extraction"]).
+
+    Parâmetros:
+        mode        : modo do headless (define kernels/escala padrão)
+        cfg         : configuração mesclada (headless.buildConfig)
+        path        : pasta do cache
+        chunk_frames: frames por bloco
+        floor_area  : área mínima gravada (bem abaixo de qualquer minArea testado)
+        masks       : grava também as máscaras limpas (bits empacotados)
+
+    Retorna o dicionário de metadados.
+    """
+    os.makedirs(path, exist_ok=True)
+
+    cap = cv2.VideoCapture(cfg["video"])
+    if not cap.isOpened():
+        raise IOError(f"Erro ao abrir o vídeo de entrada: {cfg['video']}")
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                  int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    processor = headless.FrameProcessor(mode, cfg, frame_size)
+
+    start = time.perf_counter()
+    frames = 0
+    chunk = 0
+    offsets, records, packed = [0], [], ([] if masks else None)
+    mask_shape = None
+
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+
+        fgmask = processor.mask(frame)
+        boxes, areas, _ = blobs.findBlobs(fgmask, cfg["extraction"], floor_area,
+                                          bufs=processor.buffers)
+        records.extend(np.column_stack((boxes, areas)).tolist())
+        offsets.append(len(records))
+
+        if masks:
+            mask_shape = fgmask.shape
+            packed.append(np.packbits(fgmask > 0))
+
+        frames += 1
+        if frames % chunk_frames == 0:
+            _writeChunk(path, chunk, offsets, records, packed)
+            chunk += 1
+            offsets, records, packed = [0], [], ([] if masks else None)
+
+    if len(offsets) > 1:
+        _writeChunk(path, chunk, offsets, records, packed)
+    processor.close()
+    cap.release()
+
+    meta = {
+        "mode": mode,
+        "config": cfg,
+        "roi": list(processor.roi),
+        "frame_size": list(frame_size),
+        "frames": frames,
+        "chunk_frames": chunk_frames,
+        "floor_area": floor_area,
+        "mask_shape": list(mask_shape) if mask_shape else None,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+# =====================================================================
+# LEITURA
+# =====================================================================
+
+def loadMeta(path):
+    with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iterFrames(path):
+    """
+    Gera, frame a frame, o array (N, 5) de blobs gravado no cache.
+    """
+    for name in sorted(glob.glob(os.path.join(path, "chunk-*.npz"))):
+        with np.load(name) as chunk:
+            offsets = chunk["offsets"]
+            records = chunk["blobs"]
+        for i in range(len(offsets) - 1):
+            yield records[offsets[i]:offsets[i + 1]]
+
+
+def iterMasks(path):
+    """
+    Gera as máscaras limpas (uint8 0/255) se o cache foi criado com masks=True.
+    """
+    meta = loadMeta(path)
+    shape = meta["mask_shape"]
+    if not shape:
+        raise ValueError("Cache criado sem máscaras")
+    size = shape[0] * shape[1]
+    for name in sorted(glob.glob(os.path.join(path, "chunk-*.npz"))):
+        with np.load(name) as chunk:
+            packed = chunk["masks"]
+        for row in packed:
+            yield np.unpackbits(row)[:size].reshape(shape) * 255
+
+# =====================================================================
+# VARREDURA (somente o validator)
+# =====================================================================
+
+# Quadros do cache carregados uma vez por processo (initializer do pool)
+_FRAMES = None
+
+
+def _loadWorker(path):
+    global _FRAMES
+    _FRAMES = list(iterFrames(path))
+
+
+def replay(frames, min_area, max_area, truck_area_threshold, match_radius):
+    """
+    Reexecuta o contador sobre os blobs do cache com os parâmetros dados.
+    Retorna (cars, trucks).
+    """
+    v = validator.SimpleValidator(
+        min_area=min_area,
+        truck_area_threshold=truck_area_threshold,
+        match_radius=match_radius
+    )
+    for records in frames:
+        areas = records[:, 4]
+        keep = (areas > min_area) & (areas <= max_area)
+        sel = records[keep]
+
+        # Centróide como getCentroid(): x + w//2, y + h//2
+        centroids = np.column_stack((sel[:, 0] + sel[:, 2] // 2, sel[:, 1] + sel[:, 3] // 2))
+        v.register_frame(centroids, sel[:, 4].astype(np.int64))
+    return v.get_counts()
+
+
+def _sweepOne(params):
+    cars, trucks = replay(_FRAMES, *params)
+    return params, cars, trucks
+
+
+def sweep(path, grid, workers=None, truth=None):
+    """
+    Avalia todas as combinações da grade em paralelo.
+
+    Parâmetros:
+        path   : pasta do cache
+        grid   : dict com listas para "min_area", "max_area",
+                 "truck_area_threshold" e "match_radius"
+        workers: processos (None = núcleos)
+        truth  : (cars, trucks) reais, para calcular o erro (opcional)
+
+    Retorna a lista de resultados (ordenada pelo erro, se truth informado).
+    """
+    combos = list(itertools.product(grid["min_area"], grid["max_area"],
+                                    grid["truck_area_threshold"], grid["match_radius"]))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_loadWorker, initargs=(path,)) as pool:
+        for (min_area, max_area, truck, radius), cars, trucks in pool.map(_sweepOne, combos):
+            r = {"min_area": min_area, "max_area": max_area,
+                 "truck_area_threshold": truck, "match_radius": radius,
+                 "cars": cars, "trucks": trucks}
+            if truth is not None:
+                r["error"] = abs(cars - truth[0]) + abs(trucks - truth[1])
+            results.append(r)
+
+    if truth is not None:
+        results.sort(key=lambda r: r["error"])
+    return results
+
+# =====================================================================
+# LINHA DE COMANDO
+# =====================================================================
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("build", "sweep"):
+        print("Uso: python blobcache.py build|sweep ...")
+        sys.exit(1)
+
+    if argv[0] == "build":
+        parser = headless.buildParser()
+        parser.description = "Grava o cache de blobs de um vídeo."
+        parser.add_argument("--cache", required=True, help="pasta do cache")
+        parser.add_argument("--chunk-frames", type=int, default=1000)
+        parser.add_argument("--floor-area", type=float, default=10)
+        parser.add_argument("--masks", action="store_true", help="grava também as máscaras")
+        args = parser.parse_args(argv[1:])
+
+        extra = {k: getattr(args, k) for k in ("cache", "chunk_frames", "floor_area", "masks")}
+        for key in extra:
+            delattr(args, key)
+        cfg = headless.loadConfig(args.mode, args)
+
+        meta = buildCache(args.mode, cfg, extra["cache"], extra["chunk_frames"],
+                          extra["floor_area"], extra["masks"])
+        print(f"Cache gravado: {meta['frames']} frames em {meta['seconds']} s")
+        return
+
+    parser = argparse.ArgumentParser(description="Varre parâmetros do validator sobre o cache.")
+    parser.add_argument("cache", help="pasta do cache")
+    parser.add_argument("--min-area", type=float, nargs="+")
+    parser.add_argument("--max-area", type=float, nargs="+")
+    parser.add_argument("--truck-area-threshold", type=float, nargs="+")
+    parser.add_argument("--match-radius", type=float, nargs="+", default=[50])
+    parser.add_argument("--truth", help="contagem real como cars,trucks")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--output", help="grava os resultados em JSON")
+    args = parser.parse_args(argv[1:])
+
+    # Valores não informados vêm da configuração usada para criar o cache
+    cfg = loadMeta(args.cache)["config"]
+    roi = loadMeta(args.cache)["roi"]
+    default_min = cfg["min_area"] if cfg["min_area"] is not None else int(roi[2] * roi[3] / 250)
+    grid = {
+        "min_area": args.min_area or [default_min],
+        "max_area": args.max_area or [cfg["max_area"]],
+        "truck_area_threshold": args.truck_area_threshold or [cfg["truck_area_threshold"]],
+        "match_radius": args.match_radius,
+    }
+    truth = tuple(int(v) for v in args.truth.split(",")) if args.truth else None
+
+    start = time.perf_counter()
+    results = sweep(args.cache, grid, args.workers, truth)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'min_area':>9} {'max_area':>9} {'truck':>7} {'raio':>5} {'cars':>6} {'trucks':>6}"
+          + (f" {'erro':>5}" if truth else ""))
+    for r in results:
+        print(f"{r['min_area']:>9.0f} {r['max_area']:>9.0f} {r['truck_area_threshold']:>7.0f} "
+              f"{r['match_radius']:>5.0f} {r['cars']:>6} {r['trucks']:>6}"
+              + (f" {r['error']:>5}" if truth else ""))
+    print(f"{len(results)} combinações em {elapsed:.2f} s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
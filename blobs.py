@@ -0,0 +1,83 @@
+# blobs.py
+"""
+Extração dos blobs (x, y, w, h, área) da máscara limpa.
+
+Dois backends:
+    - "contours":   cv2.findContours + contourArea/boundingRect por contorno
+                    (laço em Python; devolve também os contornos, para desenho)
+    - "components": cv2.connectedComponentsWithStats — uma única chamada
+                    devolve caixa e área de todos os blobs como arrays, e os
+                    limites de área são aplicados de forma vetorizada. Nenhum
+                    trabalho em Python por blob; bom para frames lotados.
+
+Os dois ligam os pixels com vizinhança-8, mas não devolvem os mesmos blobs
+nem as mesmas áreas:
+    - findContours(RETR_EXTERNAL) só vê contornos externos: um blob dentro
+      do buraco de outro (ex.: reflexo no meio de um veículo em forma de
+      anel) some, engolido pelo de fora; components devolve os dois;
+    - contourArea é a área do polígono do contorno externo (buracos contam,
+      a borda conta pela metade: um retângulo w x h tem (w-1)*(h-1));
+    - components conta os pixels acesos (buracos não contam; w x h = w*h).
+Ao trocar de backend, os limiares de área podem precisar de ajuste fino, e
+máscaras com buracos podem gerar detecções a mais no "components".
+
+Custo: findContours só percorre as bordas, então com poucos blobs é mais
+rápido; components rotula todos os pixels (custo fixo por resolução) e
+passa a ganhar a partir de algumas centenas de blobs por frame em 720p
+(benchmarks/extraction.py mede o ponto de virada).
+"""
+import numpy as np
+import cv2
+
+import buffers                   # usa buffers.DISABLED
+
+EXTRACTION_BACKENDS = ["contours", "components"]
+
+
+def areaMask(areas, min_area=0, max_area=None, inclusive_min=True):
+    """
+    Máscara booleana dos blobs dentro dos limites de área.
+    inclusive_min=False usa min_area < área (regra do contador).
+    """
+    keep = areas >= min_area if inclusive_min else areas > min_area
+    if max_area is not None:
+        keep &= areas <= max_area
+    return keep
+
+
+def findBlobs(mask, backend="contours", min_area=0, max_area=None, inclusive_min=True,
+              bufs=buffers.DISABLED):
+    """
+    Blobs da máscara dentro dos limites de área.
+
+    Retorna (boxes, areas, contours):
+        boxes   : int64 (N, 4) — x, y, w, h
+        areas   : float64 (N,)
+        contours: lista de contornos alinhada com boxes ("contours") ou
+                  None ("components")
+    """
+    if backend == "components":
+        labels = bufs.get("labels", mask.shape, np.int32)
+        # BBDT (Grana) foi o algoritmo mais rápido com estatísticas e vizinhança-8
+        _, _, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+            mask, 8, cv2.CV_32S, cv2.CCL_GRANA, labels=labels)
+        stats = stats[1:]   # rótulo 0 é o fundo
+        areas = stats[:, cv2.CC_STAT_AREA].astype(np.float64)
+        keep = areaMask(areas, min_area, max_area, inclusive_min)
+        return stats[keep, :4].astype(np.int64), areas[keep], None
+
+    if backend != "contours":
+        raise ValueError(f"Backend de extração inválido: {backend}")
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    areas = np.array([cv2.contourArea(cnt) for cnt in contours], dtype=np.float64)
+    keep = np.flatnonzero(areaMask(areas, min_area, max_area, inclusive_min))
+    boxes = np.array([cv2.boundingRect(contours[i]) for i in keep], dtype=np.int64).reshape(-1, 4)
+    return boxes, areas[keep], [contours[i] for i in keep]
+
+
+def centroids(boxes):
+    """
+    Centróides das caixas como getCentroid(): x + w//2, y + h//2.
+    """
+    return boxes[:, :2] + boxes[:, 2:] // 2
@@ -0,0 +1,80 @@
+# buffers.py
+"""
+Buffers de saída reaproveitados entre frames.
+
+As funções do OpenCV aceitam `dst=` (e bg.apply aceita `fgmask=`): se o
+array informado já tem o tamanho e o tipo certos, o resultado é escrito nele
+e nenhuma memória nova é alocada. FrameBuffers guarda esses arrays por nome
+(um por estágio: "resize", "fgmask", "closing", ...) e só aloca de novo
+quando o tamanho muda. Em regime, o loop não aloca nenhuma imagem por frame.
+
+Um buffer só é válido até o próximo frame. Quando o resultado de um frame
+ainda está em uso enquanto o seguinte é processado (modo pipeline: fila de
+render), use `ring` > 1: cada nome passa a ter `ring` arrays usados em
+rodízio, e advance() troca de posição a cada frame.
+
+Uso:
+    buffers = FrameBuffers()
+    ...
+    buffers.advance()
+    small = cv2.resize(frame, (0, 0), dst=buffers.get("resize", shape), fx=0.5, fy=0.5)
+
+DISABLED.get() devolve None (dst=None = OpenCV aloca normalmente).
+"""
+import numpy as np
+
+
+class FrameBuffers:
+    """
+    Conjunto de buffers nomeados, reaproveitados a cada frame.
+    """
+
+    def __init__(self, ring=1, enabled=True):
+        """
+        Parâmetros:
+            ring   : arrays por nome usados em rodízio (frames em uso ao mesmo tempo)
+            enabled: False = get() devolve None (sem reaproveitamento)
+        """
+        self.ring = max(1, int(ring))
+        self.enabled = enabled
+        self.turn = 0
+        self.allocations = 0
+        self._slots = {}   # nome -> lista de arrays (tamanho ring)
+
+    def advance(self):
+        """
+        Passa para o próximo frame (próxima posição do rodízio).
+        """
+        self.turn = (self.turn + 1) % self.ring
+
+    def get(self, name, shape, dtype=np.uint8):
+        """
+        Buffer `name` com o formato pedido (alocado só se preciso).
+        """
+        if not self.enabled:
+            return None
+        slots = self._slots.get(name)
+        if slots is None:
+            slots = self._slots[name] = [None] * self.ring
+
+        buf = slots[self.turn]
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = slots[self.turn] = np.empty(shape, dtype)
+            self.allocations += 1
+        return buf
+
+    def nbytes(self):
+        """
+        Memória total mantida pelos buffers.
+        """
+        return sum(buf.nbytes for slots in self._slots.values() for buf in slots if buf is not None)
+
+
+def scaledShape(shape, scale):
+    """
+    Formato da imagem depois de cv2.resize(img, (0, 0), fx=scale, fy=scale).
+    """
+    return (round(shape[0] * scale), round(shape[1] * scale)) + tuple(shape[2:])
+
+
+DISABLED = FrameBuffers(enabled=False)
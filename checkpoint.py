@@ -0,0 +1,192 @@
+# checkpoint.py
+"""
+Checkpoints periódicos e retomada de execuções longas (headless.py).
+
+Um checkpoint é uma pasta com:
+    checkpoint.json       : índice do frame, estado do FrameProcessor
+                            (validators, totais), configuração de origem e
+                            posição no arquivo de saída
+    background-<N>.png    : imagem de fundo aprendida pelo BGS no frame N
+                            (MOG2, KNN e CNT; MOG e GMG não fornecem uma)
+    fine-<N>.npy          : modo coarse: fundo nativo (média móvel em
+                            float32) do coarse.CoarseToFine no frame N
+
+Os arquivos são escritos com nome temporário e trocados com os.replace(),
+então uma queda no meio da gravação deixa o checkpoint anterior intacto.
+
+Retomada:
+    1. o arquivo de saída é truncado na posição gravada no checkpoint
+       (os eventos emitidos depois dele seriam repetidos);
+    2. o estado do processor é restaurado (objetos rastreados, IDs,
+       contagens): veículos já contados não são contados de novo;
+    3. um BGS novo é semeado com a imagem de fundo (`seed` vezes), o fundo
+       nativo do modo coarse volta exato, e o vídeo é posicionado `warmup` frames antes do checkpoint; esses
+       frames só atualizam o BGS (sem contagem nem eventos).
+O modelo interno do BGS (gaussianas, amostras) não é exposto pelo OpenCV
+e não pode ser salvo: a retomada é aproximada. Os objetos rastreados e as
+contagens voltam exatos, mas a máscara dos primeiros frames depois da
+retomada pode diferir da de uma execução contínua, e com ela a contagem
+de veículos colados ou que chegam nesse intervalo. A semente dá a média
+do fundo e o pré-aquecimento reaprende o ruído do vídeo; um warmup da
+ordem do histórico do BGS (~500 frames, o padrão do headless.py)
+aproxima a execução contínua ao custo de uma retomada mais lenta.
+"""
+import json
+import os
+
+import numpy as np
+import cv2
+
+STATE_FILE = "checkpoint.json"
+
+# Chaves da configuração que precisam ser iguais para retomar: as que
+# definem a máscara e os blobs, as regras de contagem/classificação e os
+# buckets do count store (contagens de regras diferentes não se misturam)
+FINGERPRINT_KEYS = ["video", "bgs", "bgs_params", "roi", "zones", "scale", "kernels", "iterations",
+                    "median_blur", "tiles", "coarse", "coarse_threshold", "coarse_min_area",
+                    "extraction", "gate", "gate_min_fraction", "gate_hold",
+                    "min_area", "max_area", "truck_area_threshold", "min_distance", "homography",
+                    "count_store", "count_interval"]
+
+
+def fingerprint(mode, cfg):
+    """
+    Parte da configuração que define o estado salvo (modo, vídeo, ROI, ...).
+    Passa por JSON (tuplas viram listas) para comparar com a versão lida
+    do checkpoint.json.
+    """
+    return json.loads(json.dumps({"mode": mode, **{key: cfg.get(key) for key in FINGERPRINT_KEYS}}))
+
+
+def _replace(path, write):
+    tmp = path + ".tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class Checkpointer:
+    """
+    Grava e lê os checkpoints de uma execução.
+    """
+
+    def __init__(self, path, every, fingerprint, output=None):
+        """
+        Parâmetros:
+            path       : pasta do checkpoint
+            every      : frames entre checkpoints
+            fingerprint: ver fingerprint(); conferido na retomada
+            output     : arquivo de saída (seekable) dos eventos; a posição
+                         dele é gravada para a retomada truncar ali
+        """
+        self.path = path
+        self.every = every
+        self.fingerprint = fingerprint
+        self.output = output
+        self.saved = 0
+        self.resumed_from = None
+        os.makedirs(path, exist_ok=True)
+
+    def save(self, frame_index, state, background=None, fine=None):
+        """
+        Grava o checkpoint do frame `frame_index` (depois dos seus eventos).
+        `fine` é o fundo nativo do modo coarse (None fora dele).
+        """
+        offset = None
+        if self.output is not None:
+            self.output.flush()
+            offset = self.output.tell()
+
+        image_name = None
+        if background is not None:
+            image_name = f"background-{frame_index}.png"
+            _replace(os.path.join(self.path, image_name),
+                     lambda tmp: cv2.imencode(".png", background)[1].tofile(tmp))
+
+        fine_name = None
+        if fine is not None:
+            fine_name = f"fine-{frame_index}.npy"
+
+            def writeFine(tmp):
+                with open(tmp, "wb") as f:
+                    np.save(f, fine)
+
+            _replace(os.path.join(self.path, fine_name), writeFine)
+
+        meta = {
+            "frame": frame_index,
+            "fingerprint": self.fingerprint,
+            "output_offset": offset,
+            "background": image_name,
+            "fine": fine_name,
+            "state": state,
+        }
+
+        def write(tmp):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        previous = loadMeta(self.path)
+        _replace(os.path.join(self.path, STATE_FILE), write)
+        self.saved += 1
+
+        # Imagens do checkpoint anterior não são mais referenciadas
+        for key, name in (("background", image_name), ("fine", fine_name)):
+            if previous and previous.get(key) not in (None, name):
+                try:
+                    os.remove(os.path.join(self.path, previous[key]))
+                except OSError:
+                    pass
+
+    def load(self):
+        """
+        Retorna (state, background, fine) do último checkpoint, ou None se
+        não houver. Checkpoint de outra configuração gera ValueError.
+        """
+        meta = loadMeta(self.path, self.fingerprint)
+        if meta is None:
+            return None
+
+        background = None
+        if meta["background"]:
+            background = cv2.imread(os.path.join(self.path, meta["background"]), cv2.IMREAD_UNCHANGED)
+        fine = None
+        if meta.get("fine"):
+            fine = np.load(os.path.join(self.path, meta["fine"]))
+        self.resumed_from = meta["frame"]
+        return meta["state"], background, fine
+
+    def stats(self):
+        """
+        Totais para o resumo da execução.
+        """
+        return {"path": self.path, "saved": self.saved, "resumed_from": self.resumed_from}
+
+
+def loadMeta(path, expected=None):
+    """
+    Conteúdo de checkpoint.json (None se não existir). Com `expected`
+    (ver fingerprint()), checkpoint de outra configuração gera ValueError.
+    """
+    name = os.path.join(path, STATE_FILE)
+    if not os.path.exists(name):
+        return None
+    with open(name, encoding="utf-8") as f:
+        meta = json.load(f)
+    if expected is not None and meta["fingerprint"] != expected:
+        saved = meta["fingerprint"]
+        diff = {key: saved.get(key) for key in set(saved) | set(expected) if saved.get(key) != expected.get(key)}
+        raise ValueError(f"Checkpoint em {path} é de outra configuração (valores salvos): {diff}")
+    return meta
+
+
+def openOutput(name, offset=None):
+    """
+    Abre o arquivo de saída; com offset (retomada), mantém os eventos até
+    o checkpoint e continua escrevendo a partir dali.
+    """
+    if offset is None or not os.path.exists(name):
+        return open(name, "w", encoding="utf-8")
+    f = open(name, "r+", encoding="utf-8")
+    f.seek(offset)
+    f.truncate()
+    return f
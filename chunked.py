@@ -0,0 +1,214 @@
+# chunked.py
+"""
+Processamento paralelo de UM vídeo longo, dividido em trechos de tempo.
+
+Cada trecho [início, fim) roda num processo separado. Antes do início real,
+o processo lê uma janela de pré-aquecimento (`warmup` frames) para que o
+background subtractor (MOG2/KNN/...) já esteja convergido e para que o
+SimpleValidator já conheça os veículos que estão na ROI.
+
+Junção sem contagem dupla: todo evento carrega o índice GLOBAL do frame e
+cada trecho só mantém os eventos com frame dentro do seu intervalo. Um
+veículo que cruza a borda de entrada durante o pré-aquecimento pertence ao
+trecho anterior; no trecho atual ele já está rastreado e não é contado
+de novo. Os totais de carros/caminhões (e, com zonas, os cruzamentos por
+contador e sentido) de cada trecho são a diferença dos totais dos
+validators entre o início real e o fim do trecho.
+
+count_store e checkpoint não são aceitos: todos os trechos gravariam na
+mesma pasta.
+
+Uso:
+    python chunked.py contador --video longo.mp4 --chunks 8 --warmup 500
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+import headless                  # usa headless.FrameProcessor / headless.buildConfig
+
+
+def splitChunks(total_frames, chunks):
+    """
+    Divide [0, total_frames) em `chunks` intervalos contíguos.
+    """
+    chunks = max(1, min(chunks, total_frames))
+    bounds = [round(i * total_frames / chunks) for i in range(chunks + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(chunks)]
+
+
+def _combine(a, b, sign=1):
+    """
+    a + sign * b, campo a campo, para totais aninhados (dicionários de
+    números, como as zonas de FrameProcessor.counts()).
+    """
+    if isinstance(a, dict):
+        return {key: _combine(value, b.get(key, 0), sign) for key, value in a.items()}
+    return a + sign * b
+
+
+def _chunkWorker(mode, cfg, index, start, end, warmup):
+    """
+    Processa os frames [start, end) com pré-aquecimento desde start - warmup.
+    Retorna o resumo do trecho (somente eventos dentro do intervalo).
+    """
+    cv2.setNumThreads(1)
+
+    cap = cv2.VideoCapture(cfg["video"])
+    if not cap.isOpened():
+        raise IOError(f"Erro ao abrir o vídeo de entrada: {cfg['video']}")
+
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                  int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    processor = headless.FrameProcessor(mode, cfg, frame_size)
+    try:
+        return _processChunk(mode, cap, processor, index, start, end, warmup)
+    finally:
+        processor.close()
+        cap.release()
+
+
+def _processChunk(mode, cap, processor, index, start, end, warmup):
+    """
+    Laço de _chunkWorker (o processor é fechado por ele).
+    """
+    seek = max(0, start - warmup)
+    if seek > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, seek)
+        # Alguns codecs não posicionam exatamente: usa a posição real
+        seek = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+    result = {"chunk": index, "start": start, "end": end, "warmup": start - seek,
+              "frames": 0, "detections": 0}
+    if mode == "contador":
+        result.update(cars=0, trucks=0, counted=[])
+    elif mode == "movimento":
+        result["motion_frames"] = 0
+    else:
+        result["warnings"] = 0
+
+    t0 = time.perf_counter()
+    frame_no = seek
+    baseline = processor.counts()
+    while frame_no < end:
+        ok, frame = cap.read()
+        if not ok:
+            break
+
+        if frame_no == start:
+            # Totais do pré-aquecimento pertencem ao trecho anterior
+            baseline = processor.counts()
+        events = processor.process(frame)
+        frame_no += 1
+        if frame_no - 1 < start:
+            continue  # pré-aquecimento: atualiza modelos, descarta eventos
+
+        global_frame = frame_no - 1
+        result["frames"] += 1
+
+        detections = [e for e in events if e["event"] == "detection"]
+        result["detections"] += len(detections)
+
+        if mode == "contador":
+            # Com zonas, counted marca cada cruzamento (não uma vez por objeto)
+            for e in detections:
+                if e["counted"] and "zone" not in e:
+                    result["counted"].append([global_frame, e["type"], e["id"]])
+        elif mode == "movimento":
+            result["motion_frames"] += bool(detections)
+        else:
+            result["warnings"] += sum(e["warning"] for e in detections)
+
+    if mode == "contador":
+        counts = processor.counts()
+        result["cars"] = counts["cars"] - baseline["cars"]
+        result["trucks"] = counts["trucks"] - baseline["trucks"]
+        if "zones" in counts:
+            result["zones"] = _combine(counts["zones"], baseline["zones"], -1)
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    return result
+
+
+def runChunked(mode, cfg, chunks=None, warmup=500, workers=None):
+    """
+    Processa cfg["video"] em trechos paralelos e junta os resultados.
+    """
+    if cfg["count_store"] or cfg["checkpoint"]:
+        raise ValueError("chunked não aceita count_store nem checkpoint "
+                         "(todos os trechos gravariam na mesma pasta)")
+
+    cap = cv2.VideoCapture(cfg["video"])
+    if not cap.isOpened():
+        raise IOError(f"Erro ao abrir o vídeo de entrada: {cfg['video']}")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total_frames <= 0:
+        raise ValueError("Não foi possível obter o número de frames do vídeo")
+
+    workers = workers or os.cpu_count() or 1
+    ranges = splitChunks(total_frames, chunks or workers)
+
+    cfg = dict(cfg, detections=True, counts_every=0, pipeline=False)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        futures = [pool.submit(_chunkWorker, mode, cfg, i, s, e, warmup)
+                   for i, (s, e) in enumerate(ranges)]
+        parts = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+
+    frames = sum(p["frames"] for p in parts)
+    report = {
+        "event": "summary",
+        "video": cfg["video"],
+        "chunks": parts,
+        "frames": frames,
+        "detections": sum(p["detections"] for p in parts),
+        "seconds": round(elapsed, 3),
+        "fps": round(frames / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    if mode == "contador":
+        report["cars"] = sum(p["cars"] for p in parts)
+        report["trucks"] = sum(p["trucks"] for p in parts)
+        if cfg["zones"]:
+            zone_totals = parts[0]["zones"]
+            for p in parts[1:]:
+                zone_totals = _combine(zone_totals, p["zones"])
+            report["zones"] = zone_totals
+    elif mode == "movimento":
+        report["motion_frames"] = sum(p["motion_frames"] for p in parts)
+    else:
+        report["warnings"] = sum(p["warnings"] for p in parts)
+    return report
+
+
+def main(argv=None):
+    parser = headless.buildParser()
+    parser.description = "Processa um vídeo longo em trechos paralelos."
+    parser.add_argument("--chunks", type=int, help="número de trechos (padrão: núcleos)")
+    parser.add_argument("--warmup", type=int, default=500,
+                        help="frames de pré-aquecimento antes de cada trecho")
+    parser.add_argument("--workers", type=int, help="máximo de processos simultâneos")
+    args = parser.parse_args(argv)
+
+    extra = {"chunks": args.chunks, "warmup": args.warmup, "workers": args.workers}
+    for key in extra:
+        delattr(args, key)
+    cfg = headless.loadConfig(args.mode, args)
+
+    report = runChunked(args.mode, cfg, extra["chunks"], extra["warmup"], extra["workers"])
+
+    text = json.dumps(report, ensure_ascii=False)
+    if cfg["output"] == "-":
+        print(text)
+    else:
+        with open(cfg["output"], "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
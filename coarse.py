@@ -0,0 +1,258 @@
+# coarse.py
+"""
+Detecção em duas resoluções (coarse-to-fine).
+
+1. Passada grosseira: a imagem (frame ou ROI) é reduzida por `factor`
+   (0.25 = 1/16 dos pixels) e o BGS + limpeza (engine.MaskEngine) rodam
+   nela. Os blobs dessa máscara, com um limite de área bem baixo
+   (`candidate_min_area`, em px da imagem reduzida), são as regiões
+   candidatas.
+2. Passada fina: cada região candidata, levada à resolução nativa e
+   ampliada por `margin` px, é refeita em resolução nativa: diferença
+   absoluta (tons de cinza) para um fundo nativo, limiar, a mesma limpeza
+   (kernels + blur mediano) e extração dos blobs com os limites de área
+   nativos. Área, caixa e centróide saem em px nativos, então um veículo
+   pequeno ou distante que a redução apagaria (ou que ficaria abaixo do
+   minArea) é medido com a precisão da resolução cheia.
+
+O fundo nativo é uma média móvel (cv2.accumulateWeighted) em tons de
+cinza, atualizada a cada frame só onde a máscara grosseira não viu
+movimento (veículos não "entram" no fundo). Ela vai no checkpoint
+(fineBackground/seedFine) junto com a imagem de fundo do BGS. Regiões que se sobrepõem são
+unidas antes do refinamento, para um blob não sair duas vezes.
+
+Custo por frame: BGS na imagem reduzida + conversão para cinza e média
+móvel na resolução nativa (bem mais baratas que o BGS) + limpeza e
+extração só dentro das regiões candidatas.
+"""
+import math
+
+import numpy as np
+import cv2
+
+import blobs                     # usa blobs.findBlobs
+import buffers                   # usa buffers.FrameBuffers
+import engine                    # usa engine.MaskEngine
+import profiler                  # usa profiler.DISABLED
+import tiles                     # usa tiles.filterReach
+
+NO_BLOBS = (np.zeros((0, 4), np.int64), np.zeros(0))
+
+
+def mergeRects(rects):
+    """
+    Une os retângulos (x0, y0, x1, y1) que se sobrepõem até não sobrar
+    nenhuma sobreposição.
+    """
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for r in rects:
+            for i, o in enumerate(out):
+                if r[0] < o[2] and o[0] < r[2] and r[1] < o[3] and o[1] < r[3]:
+                    out[i] = (min(r[0], o[0]), min(r[1], o[1]), max(r[2], o[2]), max(r[3], o[3]))
+                    merged = True
+                    break
+            else:
+                out.append(r)
+        rects = out
+    return rects
+
+
+class CoarseToFine:
+    """
+    BGS na resolução reduzida + refinamento dos blobs na resolução nativa.
+    Mesma interface de engine.MaskEngine (foreground/clean/...), mais blobs().
+    """
+
+    def __init__(self, factor, bgs, kernels, median_blur=0, bgs_params=None, threshold=25,
+                 candidate_min_area=4, margin=None, learning_rate=0.02, grow_steps=3,
+                 bufs=buffers.DISABLED, prof=None, iterations=2):
+        """
+        Parâmetros:
+            factor            : redução da passada grosseira (ex.: 0.25)
+            bgs, kernels, median_blur, bgs_params: como em engine.MaskEngine
+                                (os kernels valem nas duas passadas)
+            threshold         : diferença mínima (tons de cinza) para o fundo nativo
+            candidate_min_area: área mínima (px reduzidos) de uma região candidata
+            margin            : px nativos em volta de cada região (None = alcance
+                                dos filtros + um pixel grosseiro)
+            learning_rate     : taxa da média móvel do fundo nativo
+            grow_steps        : vezes que uma região pode crescer (ver blobs())
+            bufs, prof        : buffers.FrameBuffers e profiler.StageProfiler
+            iterations        : passadas de cada operação morfológica (nas duas passadas)
+        """
+        if not 0 < factor < 1:
+            raise ValueError("factor deve estar entre 0 e 1")
+        self.factor = factor
+        self.threshold = threshold
+        self.candidate_min_area = candidate_min_area
+        self.learning_rate = learning_rate
+        self.grow_steps = grow_steps
+        self.bufs = bufs
+        self.prof = prof or profiler.DISABLED
+
+        self.engine = engine.MaskEngine(bgs, kernels, median_blur, bgs_params, bufs=bufs, prof=prof,
+                                        iterations=iterations)
+        self.kernels = self.engine.kernels
+        self.median_blur = median_blur
+        self.iterations = iterations
+        if margin is None:
+            margin = tiles.filterReach(kernels, median_blur, iterations) + math.ceil(1 / factor)
+        self.margin = margin
+
+        self.background = None      # fundo nativo (float32, cinza)
+        self._gray = None
+        self.frames = 0
+        self.regions = 0
+        self.refined_pixels = 0
+
+    def close(self):
+        self.engine.close()
+
+    def foreground(self, image):
+        """
+        Máscara bruta da passada grosseira (tamanho reduzido); atualiza o
+        fundo nativo com o frame.
+        """
+        prof, bufs = self.prof, self.bufs
+        with prof.stage("coarse_resize"):
+            small = cv2.resize(image, (0, 0), dst=bufs.get("coarse", buffers.scaledShape(image.shape, self.factor)),
+                               fx=self.factor, fy=self.factor, interpolation=cv2.INTER_AREA)
+        fgmask = self.engine.foreground(small)
+
+        with prof.stage("fine_background"):
+            height, width = image.shape[:2]
+            gray = image
+            if image.ndim == 3:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=bufs.get("gray", (height, width)))
+            if self.background is None:
+                self.background = gray.astype(np.float32)
+            else:
+                # Só os pixels sem movimento na passada grosseira aprendem
+                moving = cv2.resize(fgmask, (width, height), dst=bufs.get("coarse_up", (height, width)),
+                                    interpolation=cv2.INTER_NEAREST)
+                static = cv2.compare(moving, 0, cv2.CMP_EQ, dst=bufs.get("static", (height, width)))
+                cv2.accumulateWeighted(gray, self.background, self.learning_rate, mask=static)
+        self._gray = gray
+        self.frames += 1
+        return fgmask
+
+    def clean(self, fgmask):
+        """
+        Limpeza da máscara grosseira.
+        """
+        return self.engine.clean(fgmask)
+
+    def mask(self, image):
+        return self.clean(self.foreground(image))
+
+    def backgroundImage(self):
+        """
+        Imagem de fundo do BGS da passada grosseira (tamanho reduzido).
+        """
+        return self.engine.backgroundImage()
+
+    def seed(self, background, times):
+        """
+        Semeia o BGS grosseiro com uma imagem de fundo (tamanho reduzido).
+        """
+        self.engine.seed(background, times)
+
+    def fineBackground(self):
+        """
+        Cópia do fundo nativo (para o checkpoint; a original continua sendo
+        atualizada pelos próximos frames). None antes do primeiro frame.
+        """
+        return None if self.background is None else self.background.copy()
+
+    def seedFine(self, background):
+        """
+        Restaura o fundo nativo salvo por fineBackground() (retomada).
+        """
+        self.background = np.asarray(background, dtype=np.float32).copy()
+
+    def candidates(self, fgmask):
+        """
+        Regiões candidatas (x0, y0, x1, y1) em px nativos, já unidas.
+        """
+        boxes, _, _ = blobs.findBlobs(fgmask, "components", self.candidate_min_area)
+        height, width = self._gray.shape[:2]
+        scale, margin = 1 / self.factor, self.margin
+        rects = [(max(0, int(x * scale) - margin), max(0, int(y * scale) - margin),
+                  min(width, math.ceil((x + w) * scale) + margin),
+                  min(height, math.ceil((y + h) * scale) + margin))
+                 for x, y, w, h in boxes.tolist()]
+        return mergeRects(rects)
+
+    def _refine(self, rect, backend):
+        x0, y0, x1, y1 = rect
+        region = self._gray[y0:y1, x0:x1]
+        diff = cv2.absdiff(region, cv2.convertScaleAbs(self.background[y0:y1, x0:x1]))
+        _, mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+        mask = engine.cleanMask(mask, self.kernels, self.median_blur, iterations=self.iterations)
+        boxes, areas, _ = blobs.findBlobs(mask, backend)
+        self.regions += 1
+        self.refined_pixels += region.size
+        return boxes, areas
+
+    def _grow(self, rect, boxes):
+        """
+        Região ampliada para os lados em que algum blob encosta na borda
+        dela (o objeto continua fora da região candidata).
+        """
+        x0, y0, x1, y1 = rect
+        height, width = self._gray.shape[:2]
+        w, h = x1 - x0, y1 - y0
+        touches = np.zeros(4, dtype=bool)
+        if len(boxes):
+            touches[:] = (np.any(boxes[:, 0] == 0), np.any(boxes[:, 1] == 0),
+                          np.any(boxes[:, 0] + boxes[:, 2] == w), np.any(boxes[:, 1] + boxes[:, 3] == h))
+        step_x, step_y = max(self.margin, w // 2), max(self.margin, h // 2)
+        return (max(0, x0 - step_x) if touches[0] else x0, max(0, y0 - step_y) if touches[1] else y0,
+                min(width, x1 + step_x) if touches[2] else x1, min(height, y1 + step_y) if touches[3] else y1)
+
+    def blobs(self, fgmask, backend="contours", min_area=0, max_area=None, inclusive_min=True):
+        """
+        Blobs refinados na resolução nativa a partir da máscara grosseira
+        limpa. Retorna (boxes, areas) em px nativos (limites de área nativos).
+
+        Um blob que encosta na borda da sua região (a passada grosseira viu
+        só parte do objeto) faz a região crescer para aquele lado e ser
+        refeita, até `grow_steps` vezes.
+        """
+        with self.prof.stage("refine"):
+            rects = self.candidates(fgmask)
+            done = {}
+            for step in range(self.grow_steps + 1):
+                # Limites de área só no fim: um pedaço pequeno também faz crescer
+                for rect in rects:
+                    if rect not in done:
+                        done[rect] = self._refine(rect, backend)
+                if step == self.grow_steps:
+                    break
+                grown = mergeRects([self._grow(rect, done[rect][0]) for rect in rects])
+                if grown == rects:
+                    break
+                rects = grown
+
+        found = []
+        for x0, y0, x1, y1 in rects:
+            boxes, areas = done[(x0, y0, x1, y1)]
+            keep = blobs.areaMask(areas, min_area, max_area, inclusive_min)
+            boxes = boxes[keep]
+            boxes[:, :2] += (x0, y0)
+            found.append((boxes, areas[keep]))
+        if not found:
+            return NO_BLOBS
+        return np.concatenate([b for b, _ in found]), np.concatenate([a for _, a in found])
+
+    def stats(self):
+        """
+        Regiões refinadas por frame e fração da imagem nativa processada.
+        """
+        frames = max(1, self.frames)
+        pixels = self._gray.size if self._gray is not None else 1
+        return {"regions_per_frame": round(self.regions / frames, 2),
+                "refined_fraction": round(self.refined_pixels / (pixels * frames), 4)}
@@ -2,9 +2,21 @@
 import numpy as np
 import cv2
 import sys
-import os
 import time
 import validator                 # usa validator.SimpleValidator
+import snapshots                 # usa snapshots.SnapshotWriter
+import archive                   # usa archive.SnapshotStore
+import pipeline                  # usa pipeline.FramePipeline
+import profiler                  # usa profiler.StageProfiler
+import gate                      # usa gate.MotionGate
+import stride                    # usa stride.AdaptiveStride
+import buffers                   # usa buffers.FrameBuffers
+import blobs                     # usa blobs.findBlobs
+import engine                    # usa engine.MaskEngine
+import coarse                    # usa coarse.CoarseToFine
+import zones                     # usa zones.buildZones
+import recorder                  # usa recorder.VideoRecorder
+import countstore                # usa countstore.CountStore
 from random import randint
 
 # =====================================================================
@@ -25,191 +37,432 @@ FONT = cv2.FONT_HERSHEY_SIMPLEX
 VIDEO_SOURCE = "video/cars.mp4"
 VIDEO_OUT = "videos/results/result_traffic.mp4"
 
+# Vídeo anotado (caixas, rótulos, contagens) gravado em VIDEO_OUT por uma
+# thread própria (recorder.py), sem atrasar a detecção
+RECORD = False
+RECORD_CODEC = "mp4v"            # FourCC: "mp4v", "XVID", "MJPG", "avc1", ...
+RECORD_EVERY = 1                 # grava 1 a cada N frames (o vídeo sai com fps / N)
+RECORD_SEGMENTS = False          # só trechos em volta das contagens (um arquivo por trecho)
+RECORD_PRE = 2.0                 # segundos gravados antes / depois de cada contagem
+RECORD_POST = 3.0
+RECORD_POLICY = "block"          # "block" ou "drop-newest" (fila cheia: descarta o frame)
+
 # Tipos de background subtractor disponíveis
-BGS_TYPES = ["GMG", "MOG", "MOG2", "KNN", "CNT"]
+BGS_TYPES = engine.BGS_TYPES
 BGS_TYPE = BGS_TYPES[2]   # "MOG2"
 
-# =====================================================================
-# FUNÇÕES AUXILIARES
-# =====================================================================
-
-def getKernerl(KERNEL_TYPE):
-    """
-    Retorna os kernels usados nos filtros morfológicos.
-    Mantém exatamente a sua lógica original.
-    """
-    if KERNEL_TYPE == "dilation":
-        return cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-    return np.ones((3, 3), np.uint8)
-
-
-def getFilter(img, filter):
-    """
-    Pipeline de filtragem:
-        closing -> opening -> dilation
-    Mantém o comportamento original (equivalente ao 'combine').
-    """
-    closing = cv2.morphologyEx(img, cv2.MORPH_CLOSE, getKernerl("closing"), iterations=2)
-    opening = cv2.morphologyEx(closing, cv2.MORPH_OPEN, getKernerl("opening"), iterations=2)
-    return cv2.dilate(opening, getKernerl("dilation"), iterations=2)
-
-
-def getBGSubtractor(BGS_TYPE):
-    """
-    Escolhe o subtractor (MOG2/KNN).
-    """
-    if BGS_TYPE == "MOG2":
-        return cv2.createBackgroundSubtractorMOG2()
-    if BGS_TYPE == "KNN":
-        return cv2.createBackgroundSubtractorKNN()
+# Kernels (altura, largura) de closing, opening e dilation (engine.getKernels)
+KERNELS = [[3, 3], [3, 3], [3, 3]]
+
+# Perfil de câmera gerado pelo autotune.py (JSON): substitui o BGS, os
+# kernels, as iterações e o blur mediano acima pelos ajustados para a
+# câmera. None = usa as constantes.
+CAMERA_PROFILE = None
+
+# Modo pipeline: leitura, processamento e exibição em threads separadas
+# ligadas por filas limitadas (política "block" ou "drop-oldest")
+PIPELINE_MODE = False
+QUEUE_SIZE = 4
+QUEUE_POLICY = "block"
+
+# Profiling por estágio (latência p50/p95/p99, FPS, filas); .json ou .csv
+PROFILE = False
+PROFILE_OUT = "profile_contador.json"
+
+# Gate de movimento: pula morfologia/contornos quando nada se move na ROI
+GATE = False
+GATE_MIN_FRACTION = 0.001        # fração mínima de pixels em movimento
+GATE_HOLD = 5                    # frames processados após o último movimento
+
+# Passo adaptativo: se o processamento não acompanhar o vídeo, analisa 1 a
+# cada N frames (o validator prevê a posição dos veículos nos frames pulados).
+# Só no loop serial; no modo pipeline, QUEUE_POLICY = "drop-oldest" descarta
+# frames e process() recebe o passo do mesmo jeito.
+ADAPTIVE_STRIDE = False
+MAX_STRIDE = 4
+LATENCY_CEILING = 1.0            # atraso máximo (s) antes de um salto de catch-up
+
+# Buffers pré-alocados: frame decodificado e máscaras escritos sempre nos
+# mesmos arrays (sem alocação por frame em regime)
+REUSE_BUFFERS = True
+
+# Extração dos blobs: "contours" (findContours) ou "components"
+# (connectedComponentsWithStats, vetorizado; compensa em frames lotados)
+EXTRACTION = "contours"
+
+# Blocos (vídeo 4K): divide a ROI numa grade (colunas, linhas) e roda BGS +
+# filtros de cada bloco numa thread (ex.: (2, 2)). None = ROI inteira.
+TILES = None
+TILE_WORKERS = None              # threads (None = uma por bloco)
+
+# Duas resoluções (ROI grande, veículos pequenos/distantes): BGS + filtros na
+# ROI reduzida por COARSE (ex.: 0.25) e cada região com movimento refeita em
+# resolução nativa, com área e caixa em px nativos (coarse.py). None = desligado.
+# Não combina com TILES nem com ZONES.
+COARSE = None
+COARSE_THRESHOLD = 25            # diferença mínima para o fundo nativo (tons de cinza)
+COARSE_MIN_AREA = 4              # área mínima (px reduzidos) de uma região candidata
+
+# Zonas de contagem: várias ROIs nomeadas, cada uma com o seu validator e
+# linhas/polígonos de contagem por sentido, num único decode e num único
+# background subtraction (formato em zones.py), ex.:
+#   ZONES = [{"name": "norte", "roi": [0, 0, 640, 360],
+#             "lines": [{"name": "faixa1", "start": [0, 200], "end": [640, 200],
+#                        "directions": ["desce", "sobe"]}]}]
+# None = uma ROI escolhida com cv2.selectROI e a regra de entrada pela
+# borda superior.
+ZONES = None
+ZONE_COLOR = (255, 255, 0)
+
+# Contagens por intervalo de tempo (por zona, tipo e contador/sentido) numa
+# pasta colunar para painéis e consultas por período (countstore.py).
+# O instante de cada frame é o início da execução + frame / fps do vídeo.
+# None = desligado.
+COUNT_STORE = None               # ex.: "counts"
+COUNT_INTERVAL = 60              # segundos por bucket
+
+# Gravação dos recortes dos veículos contados (em segundo plano)
+SNAPSHOT_DIR = "vehicles"
+SNAPSHOT_FORMAT = "jpg"          # "jpg", "png" ou "webp"
+SNAPSHOT_QUALITY = 90
+SNAPSHOT_POLICY = "block"        # "block", "drop-newest" ou "drop-oldest"
+SNAPSHOT_VERBOSE = False         # imprime cada recorte gravado (da thread de gravação)
+
+# Arquivo único de snapshots (segmentos + índice) em vez de um .jpg por veículo
+SNAPSHOT_ARCHIVE = False
+SNAPSHOT_ARCHIVE_DIR = "vehicles_archive"
 
-    print("Tipo inválido")
-    sys.exit(1)
-
-
-def getCentroid(x, y, w, h):
-    """
-    Calcula o centróide do bounding box.
-    """
-    return x + w//2, y + h//2
-
-
-# ============================================================
+# =====================================================================
 # FUNÇÃO PARA SALVAR IMAGEM DE CADA VEÍCULO CONTADO
-# ============================================================
+# =====================================================================
 
-def save_vehicle_image(roi_frame, x, y, w, h, vtype, vid):
+def save_vehicle_image(snapshot_writer, roi_frame, x, y, w, h, vtype, vid, frame_no=-1, zone=None):
     """
     Salva a imagem (recorte) do veículo dentro da ROI, quando ele é CONTADO.
+    A gravação é feita em segundo plano pelo snapshot_writer; aqui só é
+    feita a cópia do recorte (antes de qualquer desenho na ROI).
     Parâmetros:
+        snapshot_writer: snapshots.SnapshotWriter que grava o recorte
         roi_frame : recorte da ROI (imagem)
         x, y, w, h: bounding box do veículo dentro da ROI
         vtype     : "CAR" ou "TRUCK" (string de exibição)
         vid       : ID numérico do objeto (proveniente do validator)
+        frame_no  : índice do frame (usado no índice do arquivo de snapshots)
+        zone      : nome da zona que contou o veículo (None sem zonas)
     """
-    # Garantir limites válidos do recorte
-    h_roi, w_roi = roi_frame.shape[:2]
-    x0 = max(0, x)
-    y0 = max(0, y)
-    x1 = min(w_roi, x + w)
-    y1 = min(h_roi, y + h)
-
-    if x1 <= x0 or y1 <= y0:
-        return  # bounding inválido, não salva
-
-    crop = roi_frame[y0:y1, x0:x1]
-
-    if crop.size == 0:
-        return
-
-    # Pasta de saída
-    out_dir = "vehicles"
-    os.makedirs(out_dir, exist_ok=True)
-
-    # Nome do arquivo: tipo + id + timestamp
-    ts = int(time.time())
-    filename = os.path.join(out_dir, f"{vtype}_{vid}_{ts}.jpg")
+    crop = snapshots.cropBox(roi_frame, x, y, w, h)
 
-    cv2.imwrite(filename, crop)
-    print(f"[INFO] Veículo salvo: {filename}")
-
-
-# =====================================================================
-# INICIALIZAÇÃO DO VÍDEO E ROI
-# =====================================================================
-
-cap = cv2.VideoCapture(VIDEO_SOURCE)
-ok, frame = cap.read()
-
-if not ok:
-    print("Erro ao abrir o vídeo de entrada.")
-    sys.exit(1)
+    if crop is None or crop.size == 0:
+        return  # bounding inválido, não salva
 
-# Selecionar ROI manualmente
-bbox = cv2.selectROI(frame, False)
-(w1, h1, w2, h2) = bbox  # x, y, width, height
+    snapshot_writer.submit(crop, vtype, vid, frame_no, zone)
 
-# Cálculo da área e filtros
-frameArea = w2 * h2
-minArea = int(frameArea / 250)
-maxArea = 15000
 
-# Instancia background subtractor
-bg = getBGSubtractor(BGS_TYPE)
+def drawZones(frame, zone_list):
+    """
+    Desenha as zonas (ROI, linhas e polígonos) e os cruzamentos por sentido.
+    """
+    for zone in zone_list:
+        x, y, w, h = zone.roi
+        cv2.rectangle(frame, (x, y), (x + w, y + h), ZONE_COLOR, 1)
+        cars, trucks = zone.validator.get_counts()
+        cv2.putText(frame, f"{zone.name}: {cars} cars / {trucks} trucks", (x + 5, y + h - 10),
+                    FONT, 0.5, ZONE_COLOR, 1)
+
+        crossings = zone.validator.get_crossings()
+        for counter in zone.counters:
+            if isinstance(counter, zones.CountingLine):
+                start = tuple(int(v) for v in counter.start)
+                cv2.line(frame, start, tuple(int(v) for v in counter.end), ZONE_COLOR, 2)
+            else:
+                start = tuple(int(v) for v in counter.points[0])
+                cv2.polylines(frame, [counter.points.astype(np.int32)], True, ZONE_COLOR, 2)
+            totals = " ".join(f"{d}: {sum(types.values())}" for d, types in crossings[counter.name].items())
+            cv2.putText(frame, f"{counter.name} {totals}", (start[0] + 5, start[1] - 5),
+                        FONT, 0.5, ZONE_COLOR, 1)
 
-# Instancia o validator (conta e identifica veículos)
-# Dica: ajuste 'truck_area_threshold' conforme seu vídeo
-validator_instance = validator.SimpleValidator(
-    min_area=minArea,
-    truck_area_threshold=5000
-)
 
 # =====================================================================
-# LOOP PRINCIPAL
+# EXECUÇÃO
 # =====================================================================
 
-frame_index = 0
-
-while cap.isOpened():
+def main():
+    # -----------------------------------------------------------------
+    # Inicialização do vídeo e ROI
+    # -----------------------------------------------------------------
+    cap = cv2.VideoCapture(VIDEO_SOURCE)
     ok, frame = cap.read()
-    if not ok:
-        break
-
-    # Recorte correto da ROI (sem step acidental)
-    roi = frame[h1:h1 + h2, w1:w1 + w2]
-
-    # Subtração de fundo + limpeza
-    fgmask = bg.apply(roi)
-    fgmask = getFilter(fgmask, "combine")
-
-    # Encontrar contornos dentro da ROI
-    contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-    for cnt in contours:
-        area = cv2.contourArea(cnt)
-
-        # Filtragem básica de ruído
-        if minArea < area <= maxArea:
-
-            # Bounding box e centróide
-            x, y, w, h = cv2.boundingRect(cnt)
-            cx, cy = getCentroid(x, y, w, h)
-
-            # --------------------------
-            #  PASSA PARA O VALIDATOR
-            #  (agora retorna também o ID do objeto)
-            # --------------------------
-            vtype, counted, vid = validator_instance.register(cx, cy, int(area))
-
-            # Label para exibição
-            label = "TRUCK" if vtype == "truck" else ("CAR" if vtype != "ignore" else "IGNORE")
-
-            # Salvar imagem somente quando o veículo é contado (ou seja, entrou)
-            if counted and vtype != "ignore" and vid is not None:
-                # Salva o recorte do veículo dentro da ROI
-                save_vehicle_image(roi, x, y, w, h, label, vid)
-
-            # Desenha a detecção no ROI
-            cv2.rectangle(roi, (x, y), (x+w, y+h), BOUNDING_BOX_COLLOR, 2)
-            cv2.putText(roi, label, (x, y-5), FONT, 0.7, (255,255,255), 2)
-
-    # Devolve o ROI processado para o frame original
-    frame[h1:h1 + h2, w1:w1 + w2] = roi
-
-    # Obtém contagem atual
-    cars, trucks = validator_instance.get_counts()
-
-    # Exibe contagem no frame principal
-    cv2.putText(frame, f"Cars Entered: {cars}", (20, 50), FONT, 1, (0,255,0), 2)
-    cv2.putText(frame, f"Trucks Entered: {trucks}", (20, 100), FONT, 1, (0,165,255), 2)
-
-    # Mostrar telas
-    cv2.imshow("Frame", frame)
-    cv2.imshow("Mask", fgmask)
-
-    # Encerrar no Q
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
+    if not ok:
+        print("Erro ao abrir o vídeo de entrada.")
+        sys.exit(1)
+
+    # Selecionar ROI manualmente (ou o retângulo que envolve todas as zonas)
+    if ZONES:
+        zone_list = zones.buildZones(ZONES)
+        bbox = zones.unionROI(zone_list)
+    else:
+        bbox = cv2.selectROI(frame, False)
+        zone_list = [zones.Zone("roi", bbox)]
+    (w1, h1, w2, h2) = bbox  # x, y, width, height
+
+    # Cálculo da área e filtros (por zona, se a zona não definir os seus)
+    maxArea = 15000
+    for zone in zone_list:
+        frameArea = zone.roi[2] * zone.roi[3]
+        if zone.min_area is None:
+            zone.min_area = int(frameArea / 250)
+        if zone.max_area is None:
+            zone.max_area = maxArea
+
+    # Instrumentação (custo praticamente nulo com PROFILE = False)
+    prof = profiler.StageProfiler(enabled=PROFILE, dump_path=PROFILE_OUT)
+
+    # Gate de movimento
+    motion_gate = gate.MotionGate(GATE, GATE_MIN_FRACTION, GATE_HOLD)
+
+    # Buffers reaproveitados; no pipeline, as máscaras de até QUEUE_SIZE + 2
+    # frames ficam vivas ao mesmo tempo (fila de render)
+    frame_buffers = buffers.FrameBuffers(QUEUE_SIZE + 2 if PIPELINE_MODE else 1, REUSE_BUFFERS)
+
+    # Com várias zonas (tamanhos diferentes), a extração aloca os seus arrays
+    blob_buffers = frame_buffers if len(zone_list) == 1 else buffers.DISABLED
+
+    # Background subtractor + filtros (engine.py); no modo em blocos, um BGS
+    # por bloco e as máscaras costuradas na ROI inteira; no modo COARSE, BGS
+    # na ROI reduzida e blobs refinados em resolução nativa. CAMERA_PROFILE
+    # sobrepõe o BGS e os filtros
+    if COARSE and (TILES or ZONES):
+        print("COARSE não combina com TILES nem com ZONES")
+        sys.exit(1)
+    detection = {"bgs": BGS_TYPE, "bgs_params": None, "kernels": KERNELS, "iterations": 2,
+                 "median_blur": 0}
+    try:
+        if CAMERA_PROFILE:
+            detection.update(engine.loadProfile(CAMERA_PROFILE))
+        if COARSE:
+            mask_engine = coarse.CoarseToFine(COARSE, detection["bgs"], detection["kernels"],
+                                              detection["median_blur"], detection["bgs_params"],
+                                              threshold=COARSE_THRESHOLD,
+                                              candidate_min_area=COARSE_MIN_AREA, bufs=frame_buffers,
+                                              prof=prof, iterations=detection["iterations"])
+        else:
+            mask_engine = engine.MaskEngine(detection["bgs"], detection["kernels"],
+                                            detection["median_blur"], detection["bgs_params"],
+                                            size=(w2, h2), grid=TILES, tile_workers=TILE_WORKERS,
+                                            bufs=frame_buffers, prof=prof,
+                                            iterations=detection["iterations"])
+    except ValueError:
+        print("Tipo inválido")
+        sys.exit(1)
+
+    # Gravador assíncrono dos recortes
+    snapshot_store = archive.SnapshotStore(SNAPSHOT_ARCHIVE_DIR) if SNAPSHOT_ARCHIVE else None
+    snapshot_writer = snapshots.SnapshotWriter(
+        out_dir=SNAPSHOT_DIR,
+        fmt=SNAPSHOT_FORMAT,
+        quality=SNAPSHOT_QUALITY,
+        policy=SNAPSHOT_POLICY,
+        verbose=SNAPSHOT_VERBOSE,
+        store=snapshot_store
+    )
+
+    # Gravador do vídeo anotado
+    video_recorder = None
+    if RECORD:
+        video_recorder = recorder.VideoRecorder(
+            VIDEO_OUT, cap.get(cv2.CAP_PROP_FPS), RECORD_CODEC, RECORD_EVERY,
+            RECORD_SEGMENTS, RECORD_PRE, RECORD_POST, policy=RECORD_POLICY
+        )
+
+    # Contagens por intervalo de tempo
+    count_store = None
+    if COUNT_STORE:
+        count_store = countstore.CountStore(COUNT_STORE, COUNT_INTERVAL)
+        clock_start = time.time()
+        video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    # Instancia um validator por zona (conta e identifica veículos)
+    # Dica: ajuste 'truck_area_threshold' conforme seu vídeo
+    for zone in zone_list:
+        zone.validator = validator.SimpleValidator(
+            min_area=zone.min_area,
+            truck_area_threshold=zone.truck_area_threshold or 5000,
+            counters=zone.localCounters() or None
+        )
+
+    # -----------------------------------------------------------------
+    # Loop principal
+    # -----------------------------------------------------------------
+    frame_index = 0
+
+    def process(frame, step=1):
+        """
+        Processa um frame: BGS + filtros + contornos + validator + desenho.
+        step > 1 indica que step - 1 frames foram pulados antes deste.
+        Retorna (frame anotado, máscara).
+        """
+        nonlocal frame_index
+        frame_buffers.advance()
+
+        # Recorte correto da ROI (sem step acidental). É uma view: o que for
+        # desenhado nela já aparece no frame, sem cópia de volta.
+        roi = frame[h1:h1 + h2, w1:w1 + w2]
+
+        # Subtração de fundo (sempre: o modelo de fundo continua aprendendo)
+        fgmask = mask_engine.foreground(roi)
+
+        # Detecções de cada zona: bounding boxes (x, y, w, h) e áreas
+        zone_blobs = [(np.zeros((0, 4), np.int64), np.zeros(0))] * len(zone_list)
+
+        # Gate de movimento: sem movimento, pula limpeza e contornos
+        if motion_gate.check(fgmask):
+            with motion_gate.measure():
+                # Limpeza
+                fgmask = mask_engine.clean(fgmask)
+
+                # Blobs de cada zona (no seu pedaço da máscara), já com a
+                # filtragem básica de ruído (minArea < área <= maxArea) aplicada
+                with prof.stage("find_contours"):
+                    if COARSE:
+                        zone = zone_list[0]
+                        zone_blobs = [mask_engine.blobs(fgmask, EXTRACTION, zone.min_area,
+                                                        zone.max_area, inclusive_min=False)]
+                    else:
+                        zone_blobs = [blobs.findBlobs(zone.view(fgmask, (w1, h1)), EXTRACTION,
+                                                      zone.min_area, zone.max_area,
+                                                      inclusive_min=False, bufs=blob_buffers)[:2]
+                                      for zone in zone_list]
+
+        # --------------------------
+        #  PASSA O FRAME INTEIRO PARA O VALIDATOR DE CADA ZONA
+        #  (associação 1-para-1; também avança o frame e expira objetos)
+        # --------------------------
+        frame_index += step
+        detections = []
+        event = False    # algum veículo contado (ou cruzamento) neste frame
+        for zone, (boxes, areas) in zip(zone_list, zone_blobs):
+            before = zone.validator.get_counts()
+            with prof.stage("validator"):
+                vtypes, counted, vids = zone.validator.register_frame(
+                    blobs.centroids(boxes), areas.astype(np.int64), step)
+
+            # Veículos contados (diferença dos totais) e cruzamentos no bucket do frame
+            if count_store is not None:
+                ts = clock_start + frame_index / video_fps
+                for vtype, total, previous in zip(("car", "truck"), zone.validator.get_counts(), before):
+                    if total > previous:
+                        count_store.add(ts, zone.name, vtype, n=total - previous)
+                for _, counter, direction, vtype in zone.validator.frame_crossings:
+                    count_store.add(ts, zone.name, vtype, counter, direction)
+
+            # Labels para exibição
+            labels = ["TRUCK" if vtype == "truck" else ("CAR" if vtype != "ignore" else "IGNORE")
+                      for vtype in vtypes]
+
+            # Recorte da zona no frame (view, como a ROI)
+            zone_roi = zone.view(frame)
+
+            # Salvar imagem somente quando o veículo é contado (ou seja, entrou).
+            # Feito antes de desenhar, para nenhuma anotação aparecer no recorte.
+            zone_name = zone.name if ZONES else None
+            for (x, y, w, h), vtype, label, was_counted, vid in zip(boxes.tolist(), vtypes, labels, counted, vids):
+                if was_counted and vtype != "ignore" and vid >= 0:
+                    # Salva o recorte do veículo dentro da ROI
+                    with prof.stage("save_image"):
+                        save_vehicle_image(snapshot_writer, zone_roi, x, y, w, h,
+                                           label, int(vid), frame_index, zone_name)
+
+            detections.append((zone_roi, boxes.tolist(), labels))
+            event = event or bool(np.any(counted)) or bool(zone.validator.frame_crossings)
+
+        # Desenha as detecções no ROI
+        with prof.stage("draw"):
+            for zone_roi, boxes, labels in detections:
+                for (x, y, w, h), label in zip(boxes, labels):
+                    cv2.rectangle(zone_roi, (x, y), (x+w, y+h), BOUNDING_BOX_COLLOR, 2)
+                    cv2.putText(zone_roi, label, (x, y-5), FONT, 0.7, (255,255,255), 2)
+
+            if ZONES:
+                drawZones(frame, zone_list)
+
+            # Obtém contagem atual (soma das zonas)
+            counts = [zone.validator.get_counts() for zone in zone_list]
+            cars = sum(c for c, _ in counts)
+            trucks = sum(t for _, t in counts)
+
+            # Exibe contagem no frame principal
+            cv2.putText(frame, f"Cars Entered: {cars}", (20, 50), FONT, 1, (0,255,0), 2)
+            cv2.putText(frame, f"Trucks Entered: {trucks}", (20, 100), FONT, 1, (0,165,255), 2)
+
+        # Vídeo anotado (cópia do frame para a thread de gravação)
+        if video_recorder is not None:
+            with prof.stage("record"):
+                video_recorder.submit(frame, event)
+
+        return frame, fgmask
+
+    def render(item):
+        """
+        Exibe o resultado; retorna False quando o usuário pressiona Q.
+        """
+        frame, fgmask = item
+
+        # Mostrar telas
+        cv2.imshow("Frame", frame)
+        cv2.imshow("Mask", fgmask)
+
+        # Encerrar no Q
+        return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+    if PIPELINE_MODE:
+        pipeline.FramePipeline(cap, process, render, QUEUE_SIZE, QUEUE_POLICY, prof,
+                               reuse_frames=REUSE_BUFFERS, steps=True).run()
+    else:
+        pacer = stride.AdaptiveStride(cap.get(cv2.CAP_PROP_FPS), ADAPTIVE_STRIDE,
+                                      MAX_STRIDE, LATENCY_CEILING)
+        while cap.isOpened():
+            t0 = time.perf_counter()
+            step = pacer.step()
+            with prof.stage("decode"):
+                ok, frame = stride.advance(cap, step, frame if REUSE_BUFFERS else None)
+            if not ok:
+                break
+
+            result = process(frame, step)
+            with prof.stage("render"):
+                keep_going = render(result)
+            pacer.done(step, time.perf_counter() - t0)
+            prof.tick()
+            if not keep_going:
+                break
+
+        if ADAPTIVE_STRIDE:
+            print(pacer.report())
+
+    prof.close()
+    mask_engine.close()
+    snapshot_writer.close()
+    if snapshot_writer.errors:
+        print(f"[ERRO] {snapshot_writer.errors} snapshot(s) não gravado(s): {snapshot_writer.error}")
+    if video_recorder is not None:
+        video_recorder.close()
+        print(video_recorder.report())
+    if GATE:
+        print(motion_gate.report(cap.get(cv2.CAP_PROP_FPS)))
+    if COARSE:
+        print(f"[COARSE] {mask_engine.stats()}")
+    if ZONES:
+        for zone in zone_list:
+            print(f"[ZONA {zone.name}] {zone.validator.get_counts()} {zone.validator.get_crossings()}")
+    if snapshot_store is not None:
+        snapshot_store.close()
+    if count_store is not None:
+        count_store.close()
+        print(f"[COUNTS] {count_store.stats()}")
+    cap.release()
+    cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
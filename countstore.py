@@ -0,0 +1,403 @@
+# countstore.py
+"""
+Contagens agregadas em intervalos fixos de tempo (buckets), para painéis
+que cobrem meses de vídeo.
+
+Cada evento de contagem (veículo contado, cruzamento de um contador) soma 1
+no bucket do seu instante, na série (coluna) da sua zona e tipo:
+    "zona/tipo"                      veículos contados (um por objeto)
+    "zona/contador/sentido/tipo"     cruzamentos de uma linha/polígono
+
+As linhas (buckets) são densas a partir da origem (o início do bucket do
+primeiro evento): o bucket b cobre [origem + b * interval, origem +
+(b + 1) * interval). Consultas por intervalo e janelas móveis são fatias
+das colunas, O(buckets), sem reler os eventos.
+
+Pasta (formato colunar, append-only):
+    meta.json      : intervalo, origem, nomes das colunas e linhas gravadas
+    col-NNNN.i64   : uma coluna (int64 little-endian, um valor por bucket)
+
+Os buckets recentes ficam num array em memória; flush() acrescenta aos
+arquivos os buckets já fechados (todos menos o último, que ainda recebe
+eventos) e depois troca o meta.json com os.replace(). O meta.json manda:
+dados além das linhas dele (queda no meio de um flush) são truncados no
+flush seguinte. close() grava também o último bucket; ao reabrir a pasta
+ele volta para a memória e continua somando.
+
+Eventos de buckets já gravados (fora de ordem além de um bucket) não
+podem ser somados e são só contados em `late`.
+
+Seguro entre threads: a escrita (add/flush) e as consultas usam a mesma
+trava; as consultas copiam a parte em memória e leem dos arquivos só
+linhas já gravadas, que não mudam mais.
+
+Consulta pela linha de comando (JSON):
+    python countstore.py counts --last 3600 --step 300 --zone norte --type car
+"""
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+
+META_FILE = "meta.json"
+
+# Valor de `counter` nas consultas que pede todos os contadores
+ANY = "*"
+
+
+def _columnPath(path, index):
+    return os.path.join(path, f"col-{index:04d}.i64")
+
+
+def seriesName(zone, vtype, counter=None, direction=None):
+    """
+    Nome da coluna de uma série.
+    """
+    if counter is None:
+        return f"{zone}/{vtype}"
+    return f"{zone}/{counter}/{direction}/{vtype}"
+
+
+def parseSeries(name):
+    """
+    (zona, contador, sentido, tipo) de um nome de coluna; contador e
+    sentido são None nas séries de veículos contados.
+    """
+    parts = name.split("/")
+    if len(parts) == 2:
+        return parts[0], None, None, parts[1]
+    return parts[0], parts[1], parts[2], parts[3]
+
+
+def _readMeta(path):
+    filename = os.path.join(path, META_FILE)
+    if not os.path.exists(filename):
+        return None
+    with open(filename, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class CountStore:
+    """
+    Agregador das contagens por bucket de tempo, com gravação colunar e
+    consultas por intervalo / janela móvel.
+    """
+
+    def __init__(self, path=None, interval=60, flush_rows=60, readonly=False):
+        """
+        Parâmetros:
+            path      : pasta dos arquivos (criada se preciso); None = só memória
+            interval  : duração (s) de um bucket; numa pasta existente vale a dela
+            flush_rows: grava sozinho quando há tantos buckets fechados em memória
+            readonly  : só consultas (outro processo escreve na pasta); use
+                        refresh() para ver os buckets gravados depois
+        """
+        self.path = path
+        self.interval = float(interval)
+        self.flush_rows = flush_rows
+        self.readonly = readonly
+        self._lock = threading.Lock()
+
+        self.origin = None        # início do bucket 0 (timestamp)
+        self.names = []           # nomes das colunas, na ordem dos arquivos
+        self.columns = {}         # nome -> índice
+        self.rows = 0             # buckets gravados nos arquivos
+        self.disk_columns = 0     # colunas que já têm arquivo
+        self.tail = np.zeros((0, 0), np.int64)   # buckets rows, rows + 1, ... em memória
+        self.last = -1            # maior bucket com evento
+        self.late = 0
+        self.flushes = 0
+        self.closed = False
+
+        if path is not None:
+            if not readonly:
+                os.makedirs(path, exist_ok=True)
+            self._load()
+
+    def _load(self):
+        meta = _readMeta(self.path)
+        if meta is None:
+            return
+        self.interval = meta["interval"]
+        self.origin = meta["origin"]
+        self.names = list(meta["columns"])
+        self.columns = {name: i for i, name in enumerate(self.names)}
+        self.rows = meta["rows"]
+        self.disk_columns = len(self.names)
+        self.last = self.rows - 1
+        self.tail = np.zeros((0, len(self.names)), np.int64)
+        if self.readonly or self.rows == 0:
+            return
+        # O último bucket gravado volta para a memória (pode receber eventos);
+        # o próximo flush o regrava
+        self.rows -= 1
+        self.tail = self._readDisk(self.rows, self.rows + 1, range(len(self.names)))
+
+    def refresh(self):
+        """
+        Relê o meta.json (modo readonly).
+        """
+        with self._lock:
+            self._load()
+
+    # -----------------------------
+    # Escrita
+    # -----------------------------
+    def _column(self, name):
+        index = self.columns.get(name)
+        if index is None:
+            index = len(self.names)
+            self.names.append(name)
+            self.columns[name] = index
+            self.tail = np.pad(self.tail, ((0, 0), (0, 1)))
+        return index
+
+    def add(self, ts, zone, vtype, counter=None, direction=None, n=1):
+        """
+        Soma `n` à série (zona, tipo[, contador, sentido]) no bucket do
+        instante `ts` (timestamp em segundos).
+        """
+        with self._lock:
+            if self.closed or self.readonly:
+                raise RuntimeError("CountStore fechado ou somente leitura")
+            if self.origin is None:
+                self.origin = ts // self.interval * self.interval
+            bucket = int((ts - self.origin) // self.interval)
+            row = bucket - self.rows
+            if row < 0:
+                self.late += n
+                return
+            column = self._column(seriesName(zone, vtype, counter, direction))
+            if row >= len(self.tail):
+                # Cresce em blocos (amortizado); buckets sem eventos ficam em zero
+                grow = max(row + 1 - len(self.tail), len(self.tail), 16)
+                self.tail = np.pad(self.tail, ((0, grow), (0, 0)))
+            self.tail[row, column] += n
+            self.last = max(self.last, bucket)
+
+            if self.path is not None and self.last - self.rows >= self.flush_rows:
+                self._flush(self.last - self.rows)
+
+    def flush(self):
+        """
+        Grava os buckets fechados (todos menos o último com evento).
+        """
+        with self._lock:
+            if self.path is not None and not self.readonly:
+                self._flush(max(0, self.last - self.rows))
+
+    def _flush(self, count):
+        """
+        Acrescenta os `count` primeiros buckets em memória aos arquivos.
+        """
+        start = self.rows * 8
+        for index in range(len(self.names)):
+            filename = _columnPath(self.path, index)
+            if index >= self.disk_columns:
+                # Coluna nova: zeros em todas as linhas já gravadas
+                with open(filename, "wb") as f:
+                    f.truncate(start)
+            with open(filename, "r+b") as f:
+                f.truncate(start)
+                f.seek(start)
+                f.write(self.tail[:count, index].astype("<i8").tobytes())
+        self.disk_columns = len(self.names)
+        self.rows += count
+        self.tail = self.tail[count:].copy()
+
+        meta = {"interval": self.interval, "origin": self.origin,
+                "columns": self.names, "rows": self.rows}
+        tmp = os.path.join(self.path, META_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+        self.flushes += 1
+
+    def close(self):
+        """
+        Grava tudo (inclusive o último bucket) e fecha.
+        """
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self.path is not None and not self.readonly and self.last >= self.rows:
+                self._flush(self.last - self.rows + 1)
+
+    # -----------------------------
+    # Estado (checkpoint / retomada)
+    # -----------------------------
+    def get_state(self):
+        """
+        Posição da gravação e buckets em memória, serializável em JSON.
+        """
+        with self._lock:
+            used = max(0, self.last - self.rows + 1)
+            return {"origin": self.origin, "columns": list(self.names), "rows": self.rows,
+                    "last": self.last, "late": self.late, "tail": self.tail[:used].tolist()}
+
+    def set_state(self, state):
+        """
+        Volta ao estado salvo por get_state(): os buckets gravados depois
+        dele são descartados (regravados no próximo flush).
+        """
+        with self._lock:
+            self.origin = state["origin"]
+            self.names = list(state["columns"])
+            self.columns = {name: i for i, name in enumerate(self.names)}
+            self.rows = state["rows"]
+            self.last = state["last"]
+            self.late = state["late"]
+            self.tail = np.array(state["tail"], np.int64).reshape(-1, len(self.names))
+            # Colunas criadas depois do checkpoint são recriadas do zero
+            self.disk_columns = min(self.disk_columns, len(self.names))
+
+    # -----------------------------
+    # Consultas
+    # -----------------------------
+    def _readDisk(self, start, end, columns):
+        out = np.zeros((end - start, len(columns)), np.int64)
+        for k, index in enumerate(columns):
+            filename = _columnPath(self.path, index)
+            if not os.path.exists(filename):
+                continue
+            data = np.fromfile(filename, dtype="<i8", count=end - start, offset=start * 8)
+            out[:len(data), k] = data
+        return out
+
+    def select(self, zone=None, vtype=None, counter=None, direction=None):
+        """
+        Nomes das colunas que satisfazem os filtros. counter=None seleciona
+        os veículos contados; counter=ANY, os cruzamentos de todos os contadores.
+        """
+        with self._lock:
+            names = list(self.names)
+        found = []
+        for name in names:
+            z, c, d, t = parseSeries(name)
+            if zone is not None and z != zone:
+                continue
+            if vtype is not None and t != vtype:
+                continue
+            if (counter is None) != (c is None) or (counter not in (None, ANY) and c != counter):
+                continue
+            if direction is not None and d != direction:
+                continue
+            found.append(name)
+        return found
+
+    def bucketRange(self, start=None, end=None):
+        """
+        Buckets [b0, b1) que cobrem [start, end) (None = desde o início / até o fim).
+        """
+        if self.origin is None:
+            return 0, 0
+        b0 = 0 if start is None else max(0, int((start - self.origin) // self.interval))
+        total = max(self.rows, self.last + 1)
+        b1 = total if end is None else min(total, -int(-(end - self.origin) // self.interval))
+        return b0, max(b0, b1)
+
+    def matrix(self, start=None, end=None, names=None):
+        """
+        (timestamps, nomes, contagens): contagens[b, k] da coluna nomes[k]
+        no bucket que começa em timestamps[b].
+        """
+        with self._lock:
+            names = list(self.names if names is None else names)
+            columns = [self.columns[name] for name in names]
+            b0, b1 = self.bucketRange(start, end)
+            rows, origin = self.rows, self.origin
+            lo, hi = max(b0, rows), max(b1, rows)
+            memory = self.tail[lo - rows:hi - rows][:, columns].copy()
+            memory = np.pad(memory, ((0, hi - lo - len(memory)), (0, 0)))
+        disk = np.zeros((0, len(columns)), np.int64)
+        if self.path is not None and b0 < rows:
+            disk = self._readDisk(b0, min(b1, rows), columns)
+        counts = np.concatenate([disk, memory])
+        stamps = (origin or 0.0) + self.interval * np.arange(b0, b1)
+        return stamps, names, counts
+
+    def series(self, start=None, end=None, step=None, **filters):
+        """
+        (timestamps, totais) por bucket da soma das séries filtradas;
+        `step` (múltiplo do intervalo) reagrupa, ex.: step=3600 = por hora.
+        Filtros: zone, vtype, counter, direction (ver select()).
+        """
+        stamps, _, counts = self.matrix(start, end, self.select(**filters))
+        totals = counts.sum(axis=1)
+        if step is None or step <= self.interval:
+            return stamps, totals
+        k = int(round(step / self.interval))
+        pad = -len(totals) % k
+        totals = np.pad(totals, (0, pad)).reshape(-1, k).sum(axis=1)
+        return stamps[::k], totals
+
+    def total(self, start=None, end=None, **filters):
+        """
+        Soma das séries filtradas no intervalo [start, end).
+        """
+        return int(self.matrix(start, end, self.select(**filters))[2].sum())
+
+    def rolling(self, window, end=None, **filters):
+        """
+        Soma das séries filtradas nos últimos `window` segundos até `end`
+        (None = fim do último bucket com evento), em buckets inteiros.
+        """
+        if end is None:
+            end = self.lastEnd()
+        return self.total(end - window, end, **filters)
+
+    def lastEnd(self):
+        """
+        Fim (timestamp) do último bucket com evento; 0.0 se não houver eventos.
+        """
+        with self._lock:
+            if self.origin is None:
+                return 0.0
+            return self.origin + self.interval * (self.last + 1)
+
+    def breakdown(self, start=None, end=None, **filters):
+        """
+        Total de cada série filtrada no intervalo: {nome: total}.
+        """
+        _, names, counts = self.matrix(start, end, self.select(**filters))
+        return {name: int(v) for name, v in zip(names, counts.sum(axis=0))}
+
+    def stats(self):
+        with self._lock:
+            return {"buckets": max(self.rows, self.last + 1), "series": len(self.names),
+                    "flushes": self.flushes, "late": self.late}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta as contagens por intervalo de uma pasta.")
+    parser.add_argument("path", help="pasta do count store")
+    parser.add_argument("--start", type=float, help="timestamp inicial (s)")
+    parser.add_argument("--end", type=float, help="timestamp final (s, exclusivo)")
+    parser.add_argument("--last", type=float, help="janela móvel: últimos N segundos gravados")
+    parser.add_argument("--step", type=float, help="reagrupa a série em passos de N segundos")
+    parser.add_argument("--zone")
+    parser.add_argument("--type", dest="vtype", choices=["car", "truck"])
+    parser.add_argument("--counter", help=f"contador (cruzamentos); {ANY} = todos")
+    parser.add_argument("--direction")
+    args = parser.parse_args(argv)
+
+    store = CountStore(args.path, readonly=True)
+    filters = {"zone": args.zone, "vtype": args.vtype, "counter": args.counter,
+               "direction": args.direction}
+    start, end = args.start, args.end
+    if args.last is not None:
+        end = store.lastEnd()
+        start = end - args.last
+    stamps, totals = store.series(start, end, args.step, **filters)
+    print(json.dumps({
+        "total": int(totals.sum()),
+        "series": [[float(t), int(v)] for t, v in zip(stamps, totals)],
+        "breakdown": store.breakdown(start, end, **filters),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
 import numpy as np
 import cv2
 import sys
+import pipeline                  # usa pipeline.FramePipeline
+import profiler                  # usa profiler.StageProfiler
+import gate                      # usa gate.MotionGate
+import buffers                   # usa buffers.FrameBuffers
+import blobs                     # usa blobs.findBlobs
+import engine                    # usa engine.MaskEngine
+import recorder                  # usa recorder.VideoRecorder
 
 # Cores e fontes para anotações visuais na tela
 TEXT_COLOR = (0, 255, 0)
@@ -9,126 +16,231 @@ FONT = cv2.FONT_HERSHEY_SIMPLEX
 
 # Caminho do vídeo e tipo de background subtractor (requer opencv-contrib se usar GMG/MOG)
 VIDEO_SOURCE = "video/video_animal.mp4"
-BGS_TYPES = ["GMG", "MOG", "MOG2", "KNN", "CNT"]
+BGS_TYPES = engine.BGS_TYPES
 BGS_TYPES = BGS_TYPES[0]
 
-def getKernerl(KERNEL_TYPE):
-    # Retorna kernels para operações morfológicas:
-    # - dilation: estrutura elíptica (melhor para crescer regiões)
-    # - opening/closing: quadrado 3x3 de uns (remoção de ruído/fechamento de buracos)
-    if KERNEL_TYPE == "dilation":
-        kernel =  cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-    if KERNEL_TYPE == "opening":
-        kernel =  np.ones((3, 3), np.uint8)
-    if KERNEL_TYPE == "closing":
-        kernel =  np.ones((3, 3), np.uint8)
-
-    return kernel
-
-def getFilter(img, filter):
-    # Encadeia filtros morfológicos para limpar a máscara de fundo
-    if filter == "closing":
-        return cv2.morphologyEx(img, cv2.MORPH_CLOSE, getKernerl("closing"), iterations=2)
-    if filter == "opening":
-        return cv2.morphologyEx(img, cv2.MORPH_OPEN, getKernerl("opening"), iterations=2)
-    if filter == "dilation":
-        return cv2.dilate(img, getKernerl("dilation"), iterations=2)
-    if filter == "combine":
-        # Pipeline: closing -> opening -> dilation (preenche falhas, remove ruído e expande)
-        closing = cv2.morphologyEx(img, cv2.MORPH_CLOSE, getKernerl("closing"), iterations=2)
-        opening = cv2.morphologyEx(img, cv2.MORPH_OPEN, getKernerl("opening"), iterations=2)
-        return cv2.dilate(opening, getKernerl("dilation"), iterations=2)
-
-def getBGSubtractor(BGS_TYPE):
-    # Seleciona o algoritmo de subtração de fundo
-    # Observação: GMG e MOG ficam em cv2.bgsegm (pacote opencv-contrib-python)
-    if BGS_TYPE == "GMG":
-        return cv2.bgsegm.createBackgroundSubtractorGMG()
-    if BGS_TYPE == "MOG":
-        return cv2.bgsegm.createBackgroundSubtractorMOG()
-    if BGS_TYPE == "MOG2":
-        return cv2.createBackgroundSubtractorMOG2()
-    if BGS_TYPE == "KNN":
-        return cv2.createBackgroundSubtractorKNN()
-    print("Detector inválido")
-    sys.exit(1)
-
-# Abre o vídeo de entrada
-cap = cv2.VideoCapture(VIDEO_SOURCE)
-minArea = 250  # área mínima do contorno para considerar "movimento"
-
-if not cap.isOpened():
-    print("Erro: vídeo não encontrado!")
-    sys.exit(1)
-
-# Instancia o subtractor escolhido
-bg_subtractor = getBGSubtractor(BGS_TYPES)
-
-
-#controla somente o tamanho das janelas de exibição
-cv2.namedWindow("Frame", cv2.WINDOW_NORMAL)
-cv2.namedWindow("BG Mask", cv2.WINDOW_NORMAL)
-cv2.resizeWindow("Frame", 800, 450)    # ajuste o tamanho aqui
-cv2.resizeWindow("BG Mask", 800, 450)
-cv2.moveWindow("Frame", 50, 50)        # opcional: posição das janelas
-cv2.moveWindow("BG Mask", 900, 50)
-
+# Modo pipeline: leitura, processamento e exibição em threads separadas
+# ligadas por filas limitadas (política "block" ou "drop-oldest")
+PIPELINE_MODE = False
+QUEUE_SIZE = 4
+QUEUE_POLICY = "block"
+
+# Profiling por estágio (latência p50/p95/p99, FPS, filas); .json ou .csv
+PROFILE = False
+PROFILE_OUT = "profile_movimento.json"
+
+# Gate de movimento: pula morfologia/contornos quando nada se move no frame
+GATE = False
+GATE_MIN_FRACTION = 0.001        # fração mínima de pixels em movimento
+GATE_HOLD = 5                    # frames processados após o último movimento
+
+# Buffers pré-alocados: resize, máscaras e preview escritos sempre nos mesmos
+# arrays (sem alocação por frame em regime)
+REUSE_BUFFERS = True
+
+# Extração dos blobs: "contours" (findContours) ou "components"
+# (connectedComponentsWithStats, vetorizado; compensa em frames lotados)
+EXTRACTION = "contours"
+
+# Escala do frame antes do processamento (1.0 = resolução cheia; reduzir
+# acelera, mas objetos pequenos somem)
+SCALE = 0.50
+
+# Blocos (vídeo 4K em resolução cheia): divide o frame numa grade (colunas,
+# linhas) e roda BGS + filtros de cada bloco numa thread (ex.: (2, 2)).
+# None = frame inteiro.
+TILES = None
+TILE_WORKERS = None              # threads (None = uma por bloco)
+
+# Vídeo anotado gravado em VIDEO_OUT por uma thread própria (recorder.py),
+# sem atrasar a detecção
+RECORD = False
+VIDEO_OUT = "videos/results/result_movimento.mp4"
+RECORD_CODEC = "mp4v"            # FourCC: "mp4v", "XVID", "MJPG", "avc1", ...
+RECORD_EVERY = 1                 # grava 1 a cada N frames (o vídeo sai com fps / N)
+RECORD_SEGMENTS = False          # só trechos em volta de frames com movimento
+RECORD_PRE = 2.0                 # segundos gravados antes / depois de cada evento
+RECORD_POST = 3.0
+RECORD_POLICY = "block"          # "block" ou "drop-newest" (fila cheia: descarta o frame)
+
+# Kernels (altura, largura) de closing, opening e dilation (engine.getKernels):
+# - dilation: estrutura elíptica (melhor para crescer regiões)
+# - opening: retângulo de uns (remoção de ruído)
+# - closing: None; na cadeia original o resultado do closing nunca era usado
+#   (o opening partia da máscara bruta), então ele não é calculado
+KERNELS = [None, [3, 3], [3, 3]]
+MEDIAN_BLUR = 5
+
+# Perfil de câmera gerado pelo autotune.py (JSON): substitui o BGS, os
+# kernels, as iterações e o blur mediano acima pelos ajustados para a
+# câmera. None = usa as constantes.
+CAMERA_PROFILE = None
 
 def main():
-    while cap.isOpened():
-        ok, frame = cap.read()
-        if not ok:
-            print("Fim do vídeo.")
-            break
+    # Abre o vídeo de entrada
+    cap = cv2.VideoCapture(VIDEO_SOURCE)
+    minArea = 250  # área mínima do contorno para considerar "movimento"
+
+    if not cap.isOpened():
+        print("Erro: vídeo não encontrado!")
+        sys.exit(1)
+
+    # Instrumentação (custo praticamente nulo com PROFILE = False)
+    prof = profiler.StageProfiler(enabled=PROFILE, dump_path=PROFILE_OUT)
+
+    # Gate de movimento
+    motion_gate = gate.MotionGate(GATE, GATE_MIN_FRACTION, GATE_HOLD)
+
+    # Buffers reaproveitados; no pipeline, os resultados de até QUEUE_SIZE + 2
+    # frames ficam vivos ao mesmo tempo (fila de render)
+    frame_buffers = buffers.FrameBuffers(QUEUE_SIZE + 2 if PIPELINE_MODE else 1, REUSE_BUFFERS)
+
+    # Instancia o subtractor escolhido + filtros (engine.py); no modo em
+    # blocos, um BGS por bloco e as máscaras costuradas no frame inteiro;
+    # CAMERA_PROFILE sobrepõe o BGS e os filtros
+    tiled_h, tiled_w = buffers.scaledShape((int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))), SCALE)
+    detection = {"bgs": BGS_TYPES, "bgs_params": None, "kernels": KERNELS, "iterations": 2,
+                 "median_blur": MEDIAN_BLUR}
+    try:
+        if CAMERA_PROFILE:
+            detection.update(engine.loadProfile(CAMERA_PROFILE))
+        mask_engine = engine.MaskEngine(detection["bgs"], detection["kernels"], detection["median_blur"],
+                                        detection["bgs_params"], size=(tiled_w, tiled_h), grid=TILES,
+                                        tile_workers=TILE_WORKERS, bufs=frame_buffers, prof=prof,
+                                        iterations=detection["iterations"])
+    except ValueError:
+        print("Detector inválido")
+        sys.exit(1)
+
+    # Gravador do vídeo anotado
+    video_recorder = None
+    if RECORD:
+        video_recorder = recorder.VideoRecorder(
+            VIDEO_OUT, cap.get(cv2.CAP_PROP_FPS), RECORD_CODEC, RECORD_EVERY,
+            RECORD_SEGMENTS, RECORD_PRE, RECORD_POST, policy=RECORD_POLICY
+        )
+
+    #controla somente o tamanho das janelas de exibição
+    cv2.namedWindow("Frame", cv2.WINDOW_NORMAL)
+    cv2.namedWindow("BG Mask", cv2.WINDOW_NORMAL)
+    cv2.resizeWindow("Frame", 800, 450)    # ajuste o tamanho aqui
+    cv2.resizeWindow("BG Mask", 800, 450)
+    cv2.moveWindow("Frame", 50, 50)        # opcional: posição das janelas
+    cv2.moveWindow("BG Mask", 900, 50)
+
+    def process(frame):
+        frame_buffers.advance()
 
         # Reduz resolução para acelerar processamento
-        frame = cv2.resize(frame, (0, 0), fx=0.50, fy=0.50)
+        if SCALE != 1.0:
+            with prof.stage("resize"):
+                frame = engine.resize(frame, SCALE, frame_buffers)
 
         # Cria máscara de movimento (fundo subtraído)
-        bg_mask = bg_subtractor.apply(frame)
-
-        # Limpeza de ruído via morfologia + blur mediano
-        bg_mask = getFilter(bg_mask, 'combine')
-        bg_mask = cv2.medianBlur(bg_mask, 5)
-
-        # Encontra contornos de regiões em movimento (apenas externos)
-        (contours, hierarchy) = cv2.findContours(bg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        for cnt in contours:
-            area = cv2.contourArea(cnt)
-
-            # Regra simples: só considera movimentos com área mínima
-            if area >= minArea:
-                x, y, w, h = cv2.boundingRect(cnt)
+        bg_mask = mask_engine.foreground(frame)
+
+        # Gate de movimento: o BGS já foi atualizado; sem movimento, pula o resto
+        moving = motion_gate.check(bg_mask)
+        event = False    # movimento detectado (vídeo em trechos)
+        if moving:
+            with motion_gate.measure():
+
+                # Limpeza de ruído via morfologia + blur mediano
+                bg_mask = mask_engine.clean(bg_mask)
+
+                # Encontra as regiões em movimento (contornos externos ou
+                # componentes conexos) já filtradas pela área mínima
+                with prof.stage("find_contours"):
+                    boxes, areas, contours = blobs.findBlobs(bg_mask, EXTRACTION, minArea, bufs=frame_buffers)
+                event = len(boxes) > 0
+
+                with prof.stage("draw"):
+                    for i, (x, y, w, h) in enumerate(boxes.tolist()):
+
+                        # Banner com aviso de movimento
+                        cv2.rectangle(frame, (10, 30), (250,55), (255, 0, 0), -1)
+                        cv2.putText(frame, 'Movimento detectado', (10,50), FONT, 1, TEXT_COLOR, 2, cv2.LINE_AA)
+
+                        #Alternativas visuais (descomente o que quiser ver/testar):
+                        if contours is not None:
+                            cnt = contours[i]
+                            cv2.drawContours(frame, cnt, -1, TEXT_COLOR, 3)
+                            cv2.drawContours(frame, cnt, -1, (255, 255, 255), 1)
+                        cv2.rectangle(frame, (x, y), (x + w, y + h), TRACKER_COLOR, 3)
+                        cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 255, 255), 1)
+
+                        # Sobreposições com transparência para destacar a região
+                        # (ideia inspirada em PyImageSearch)
+                        #for alpha in np.arange(0.8, 1.1, 0.9)[::-1]:
+                            #frame_copy = frame.copy()
+                            # ATENÇÃO: frame_copy é uma imagem (np.array), não é função.
+                            #output = frame.copy()
+                            #cv2.drawContours(frame_copy, [cnt], -1, TRACKER_COLOR, -1)
+                            #frame = cv2.addWeighted(frame_copy, alpha, output, 1-alpha, 0, output)
+
+        # Vídeo anotado (cópia do frame para a thread de gravação)
+        if video_recorder is not None:
+            with prof.stage("record"):
+                video_recorder.submit(frame, event)
 
-                # Banner com aviso de movimento
-                cv2.rectangle(frame, (10, 30), (250,55), (255, 0, 0), -1)
-                cv2.putText(frame, 'Movimento detectado', (10,50), FONT, 1, TEXT_COLOR, 2, cv2.LINE_AA)
-
-                #Alternativas visuais (descomente o que quiser ver/testar):
-                cv2.drawContours(frame, cnt, -1, TEXT_COLOR, 3)
-                cv2.drawContours(frame, cnt, -1, (255, 255, 255), 1)
-                cv2.rectangle(frame, (x, y), (x + w, y + h), TRACKER_COLOR, 3)
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 255, 255), 1)
+        # Combina frame original com máscara (útil para visualização do que foi mantido)
+        with prof.stage("preview"):
+            result = frame_buffers.get("preview", frame.shape)
+            if result is None:
+                result = np.zeros_like(frame)
+            else:
+                result.fill(0)    # bitwise_and com máscara não toca os pixels fora dela
+            if moving:
+                result = cv2.bitwise_and(frame, frame, dst=result, mask=bg_mask)
 
-                # Sobreposições com transparência para destacar a região
-                # (ideia inspirada em PyImageSearch)
-                #for alpha in np.arange(0.8, 1.1, 0.9)[::-1]:
-                    #frame_copy = frame.copy()
-                    # ATENÇÃO: frame_copy é uma imagem (np.array), não é função.
-                    #output = frame.copy()
-                    #cv2.drawContours(frame_copy, [cnt], -1, TRACKER_COLOR, -1)
-                    #frame = cv2.addWeighted(frame_copy, alpha, output, 1-alpha, 0, output)
+        return frame, result
 
-        # Combina frame original com máscara (útil para visualização do que foi mantido)
-        result = cv2.bitwise_and(frame, frame, mask=bg_mask)
+    def render(item):
+        frame, result = item
 
         # Janelas de visualização
         cv2.imshow("Frame", frame)
         cv2.imshow("BG Mask", result)
 
         # Pressione 'q' para sair
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+    if PIPELINE_MODE:
+        pipeline.FramePipeline(cap, process, render, QUEUE_SIZE, QUEUE_POLICY, prof,
+                               reuse_frames=REUSE_BUFFERS).run()
+        prof.close()
+        mask_engine.close()
+        if video_recorder is not None:
+            video_recorder.close()
+            print(video_recorder.report())
+        if GATE:
+            print(motion_gate.report(cap.get(cv2.CAP_PROP_FPS)))
+        print("Fim do vídeo.")
+        return
+
+    frame = None
+    while cap.isOpened():
+        with prof.stage("decode"):
+            ok, frame = cap.read(frame if REUSE_BUFFERS else None)
+        if not ok:
+            print("Fim do vídeo.")
+            break
+
+        result = process(frame)
+        with prof.stage("render"):
+            keep_going = render(result)
+        prof.tick()
+        if not keep_going:
             break
 
-main()
+    prof.close()
+    mask_engine.close()
+    if video_recorder is not None:
+        video_recorder.close()
+        print(video_recorder.report())
+    if GATE:
+        print(motion_gate.report(cap.get(cv2.CAP_PROP_FPS)))
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 import numpy as np
 import cv2
 import sys
+import pipeline                  # usa pipeline.FramePipeline
+import profiler                  # usa profiler.StageProfiler
+import gate                      # usa gate.MotionGate
+import buffers                   # usa buffers.FrameBuffers
+import blobs                     # usa blobs.findBlobs
+import engine                    # usa engine.MaskEngine
+import recorder                  # usa recorder.VideoRecorder
+import proximity                 # usa proximity.ProximityEngine
 
 # Cores e fontes para anotações visuais na tela
 TEXT_COLOR = (0, 255, 0)
@@ -8,121 +16,266 @@ TRACKER_COLOR = (255, 0, 0)
 
 #quando identificado duas pessoas proximas o contorno com a cor definida
 WARNING_COLLOR = (24,201,255)
+
+#linha entre duas pessoas mais próximas que MIN_DISTANCE
+VIOLATION_COLOR = (0, 0, 255)
 FONT = cv2.FONT_HERSHEY_SIMPLEX
 
 # Caminho do vídeo e tipo de background subtractor (requer opencv-contrib se usar GMG/MOG)
 VIDEO_SOURCE = "video/distanciamento.mp4"
-BGS_TYPES = ["GMG", "MOG", "MOG2", "KNN", "CNT"]
+BGS_TYPES = engine.BGS_TYPES
 BGS_TYPES = BGS_TYPES[1]
 
-def getKernerl(KERNEL_TYPE):
-    # Retorna kernels para operações morfológicas:
-    # - dilation: estrutura elíptica (melhor para crescer regiões)
-    # - opening/closing: quadrado 3x3 de uns (remoção de ruído/fechamento de buracos)
-    if KERNEL_TYPE == "dilation":
-        kernel =  cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2, 2))
-    if KERNEL_TYPE == "opening":
-        kernel =  np.ones((3, 5), np.uint8)
-    if KERNEL_TYPE == "closing":
-        kernel =  np.ones((11, 11), np.uint8)
-
-    return kernel
-
-def getFilter(img, filter):
-    # Encadeia filtros morfológicos para limpar a máscara de fundo
-    if filter == "closing":
-        return cv2.morphologyEx(img, cv2.MORPH_CLOSE, getKernerl("closing"), iterations=2)
-    if filter == "opening":
-        return cv2.morphologyEx(img, cv2.MORPH_OPEN, getKernerl("opening"), iterations=2)
-    if filter == "dilation":
-        return cv2.dilate(img, getKernerl("dilation"), iterations=2)
-    if filter == "combine":
-        # Pipeline: closing -> opening -> dilation (preenche falhas, remove ruído e expande)
-        closing = cv2.morphologyEx(img, cv2.MORPH_CLOSE, getKernerl("closing"), iterations=2)
-        opening = cv2.morphologyEx(img, cv2.MORPH_OPEN, getKernerl("opening"), iterations=2)
-        return cv2.dilate(opening, getKernerl("dilation"), iterations=2)
-
-def getBGSubtractor(BGS_TYPE):
-    # Seleciona o algoritmo de subtração de fundo
-    # Observação: GMG e MOG ficam em cv2.bgsegm (pacote opencv-contrib-python)
-    if BGS_TYPE == "GMG":
-        return cv2.bgsegm.createBackgroundSubtractorGMG()
-    if BGS_TYPE == "MOG":
-        return cv2.bgsegm.createBackgroundSubtractorMOG()
-    if BGS_TYPE == "MOG2":
-        return cv2.createBackgroundSubtractorMOG2(detectShadows=False, varThreshold=100)
-    if BGS_TYPE == "KNN":
-        return cv2.createBackgroundSubtractorKNN()
-    if BGS_TYPE == "CNT":
-        return cv2.bgsegm.createBackgroundSubtractorCNT()
-    print("Detector inválido")
-    sys.exit(1)
-
-# Abre o vídeo de entrada
-cap = cv2.VideoCapture(VIDEO_SOURCE)
-
-if not cap.isOpened():
-    print("Erro: vídeo não encontrado!")
-    sys.exit(1)
-
-# Instancia o subtractor escolhido
-bg_subtractor = getBGSubtractor(BGS_TYPES)
-minArea = 400  # área mínima do contorno para considerar "movimento"
-maxArea = 800
-
-
-#controla somente o tamanho das janelas de exibição
-cv2.namedWindow("Frame", cv2.WINDOW_NORMAL)
-cv2.namedWindow("BG Mask", cv2.WINDOW_NORMAL)
-cv2.resizeWindow("Frame", 800, 450)    # ajuste o tamanho aqui
-cv2.resizeWindow("BG Mask", 800, 450)
-cv2.moveWindow("Frame", 50, 50)        # opcional: posição das janelas
-cv2.moveWindow("BG Mask", 900, 50)
+# Modo pipeline: leitura, processamento e exibição em threads separadas
+# ligadas por filas limitadas (política "block" ou "drop-oldest")
+PIPELINE_MODE = False
+QUEUE_SIZE = 4
+QUEUE_POLICY = "block"
+
+# Profiling por estágio (latência p50/p95/p99, FPS, filas); .json ou .csv
+PROFILE = False
+PROFILE_OUT = "profile_distanciamento.json"
+
+# Gate de movimento: pula morfologia/contornos quando nada se move no frame
+GATE = False
+GATE_MIN_FRACTION = 0.001        # fração mínima de pixels em movimento
+GATE_HOLD = 5                    # frames processados após o último movimento
+
+# Buffers pré-alocados: resize, máscaras e preview escritos sempre nos mesmos
+# arrays (sem alocação por frame em regime)
+REUSE_BUFFERS = True
+
+# Distanciamento: pares de pessoas mais próximas que MIN_DISTANCE (medida
+# entre os pés, base das bounding boxes). Sem HOMOGRAPHY, em pixels do frame
+# redimensionado; com HOMOGRAPHY (matriz 3x3 imagem -> chão), nas unidades
+# do chão (ex.: metros). None = desliga (fica só o aviso por área).
+MIN_DISTANCE = 50
+HOMOGRAPHY = None
+PROXIMITY_METHOD = "auto"        # "auto", "dense" ou "grid"
+
+# Extração dos blobs: "contours" (findContours) ou "components"
+# (connectedComponentsWithStats, vetorizado; compensa em frames lotados)
+EXTRACTION = "contours"
+
+# Escala do frame antes do processamento (1.0 = resolução cheia; reduzir
+# acelera, mas objetos pequenos somem)
+SCALE = 0.50
+
+# Blocos (vídeo 4K em resolução cheia): divide o frame numa grade (colunas,
+# linhas) e roda BGS + filtros de cada bloco numa thread (ex.: (2, 2)).
+# None = frame inteiro.
+TILES = None
+TILE_WORKERS = None              # threads (None = uma por bloco)
+
+# Vídeo anotado gravado em VIDEO_OUT por uma thread própria (recorder.py),
+# sem atrasar a detecção
+RECORD = False
+VIDEO_OUT = "videos/results/result_distanciamento.mp4"
+RECORD_CODEC = "mp4v"            # FourCC: "mp4v", "XVID", "MJPG", "avc1", ...
+RECORD_EVERY = 1                 # grava 1 a cada N frames (o vídeo sai com fps / N)
+RECORD_SEGMENTS = False          # só trechos em volta de avisos e violações de distância
+RECORD_PRE = 2.0                 # segundos gravados antes / depois de cada evento
+RECORD_POST = 3.0
+RECORD_POLICY = "block"          # "block" ou "drop-newest" (fila cheia: descarta o frame)
+
+# Kernels (altura, largura) de closing, opening e dilation (engine.getKernels):
+# - dilation: estrutura elíptica (melhor para crescer regiões)
+# - opening: retângulo de uns (remoção de ruído)
+# - closing: None; na cadeia original o resultado do closing (11x11) nunca
+#   era usado (o opening partia da máscara bruta), então ele não é calculado
+KERNELS = [None, [3, 5], [2, 2]]
+MEDIAN_BLUR = 5
 
+# Parâmetros do construtor de cada BGS (os demais usam os padrões do OpenCV)
+BGS_PARAMS = {"MOG2": {"detectShadows": False, "varThreshold": 100}}
+
+# Perfil de câmera gerado pelo autotune.py (JSON): substitui o BGS, os
+# kernels, as iterações e o blur mediano acima pelos ajustados para a
+# câmera. None = usa as constantes.
+CAMERA_PROFILE = None
 
 def main():
-    while cap.isOpened():
-        ok, frame = cap.read()
-        if not ok:
-            print("Fim do vídeo.")
-            break
+    # Abre o vídeo de entrada
+    cap = cv2.VideoCapture(VIDEO_SOURCE)
+
+    if not cap.isOpened():
+        print("Erro: vídeo não encontrado!")
+        sys.exit(1)
+
+    # Instrumentação (custo praticamente nulo com PROFILE = False)
+    prof = profiler.StageProfiler(enabled=PROFILE, dump_path=PROFILE_OUT)
+
+    # Gate de movimento
+    motion_gate = gate.MotionGate(GATE, GATE_MIN_FRACTION, GATE_HOLD)
+
+    # Buffers reaproveitados; no pipeline, os resultados de até QUEUE_SIZE + 2
+    # frames ficam vivos ao mesmo tempo (fila de render)
+    frame_buffers = buffers.FrameBuffers(QUEUE_SIZE + 2 if PIPELINE_MODE else 1, REUSE_BUFFERS)
+
+    # Instancia o subtractor escolhido + filtros (engine.py); no modo em
+    # blocos, um BGS por bloco e as máscaras costuradas no frame inteiro;
+    # CAMERA_PROFILE sobrepõe o BGS e os filtros
+    tiled_h, tiled_w = buffers.scaledShape((int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                                            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))), SCALE)
+    detection = {"bgs": BGS_TYPES, "bgs_params": BGS_PARAMS.get(BGS_TYPES), "kernels": KERNELS,
+                 "iterations": 2, "median_blur": MEDIAN_BLUR}
+    try:
+        if CAMERA_PROFILE:
+            detection.update(engine.loadProfile(CAMERA_PROFILE))
+        mask_engine = engine.MaskEngine(detection["bgs"], detection["kernels"], detection["median_blur"],
+                                        detection["bgs_params"], size=(tiled_w, tiled_h), grid=TILES,
+                                        tile_workers=TILE_WORKERS, bufs=frame_buffers, prof=prof,
+                                        iterations=detection["iterations"])
+    except ValueError:
+        print("Detector inválido")
+        sys.exit(1)
+
+    # Proximidade entre pessoas
+    proximity_engine = None
+    if MIN_DISTANCE:
+        proximity_engine = proximity.ProximityEngine(MIN_DISTANCE, HOMOGRAPHY, PROXIMITY_METHOD)
+
+    minArea = 400  # área mínima do contorno para considerar "movimento"
+    maxArea = 800
+
+
+    # Gravador do vídeo anotado
+    video_recorder = None
+    if RECORD:
+        video_recorder = recorder.VideoRecorder(
+            VIDEO_OUT, cap.get(cv2.CAP_PROP_FPS), RECORD_CODEC, RECORD_EVERY,
+            RECORD_SEGMENTS, RECORD_PRE, RECORD_POST, policy=RECORD_POLICY
+        )
+
+    #controla somente o tamanho das janelas de exibição
+    cv2.namedWindow("Frame", cv2.WINDOW_NORMAL)
+    cv2.namedWindow("BG Mask", cv2.WINDOW_NORMAL)
+    cv2.resizeWindow("Frame", 800, 450)    # ajuste o tamanho aqui
+    cv2.resizeWindow("BG Mask", 800, 450)
+    cv2.moveWindow("Frame", 50, 50)        # opcional: posição das janelas
+    cv2.moveWindow("BG Mask", 900, 50)
+
+    def process(frame):
+        frame_buffers.advance()
 
         # Reduz resolução para acelerar processamento
-        frame = cv2.resize(frame, (0, 0), fx=0.50, fy=0.50)
-        bg_mask = bg_subtractor.apply(frame)
-        bg_mask = getFilter(bg_mask, 'combine')
-        bg_mask = cv2.medianBlur(bg_mask, 5)
+        if SCALE != 1.0:
+            with prof.stage("resize"):
+                frame = engine.resize(frame, SCALE, frame_buffers)
+        bg_mask = mask_engine.foreground(frame)
+
+        # Gate de movimento: o BGS já foi atualizado; sem movimento, pula o resto
+        moving = motion_gate.check(bg_mask)
+        event = False    # aviso ou violação de distância (vídeo em trechos)
+        if moving:
+            with motion_gate.measure():
+                bg_mask = mask_engine.clean(bg_mask)
+
+                #extrração dos blobs (contornos externos ou componentes conexos)
+                with prof.stage("find_contours"):
+                    boxes, areas, contours = blobs.findBlobs(bg_mask, EXTRACTION, minArea, bufs=frame_buffers)
+                event = bool(np.any(areas >= maxArea))
 
-        #extrração dos contornos
-        (contours, hierarchy) = cv2.findContours(bg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                with prof.stage("draw"):
+                    for i, (x, y, w, h) in enumerate(boxes.tolist()):
+                        cnt = contours[i] if contours is not None else None
 
-        for cnt in contours:
-            area = cv2.contourArea(cnt)
+                        #Alternativas visuais (descomente o que quiser ver/testar):
+                        if cnt is not None:
+                            cv2.drawContours(frame, cnt, 1, TEXT_COLOR, 10)
+                            cv2.drawContours(frame, cnt, 1, (255, 255, 255), 1)
 
-            # Regra simples: só considera movimentos com área mínima
-            if area >= minArea:
-                x, y, w, h = cv2.boundingRect(cnt)
+                        if areas[i] >= maxArea:
+                            cv2.rectangle(frame, (x, y), (x + 120, y - 13), (49, 49, 49), -1)
+                            cv2.putText(frame, 'Aviso distancimaneto', (x, y -2), FONT, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+                            if cnt is not None:
+                                cv2.drawContours(frame, [cnt], -1, WARNING_COLLOR, 2)
+                                cv2.drawContours(frame, [cnt], -1, (255, 255, 255), 1)
+                            else:
+                                # Sem contorno (backend "components"): destaca a caixa
+                                cv2.rectangle(frame, (x, y), (x + w, y + h), WARNING_COLLOR, 2)
+                                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 255, 255), 1)
 
-                #Alternativas visuais (descomente o que quiser ver/testar):
-                cv2.drawContours(frame, cnt, 1, TEXT_COLOR, 10)
-                cv2.drawContours(frame, cnt, 1, (255, 255, 255), 1)
+                # Pares de pessoas próximas demais: linha entre os pés
+                if proximity_engine is not None:
+                    with prof.stage("proximity"):
+                        pi, pj, dist, violators = proximity_engine.check(boxes)
+                    event = event or len(pi) > 0
+                    with prof.stage("draw"):
+                        feet = proximity.groundPoints(boxes).astype(int).tolist()
+                        for a, b in zip(pi.tolist(), pj.tolist()):
+                            cv2.line(frame, tuple(feet[a]), tuple(feet[b]), VIOLATION_COLOR, 2)
+                        for k in np.flatnonzero(violators).tolist():
+                            cv2.circle(frame, tuple(feet[k]), 4, VIOLATION_COLOR, -1)
+                        if len(pi):
+                            cv2.putText(frame, f"Violacoes: {len(pi)}", (10, 20), FONT, 0.6, VIOLATION_COLOR, 2)
 
-                if area >= maxArea:
-                    cv2.rectangle(frame, (x, y), (x + 120, y - 13), (49, 49, 49), -1)
-                    cv2.putText(frame, 'Aviso distancimaneto', (x, y -2), FONT, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
-                    cv2.drawContours(frame, [cnt], -1, WARNING_COLLOR, 2)
-                    cv2.drawContours(frame, [cnt], -1, (255, 255, 255), 1)
+        # Vídeo anotado (cópia do frame para a thread de gravação)
+        if video_recorder is not None:
+            with prof.stage("record"):
+                video_recorder.submit(frame, event)
 
         # Combina frame original com máscara (útil para visualização do que foi mantido)
-        result = cv2.bitwise_and(frame, frame, mask=bg_mask)
+        with prof.stage("preview"):
+            result = frame_buffers.get("preview", frame.shape)
+            if result is None:
+                result = np.zeros_like(frame)
+            else:
+                result.fill(0)    # bitwise_and com máscara não toca os pixels fora dela
+            if moving:
+                result = cv2.bitwise_and(frame, frame, dst=result, mask=bg_mask)
 
+        return frame, result
+
+    def render(item):
+        frame, result = item
 
         # Janelas de visualização
         cv2.imshow("Frame", frame)
         cv2.imshow("BG Mask", result)
 
         # Pressione 'q' para sair
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+    if PIPELINE_MODE:
+        pipeline.FramePipeline(cap, process, render, QUEUE_SIZE, QUEUE_POLICY, prof,
+                               reuse_frames=REUSE_BUFFERS).run()
+        prof.close()
+        mask_engine.close()
+        if video_recorder is not None:
+            video_recorder.close()
+            print(video_recorder.report())
+        if GATE:
+            print(motion_gate.report(cap.get(cv2.CAP_PROP_FPS)))
+        if proximity_engine is not None:
+            print(f"[DISTANCIAMENTO] {proximity_engine.stats()}")
+        print("Fim do vídeo.")
+        return
+
+    frame = None
+    while cap.isOpened():
+        with prof.stage("decode"):
+            ok, frame = cap.read(frame if REUSE_BUFFERS else None)
+        if not ok:
+            print("Fim do vídeo.")
+            break
+
+        result = process(frame)
+        with prof.stage("render"):
+            keep_going = render(result)
+        prof.tick()
+        if not keep_going:
             break
 
-main()
+    prof.close()
+    mask_engine.close()
+    if video_recorder is not None:
+        video_recorder.close()
+        print(video_recorder.report())
+    if GATE:
+        print(motion_gate.report(cap.get(cv2.CAP_PROP_FPS)))
+    if proximity_engine is not None:
+        print(f"[DISTANCIAMENTO] {proximity_engine.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+# engine.py
+"""
+Núcleo de detecção compartilhado pelos três scripts e pelo headless.py:
+criação do background subtractor, kernels e filtros morfológicos, e
+MaskEngine, que aplica BGS + limpeza (com blocos, buffers e profiler
+opcionais) sobre cada frame.
+
+Importar este módulo não tem efeito colateral: não abre vídeo, não cria
+janela e não toca no cv2.bgsegm (opencv-contrib), que só é buscado quando
+GMG, MOG ou CNT é pedido. Processos de um pool (runner.py, chunked.py)
+importam só o que usam, e uma instalação sem o contrib roda MOG2/KNN
+normalmente.
+
+Kernels são dados por tamanho, (altura, largura) de closing, opening e
+dilation: closing/opening são retângulos de uns e dilation é uma elipse.
+closing = None pula o closing (a cadeia "combine" dos scripts de
+movimento e distanciamento, que nunca usava o resultado dele).
+
+Perfil de câmera: um JSON (gerado por autotune.py) com o BGS, os
+parâmetros dele, os kernels, as iterações e o blur mediano escolhidos para
+uma câmera; loadProfile() devolve só essas chaves, já conferidas.
+
+Uso:
+    mask_engine = engine.MaskEngine("MOG2", [[3, 3], [3, 3], [3, 3]], median_blur=5)
+    fgmask = mask_engine.mask(frame)
+"""
+import json
+import os
+
+import numpy as np
+import cv2
+
+import buffers                   # usa buffers.FrameBuffers
+import profiler                  # usa profiler.DISABLED
+import tiles                     # usa tiles.TiledMask
+
+# Tipos de background subtractor disponíveis
+BGS_TYPES = ["GMG", "MOG", "MOG2", "KNN", "CNT"]
+
+# Os que ficam em cv2.bgsegm (pacote opencv-contrib-python)
+CONTRIB_BGS = {"GMG", "MOG", "CNT"}
+
+# Chaves de detecção de um perfil de câmera (mesmos nomes da config do headless.py)
+PROFILE_KEYS = ["bgs", "bgs_params", "kernels", "iterations", "median_blur"]
+
+
+def bgsegm():
+    """
+    Módulo cv2.bgsegm, buscado só quando um BGS do contrib é pedido.
+    """
+    module = getattr(cv2, "bgsegm", None)
+    if module is None:
+        raise ImportError("GMG, MOG e CNT precisam do opencv-contrib-python (cv2.bgsegm)")
+    return module
+
+
+def getBGSubtractor(BGS_TYPE, **params):
+    """
+    Seleciona o algoritmo de subtração de fundo; `params` vão para o
+    construtor (ex.: detectShadows=False, varThreshold=100 no MOG2).
+    """
+    if BGS_TYPE == "GMG":
+        return bgsegm().createBackgroundSubtractorGMG(**params)
+    if BGS_TYPE == "MOG":
+        return bgsegm().createBackgroundSubtractorMOG(**params)
+    if BGS_TYPE == "MOG2":
+        return cv2.createBackgroundSubtractorMOG2(**params)
+    if BGS_TYPE == "KNN":
+        return cv2.createBackgroundSubtractorKNN(**params)
+    if BGS_TYPE == "CNT":
+        return bgsegm().createBackgroundSubtractorCNT(**params)
+    raise ValueError(f"Detector inválido: {BGS_TYPE}")
+
+
+def getKernels(kernels):
+    """
+    Monta os kernels (closing, opening, dilation) uma única vez.
+    """
+    closing, (oh, ow), (dh, dw) = kernels
+    return (
+        np.ones(tuple(closing), np.uint8) if closing else None,
+        np.ones((oh, ow), np.uint8),
+        cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (dw, dh)),
+    )
+
+
+def getFilter(img, kernels, bufs=buffers.DISABLED, iterations=2):
+    """
+    Pipeline de filtragem:
+        closing -> opening -> dilation
+    (sem closing quando o kernel dele é None), cada um com `iterations`
+    passadas. Com bufs (buffers.FrameBuffers), as saídas são escritas em
+    buffers reaproveitados em vez de arrays novos.
+    """
+    closing_k, opening_k, dilation_k = kernels
+    if closing_k is not None:
+        img = cv2.morphologyEx(img, cv2.MORPH_CLOSE, closing_k,
+                               dst=bufs.get("closing", img.shape), iterations=iterations)
+    opening = cv2.morphologyEx(img, cv2.MORPH_OPEN, opening_k,
+                               dst=bufs.get("opening", img.shape), iterations=iterations)
+    return cv2.dilate(opening, dilation_k, dst=bufs.get("dilation", img.shape), iterations=iterations)
+
+
+def cleanMask(fgmask, kernels, median_blur=0, bufs=buffers.DISABLED, iterations=2):
+    """
+    Morfologia (getFilter) + blur mediano opcional sobre a máscara bruta.
+    """
+    fgmask = getFilter(fgmask, kernels, bufs, iterations)
+    if median_blur:
+        fgmask = cv2.medianBlur(fgmask, median_blur, dst=bufs.get("median", fgmask.shape))
+    return fgmask
+
+
+def loadProfile(path):
+    """
+    Parâmetros de detecção de um perfil de câmera (só PROFILE_KEYS).
+    """
+    with open(path, encoding="utf-8") as f:
+        profile = json.load(f)
+    found = {key: profile[key] for key in PROFILE_KEYS if key in profile}
+    if "bgs" in found and found["bgs"] not in BGS_TYPES:
+        raise ValueError(f"Detector inválido no perfil {path}: {found['bgs']}")
+    if "kernels" in found and len(found["kernels"]) != 3:
+        raise ValueError(f"Perfil {path}: kernels deve ter (closing, opening, dilation)")
+    return found
+
+
+def saveProfile(path, profile):
+    """
+    Grava o perfil de câmera (troca atômica do arquivo).
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp, path)
+
+
+def getCentroid(x, y, w, h):
+    """
+    Calcula o centróide do bounding box.
+    """
+    return x + w//2, y + h//2
+
+
+def resize(frame, scale, bufs=buffers.DISABLED):
+    """
+    Frame redimensionado por `scale` (o próprio frame com scale = 1.0).
+    """
+    if scale == 1.0:
+        return frame
+    dst = bufs.get("resize", buffers.scaledShape(frame.shape, scale))
+    return cv2.resize(frame, (0, 0), dst=dst, fx=scale, fy=scale)
+
+
+class MaskEngine:
+    """
+    Background subtraction + limpeza da máscara, com o estado (BGS, kernels,
+    blocos) de uma execução.
+    """
+
+    def __init__(self, bgs, kernels, median_blur=0, bgs_params=None, size=None,
+                 grid=None, tile_workers=None, bufs=buffers.DISABLED, prof=None, iterations=2):
+        """
+        Parâmetros:
+            bgs         : tipo do BGS (BGS_TYPES)
+            kernels     : tamanhos (closing, opening, dilation), ver o módulo
+            median_blur : abertura do blur mediano depois da morfologia (0 = sem)
+            bgs_params  : argumentos do construtor do BGS
+            size        : (largura, altura) da imagem; obrigatório com grid
+            grid        : (colunas, linhas) do modo em blocos (tiles.py); None = imagem inteira
+            tile_workers: threads dos blocos (None = uma por bloco)
+            bufs        : buffers.FrameBuffers das saídas (o chamador chama advance())
+            prof        : profiler.StageProfiler (None = desligado)
+            iterations  : passadas de cada operação morfológica
+        """
+        self.bgs_type = bgs
+        self.bgs_params = bgs_params or {}
+        self.kernels = getKernels(kernels)
+        self.median_blur = median_blur
+        self.iterations = iterations
+        self.bufs = bufs
+        self.prof = prof or profiler.DISABLED
+
+        self.bg = None
+        self.tiled = None
+        if not grid:
+            self.bg = self.newBGS()
+        else:
+            self.tiled = tiles.TiledMask(
+                size[0], size[1], grid,
+                make_bgs=self.newBGS,
+                clean=lambda mask, tile_bufs: cleanMask(mask, self.kernels, median_blur, tile_bufs,
+                                                        iterations),
+                reach=tiles.filterReach(kernels, median_blur, iterations),
+                workers=tile_workers,
+            )
+
+    def newBGS(self):
+        """
+        BGS novo com o tipo e os parâmetros configurados.
+        """
+        return getBGSubtractor(self.bgs_type, **self.bgs_params)
+
+    def close(self):
+        """
+        Encerra o pool de threads dos blocos (modo em blocos).
+        """
+        if self.tiled is not None:
+            self.tiled.close()
+
+    def foreground(self, image):
+        """
+        Aplica o BGS (máscara bruta).
+        """
+        with self.prof.stage("bg_apply"):
+            fgmask = self.bufs.get("fgmask", image.shape[:2])
+            if self.tiled is not None:
+                return self.tiled.apply(image, fgmask)
+            return self.bg.apply(image, fgmask=fgmask)
+
+    def clean(self, fgmask):
+        """
+        Morfologia (+ blur mediano) sobre a máscara bruta.
+        """
+        prof = self.prof
+        if self.tiled is not None:
+            with prof.stage("filter"):
+                return self.tiled.clean(fgmask, self.bufs.get("tiled", fgmask.shape))
+
+        with prof.stage("filter"):
+            fgmask = getFilter(fgmask, self.kernels, self.bufs, self.iterations)
+        if self.median_blur:
+            with prof.stage("median_blur"):
+                fgmask = cv2.medianBlur(fgmask, self.median_blur,
+                                        dst=self.bufs.get("median", fgmask.shape))
+        return fgmask
+
+    def mask(self, image):
+        """
+        Máscara de primeiro plano limpa.
+        """
+        return self.clean(self.foreground(image))
+
+    def backgroundImage(self):
+        """
+        Imagem de fundo aprendida pelo BGS (None para MOG/GMG).
+        """
+        if self.tiled is not None:
+            return self.tiled.backgroundImage()
+        try:
+            return self.bg.getBackgroundImage()
+        except cv2.error:
+            return None
+
+    def seed(self, background, times):
+        """
+        Semeia o BGS (novo) com uma imagem de fundo do tamanho da entrada.
+        """
+        if self.tiled is not None:
+            self.tiled.seed(background, times)
+            return
+        for _ in range(times):
+            self.bg.apply(background)
@@ -0,0 +1,864 @@
+# headless.py
+"""
+Execução sem interface gráfica (servidores sem display).
+
+Roda a mesma lógica dos três scripts — contador de veículos, detecção de
+movimento e distanciamento social — sem cv2.imshow / cv2.waitKey /
+cv2.selectROI e sem desenhar nada no frame. A ROI, o tipo de background
+subtractor e os limiares vêm da linha de comando ou de um arquivo JSON.
+
+Os resultados são emitidos como JSON Lines (um evento por linha):
+    {"event": "detection", "frame": 12, "x": .., "y": .., "w": .., "h": .., "area": .., ...}
+    {"event": "counts", "frame": 300, "cars": 4, "trucks": 1}
+    {"event": "crossing", "frame": 310, "zone": "norte", "counter": "faixa1", "direction": "desce", ...}
+    {"event": "checkpoint", "frame": 5000}
+    {"event": "summary", "frames": 9000, "fps": 412.3, ...}
+
+Exemplos:
+    python headless.py contador --video video/cars.mp4 --roi 100,200,640,300
+    python headless.py distanciamento --config camera01.json --output eventos.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import cv2
+
+import engine                    # usa engine.MaskEngine
+import coarse                    # usa coarse.CoarseToFine
+import pipeline                  # usa pipeline.FramePipeline
+import profiler                  # usa profiler.StageProfiler
+import gate                      # usa gate.MotionGate
+import buffers                   # usa buffers.FrameBuffers
+import blobs                     # usa blobs.findBlobs
+import proximity                 # usa proximity.ProximityEngine
+import stride                    # usa stride.AdaptiveStride
+import validator                 # usa validator.SimpleValidator
+import zones                     # usa zones.buildZones
+import checkpoint                # usa checkpoint.Checkpointer
+import countstore                # usa countstore.CountStore
+
+# Tipos de background subtractor disponíveis
+BGS_TYPES = engine.BGS_TYPES
+
+# =====================================================================
+# CONFIGURAÇÃO PADRÃO DE CADA MODO (mesmos valores dos scripts)
+# =====================================================================
+
+# Kernels: (closing, opening, dilation) — closing/opening são retângulos
+# de uns e dilation é uma elipse (engine.getKernels). Movimento e
+# distanciamento não fazem closing (None), como os scripts: na cadeia
+# original o resultado dele nunca era usado.
+DEFAULTS = {
+    "contador": {
+        "video": "video/cars.mp4",
+        "bgs": "MOG2",
+        "roi": None,                    # None = frame inteiro
+        "min_area": None,               # None = área da ROI / 250
+        "max_area": 15000,
+        "truck_area_threshold": 5000,
+        "scale": 1.0,
+        "median_blur": 0,
+        "kernels": [[3, 3], [3, 3], [3, 3]],
+        "min_distance": None,
+        "homography": None,
+        "zones": None,                  # ROIs nomeadas com linhas/polígonos (zones.py)
+    },
+    "movimento": {
+        "video": "video/video_animal.mp4",
+        "bgs": "GMG",
+        "roi": None,
+        "min_area": 250,
+        "max_area": None,
+        "truck_area_threshold": None,
+        "scale": 0.5,
+        "median_blur": 5,
+        "kernels": [None, [3, 3], [3, 3]],
+        "min_distance": None,
+        "homography": None,
+        "zones": None,
+    },
+    "distanciamento": {
+        "video": "video/distanciamento.mp4",
+        "bgs": "MOG",
+        "roi": None,
+        "min_area": 400,
+        "max_area": 800,
+        "truck_area_threshold": None,
+        "scale": 0.5,
+        "median_blur": 5,
+        "kernels": [None, [3, 5], [2, 2]],
+        "min_distance": 50,         # px no frame redimensionado (ou unidades do chão); 0 = desligado
+        "homography": None,         # matriz 3x3 imagem -> chão (proximity.py)
+        "zones": None,
+    },
+}
+
+# Parâmetros do construtor do BGS por modo e tipo (BGS_PARAMS dos scripts),
+# usados quando bgs_params não é informado
+BGS_PARAMS = {
+    "contador": {},
+    "movimento": {},
+    "distanciamento": {"MOG2": {"detectShadows": False, "varThreshold": 100}},
+}
+
+# Opções gerais (valem para todos os modos)
+GENERAL_DEFAULTS = {
+    "output": "-",          # "-" = stdout
+    "counts_every": 0,      # emite contagens parciais a cada N frames (0 = só no fim)
+    "detections": True,     # emite um evento por detecção
+    "pipeline": False,      # usa pipeline.FramePipeline (leitura em outra thread)
+    "queue_size": 4,
+    "queue_policy": "block",
+    "profile": None,        # arquivo .json/.csv com latência por estágio (None = desligado)
+    "profile_every": 10.0,  # segundos entre snapshots do profiler
+    "gate": False,          # pula morfologia/contornos em frames sem movimento
+    "gate_min_fraction": 0.001,
+    "gate_hold": 5,
+    "adaptive_stride": False,   # analisa 1 a cada N frames se não acompanhar o vídeo
+    "max_stride": 4,
+    "latency_ceiling": 1.0,     # atraso máximo (s) em relação ao vídeo
+    "reuse_buffers": True,      # escreve os estágios em buffers pré-alocados (buffers.py)
+    "extraction": "contours",   # "contours" ou "components" (blobs.py)
+    "proximity_method": "auto", # "auto", "dense" ou "grid" (proximity.py)
+    "bgs_params": None,         # argumentos do construtor do BGS (None = BGS_PARAMS do modo)
+    "iterations": 2,            # passadas de cada operação morfológica (engine.getFilter)
+    "camera_profile": None,     # perfil de câmera do autotune.py (bgs, kernels, ...)
+    "tiles": None,              # [colunas, linhas]: BGS + limpeza em blocos paralelos (tiles.py)
+    "tile_workers": None,       # threads dos blocos (None = uma por bloco)
+    "coarse": None,             # fator da passada grosseira (ex.: 0.25; coarse.py); None = desligado
+    "coarse_threshold": 25,     # diferença mínima para o fundo nativo (tons de cinza)
+    "coarse_min_area": 4,       # área mínima (px reduzidos) de uma região candidata
+    "checkpoint": None,         # pasta dos checkpoints (checkpoint.py); None = desligado
+    "checkpoint_every": 1000,   # frames entre checkpoints
+    "resume": False,            # retoma do último checkpoint da pasta
+    "resume_seed": 20,          # aplicações da imagem de fundo salva no BGS novo
+    "resume_warmup": 500,       # frames antes do checkpoint que só atualizam o BGS (~histórico do BGS)
+    "count_store": None,        # pasta das contagens por intervalo (countstore.py); None = desligado
+    "count_interval": 60,       # segundos por bucket
+    "count_start": None,        # timestamp do frame 0 (None = hora de início da execução)
+}
+
+# Resultado de blobs() para frames sem movimento (gate)
+NO_BLOBS = (np.zeros((0, 4), np.int64), np.zeros(0))
+NO_ZONES = np.zeros(0, np.int64)
+
+# =====================================================================
+# FUNÇÕES AUXILIARES
+# =====================================================================
+
+def parseROI(text):
+    """
+    Converte "x,y,w,h" em tupla de inteiros.
+    """
+    values = [int(v) for v in text.split(",")]
+    if len(values) != 4:
+        raise argparse.ArgumentTypeError("ROI deve ser x,y,w,h")
+    return tuple(values)
+
+
+def parseGrid(text):
+    """
+    Converte "2x2" em [colunas, linhas].
+    """
+    try:
+        cols, rows = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("grade deve ser COLUNASxLINHAS, ex.: 2x2")
+    if cols < 1 or rows < 1:
+        raise argparse.ArgumentTypeError("grade deve ter pelo menos 1x1")
+    return [cols, rows]
+
+
+def parseZones(path):
+    """
+    Lê as zonas de um arquivo JSON: a lista de zonas ou {"zones": [...]}.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as exc:
+        raise argparse.ArgumentTypeError(f"não foi possível ler as zonas de {path}: {exc}")
+    if isinstance(data, dict):
+        data = data.get("zones")
+    if not isinstance(data, list):
+        raise argparse.ArgumentTypeError(f"arquivo de zonas {path} deve ter uma lista de zonas")
+    return data
+
+
+def parseHomography(text):
+    """
+    Homografia 3x3 como "h11,h12,...,h33" ou arquivo JSON com a matriz
+    ou com 4 correspondências {"image": [[x, y], ...], "ground": [[x, y], ...]}.
+    """
+    if os.path.exists(text):
+        try:
+            with open(text, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            raise argparse.ArgumentTypeError(f"não foi possível ler a homografia de {text}: {exc}")
+        if isinstance(data, dict):
+            return proximity.homographyFromPoints(data["image"], data["ground"]).tolist()
+        values = np.asarray(data, dtype=np.float64).ravel()
+    else:
+        values = np.array([float(v) for v in text.split(",")])
+    if values.size != 9:
+        raise argparse.ArgumentTypeError("homografia deve ter 9 valores")
+    return values.reshape(3, 3).tolist()
+
+# =====================================================================
+# PROCESSADORES (um por modo)
+# =====================================================================
+
+class FrameProcessor:
+    """
+    Processa frames de um modo e devolve a lista de eventos de cada frame.
+    Mantém o estado (BGS, validator) entre frames.
+    """
+
+    def __init__(self, mode, cfg, frame_size, prof=None, fps=None):
+        """
+        Parâmetros:
+            mode      : "contador", "movimento" ou "distanciamento"
+            cfg       : dicionário de configuração já mesclado
+            frame_size: (largura, altura) do vídeo de entrada
+            prof      : profiler.StageProfiler (None = desligado)
+            fps       : fps do vídeo (instante de cada frame nas contagens)
+        """
+        self.mode = mode
+        self.cfg = cfg
+        self.prof = prof or profiler.DISABLED
+        self.frame_index = 0
+
+        # ROI no frame já redimensionado
+        width = int(frame_size[0] * cfg["scale"])
+        height = int(frame_size[1] * cfg["scale"])
+        self.roi = tuple(cfg["roi"]) if cfg["roi"] else (0, 0, width, height)
+
+        # Zonas: o BGS roda uma vez sobre o retângulo que envolve todas
+        self.zones = None
+        if cfg["zones"]:
+            if mode != "contador":
+                raise ValueError("zones só vale no modo contador")
+            self.zones = zones.buildZones(cfg["zones"])
+            self.roi = zones.unionROI(self.zones)
+        x, y, w, h = self.roi
+
+        self.min_area = cfg["min_area"]
+        if self.min_area is None:
+            self.min_area = int(w * h / 250)
+        self.max_area = cfg["max_area"]
+
+        # BGS + limpeza (engine.py); modo em blocos: um BGS por bloco, blocos em
+        # paralelo; modo coarse: BGS reduzido + blobs refinados em resolução nativa
+        self.buffers = buffers.FrameBuffers(enabled=cfg["reuse_buffers"])
+        self.coarse = None
+        if cfg["coarse"]:
+            if self.zones is not None or cfg["tiles"]:
+                raise ValueError("coarse não combina com zones nem com tiles")
+            self.coarse = self.engine = coarse.CoarseToFine(
+                cfg["coarse"], cfg["bgs"], cfg["kernels"], cfg["median_blur"], cfg["bgs_params"],
+                threshold=cfg["coarse_threshold"], candidate_min_area=cfg["coarse_min_area"],
+                bufs=self.buffers, prof=self.prof, iterations=cfg["iterations"],
+            )
+        else:
+            self.engine = engine.MaskEngine(
+                cfg["bgs"], cfg["kernels"], cfg["median_blur"], cfg["bgs_params"],
+                size=(w, h), grid=cfg["tiles"], tile_workers=cfg["tile_workers"],
+                bufs=self.buffers, prof=self.prof, iterations=cfg["iterations"],
+            )
+        self.gate = gate.MotionGate(cfg["gate"], cfg["gate_min_fraction"], cfg["gate_hold"])
+
+        # Pares de pessoas próximas demais (distanciamento)
+        self.proximity = None
+        if mode == "distanciamento" and cfg["min_distance"]:
+            self.proximity = proximity.ProximityEngine(cfg["min_distance"], cfg["homography"],
+                                                       cfg["proximity_method"])
+
+        self.validator = None
+        if self.zones is not None:
+            # Um validator por zona, com os limiares próprios da zona
+            for zone in self.zones:
+                zw, zh = zone.roi[2:]
+                if zone.min_area is None:
+                    zone.min_area = cfg["min_area"] if cfg["min_area"] is not None else int(zw * zh / 250)
+                if zone.max_area is None:
+                    zone.max_area = self.max_area
+                if zone.truck_area_threshold is None:
+                    zone.truck_area_threshold = cfg["truck_area_threshold"]
+                zone.validator = validator.SimpleValidator(
+                    min_area=zone.min_area,
+                    truck_area_threshold=zone.truck_area_threshold,
+                    counters=zone.localCounters() or None
+                )
+        elif mode == "contador":
+            self.validator = validator.SimpleValidator(
+                min_area=self.min_area,
+                truck_area_threshold=cfg["truck_area_threshold"]
+            )
+
+        # Contagens por intervalo de tempo: instante do frame = início + frame / fps
+        self.store = None
+        if cfg["count_store"]:
+            if mode != "contador":
+                raise ValueError("count_store só vale no modo contador")
+            self.store = countstore.CountStore(cfg["count_store"], cfg["count_interval"])
+            self.fps = fps or 30.0
+            self.clock_start = cfg["count_start"] if cfg["count_start"] is not None else time.time()
+
+        # Totais para o resumo
+        self.detections = 0
+        self.warnings = 0
+        self.motion_frames = 0
+
+    def close(self):
+        """
+        Encerra o pool de threads dos blocos (modo em blocos) e grava as
+        contagens pendentes.
+        """
+        self.engine.close()
+        if self.store is not None:
+            self.store.close()
+
+    def mask(self, frame):
+        """
+        Redimensiona, recorta a ROI e devolve a máscara de primeiro plano.
+        """
+        return self.clean(self.foreground(frame))
+
+    def foreground(self, frame):
+        """
+        Redimensiona, recorta a ROI e aplica o BGS (máscara bruta).
+        """
+        scale = self.cfg["scale"]
+        if scale != 1.0:
+            with self.prof.stage("resize"):
+                frame = engine.resize(frame, scale, self.buffers)
+
+        x, y, w, h = self.roi
+        return self.engine.foreground(frame[y:y + h, x:x + w])
+
+    def clean(self, fgmask):
+        """
+        Morfologia (+ blur mediano) sobre a máscara bruta.
+        """
+        return self.engine.clean(fgmask)
+
+    def blobs(self, fgmask):
+        """
+        Extrai as caixas (x, y, w, h) e áreas dos blobs dentro dos limites
+        de área, com o backend cfg["extraction"] (blobs.py). No modo coarse,
+        os blobs são refinados em resolução nativa (coarse.py).
+        """
+        if self.coarse is not None:
+            if self.mode == "contador":
+                return self.coarse.blobs(fgmask, self.cfg["extraction"], self.min_area,
+                                         self.max_area, inclusive_min=False)
+            return self.coarse.blobs(fgmask, self.cfg["extraction"], self.min_area)
+        if self.mode == "contador":
+            # Filtragem básica de ruído (igual ao contador-veiculos.py)
+            boxes, areas, _ = blobs.findBlobs(fgmask, self.cfg["extraction"], self.min_area,
+                                              self.max_area, inclusive_min=False, bufs=self.buffers)
+        else:
+            boxes, areas, _ = blobs.findBlobs(fgmask, self.cfg["extraction"], self.min_area,
+                                              bufs=self.buffers)
+        return boxes, areas
+
+    def zoneBlobs(self, fgmask):
+        """
+        Blobs de cada zona, extraídos do pedaço da máscara (da ROI de
+        união) que cabe à zona, em coordenadas da ROI da zona.
+        Retorna (boxes, areas, índice da zona de cada blob).
+        """
+        found = [blobs.findBlobs(zone.view(fgmask, self.roi[:2]), self.cfg["extraction"],
+                                 zone.min_area, zone.max_area, inclusive_min=False)[:2]
+                 for zone in self.zones]
+        index = np.repeat(np.arange(len(self.zones)), [len(a) for _, a in found])
+        return (np.concatenate([b for b, _ in found]), np.concatenate([a for _, a in found]), index)
+
+    def process(self, frame, step=1):
+        """
+        Processa um frame e retorna a lista de eventos gerados.
+        step > 1 indica que step - 1 frames foram pulados antes deste.
+        """
+        self.frame_index += step
+        fgmask = self.foreground(frame)
+
+        # Gate de movimento: o BGS já foi atualizado; sem movimento, pula o resto
+        boxes, areas = NO_BLOBS
+        zone_index = NO_ZONES
+        if self.gate.check(fgmask):
+            with self.gate.measure():
+                fgmask = self.clean(fgmask)
+                with self.prof.stage("find_contours"):
+                    if self.zones is not None:
+                        boxes, areas, zone_index = self.zoneBlobs(fgmask)
+                    else:
+                        boxes, areas = self.blobs(fgmask)
+        events = []
+        detections = self.cfg["detections"]
+
+        def detection(i, **extra):
+            x, y, w, h = boxes[i].tolist()
+            event = {"event": "detection", "frame": self.frame_index,
+                     "x": x, "y": y, "w": w, "h": h, "area": float(areas[i])}
+            event.update(extra)
+            return event
+
+        if self.zones is not None:
+            # Cada zona registra só os seus blobs no seu validator
+            for z, zone in enumerate(self.zones):
+                idx = np.flatnonzero(zone_index == z)
+                before = zone.validator.get_counts()
+                with self.prof.stage("validator"):
+                    vtypes, counted, vids = zone.validator.register_frame(
+                        blobs.centroids(boxes[idx]), areas[idx].astype(np.int64), step)
+                if self.store is not None:
+                    self.storeCounts(zone.name, zone.validator, before)
+
+                if detections:
+                    for k, i in enumerate(idx.tolist()):
+                        events.append(detection(i, zone=zone.name, type=vtypes[k], id=int(vids[k]),
+                                                counted=bool(counted[k])))
+                for vid, counter, direction, vtype in zone.validator.frame_crossings:
+                    events.append({"event": "crossing", "frame": self.frame_index, "zone": zone.name,
+                                   "counter": counter, "direction": direction, "type": vtype,
+                                   "id": int(vid)})
+
+        elif self.mode == "contador":
+            before = self.validator.get_counts()
+            with self.prof.stage("validator"):
+                vtypes, counted, vids = self.validator.register_frame(
+                    blobs.centroids(boxes), areas.astype(np.int64), step)
+            if self.store is not None:
+                self.storeCounts("roi", self.validator, before)
+
+            if detections:
+                for i in range(len(boxes)):
+                    events.append(detection(i, type=vtypes[i], id=int(vids[i]),
+                                            counted=bool(counted[i])))
+
+        elif self.mode == "movimento":
+            if len(boxes):
+                self.motion_frames += 1
+            if detections:
+                events.extend(detection(i) for i in range(len(boxes)))
+
+        else:
+            # Aviso antigo, por área do blob (grupos grandes)
+            if self.max_area is not None:
+                warnings = areas >= self.max_area
+            else:
+                warnings = np.zeros(len(areas), dtype=bool)
+            self.warnings += int(warnings.sum())
+
+            if self.proximity is None:
+                if detections:
+                    events.extend(detection(i, warning=bool(warnings[i])) for i in range(len(boxes)))
+            else:
+                with self.prof.stage("proximity"):
+                    pi, pj, dist, violators = self.proximity.check(boxes, self.roi[:2])
+                if detections:
+                    events.extend(detection(i, warning=bool(warnings[i]), violation=bool(violators[i]))
+                                  for i in range(len(boxes)))
+                if len(pi):
+                    # i, j: posição das detecções do frame (ordem dos eventos "detection")
+                    events.append({
+                        "event": "proximity", "frame": self.frame_index, "violations": len(pi),
+                        "pairs": [[a, b, round(d, 3)]
+                                  for a, b, d in zip(pi.tolist(), pj.tolist(), dist.tolist())],
+                    })
+
+        self.detections += len(boxes)
+
+        every = self.cfg["counts_every"]
+        if every and self.frame_index // every != (self.frame_index - step) // every:
+            events.append(self.counts())
+
+        # Checkpoint: o estado é capturado aqui (thread de processamento) e
+        # gravado pelo sink, depois dos eventos deste frame
+        every = self.cfg["checkpoint_every"]
+        if self.cfg["checkpoint"] and every and \
+                self.frame_index // every != (self.frame_index - step) // every:
+            events.append({"event": "checkpoint", "frame": self.frame_index,
+                           "snapshot": (self.state(), self.backgroundImage(), self.fineBackground())})
+
+        return events
+
+    def storeCounts(self, zone, zone_validator, before):
+        """
+        Soma no count store os veículos contados no frame (diferença dos
+        totais do validator) e os cruzamentos dos contadores.
+        """
+        ts = self.clock_start + self.frame_index / self.fps
+        cars, trucks = zone_validator.get_counts()
+        if cars > before[0]:
+            self.store.add(ts, zone, "car", n=cars - before[0])
+        if trucks > before[1]:
+            self.store.add(ts, zone, "truck", n=trucks - before[1])
+        for _, counter, direction, vtype in zone_validator.frame_crossings:
+            self.store.add(ts, zone, vtype, counter, direction)
+
+    # -----------------------------
+    # Checkpoint / retomada
+    # -----------------------------
+    def state(self):
+        """
+        Estado da execução (serializável em JSON) para o checkpoint.
+        """
+        state = {"frame_index": self.frame_index, "detections": self.detections,
+                 "warnings": self.warnings, "motion_frames": self.motion_frames}
+        if self.validator is not None:
+            state["validator"] = self.validator.get_state()
+        if self.zones is not None:
+            state["zones"] = {zone.name: zone.validator.get_state() for zone in self.zones}
+        if self.proximity is not None:
+            p = self.proximity
+            state["proximity"] = [p.frames, p.violations, p.violation_frames, p.max_violations]
+        if self.store is not None:
+            state["count_store"] = self.store.get_state()
+            state["clock_start"] = self.clock_start
+        return state
+
+    def restore(self, state):
+        """
+        Restaura o estado salvo por state().
+        """
+        self.frame_index = state["frame_index"]
+        self.detections = state["detections"]
+        self.warnings = state["warnings"]
+        self.motion_frames = state["motion_frames"]
+        if self.validator is not None:
+            self.validator.set_state(state["validator"])
+        for zone in self.zones or ():
+            zone.validator.set_state(state["zones"][zone.name])
+        if self.proximity is not None:
+            p = self.proximity
+            p.frames, p.violations, p.violation_frames, p.max_violations = state["proximity"]
+        if self.store is not None and "count_store" in state:
+            self.store.set_state(state["count_store"])
+            self.clock_start = state["clock_start"]
+
+    def backgroundImage(self):
+        """
+        Imagem de fundo aprendida pelo BGS (None para MOG/GMG).
+        """
+        return self.engine.backgroundImage()
+
+    def seed(self, background, times):
+        """
+        Semeia o BGS (novo) com a imagem de fundo salva (tamanho da ROI).
+        """
+        self.engine.seed(background, times)
+
+    def fineBackground(self):
+        """
+        Cópia do fundo nativo do modo coarse (None fora dele ou antes do
+        primeiro frame).
+        """
+        return self.coarse.fineBackground() if self.coarse is not None else None
+
+    def seedFine(self, fine):
+        """
+        Restaura o fundo nativo do modo coarse salvo por fineBackground().
+        """
+        if self.coarse is not None:
+            self.coarse.seedFine(fine)
+
+    def warm(self, frame):
+        """
+        Frame de pré-aquecimento: só atualiza o BGS (sem eventos).
+        """
+        self.foreground(frame)
+
+    def counts(self):
+        """
+        Evento com os totais atuais do modo.
+        """
+        event = {"event": "counts", "frame": self.frame_index, "detections": self.detections}
+        if self.validator is not None:
+            event["cars"], event["trucks"] = self.validator.get_counts()
+        if self.zones is not None:
+            event["cars"] = event["trucks"] = 0
+            event["zones"] = {}
+            for zone in self.zones:
+                cars, trucks = zone.validator.get_counts()
+                event["cars"] += cars
+                event["trucks"] += trucks
+                event["zones"][zone.name] = {"cars": cars, "trucks": trucks,
+                                             "crossings": zone.validator.get_crossings()}
+        if self.mode == "movimento":
+            event["motion_frames"] = self.motion_frames
+        if self.mode == "distanciamento":
+            event["warnings"] = self.warnings
+            if self.proximity is not None:
+                event["violations"] = self.proximity.violations
+                event["violation_frames"] = self.proximity.violation_frames
+        return event
+
+# =====================================================================
+# EXECUÇÃO
+# =====================================================================
+
+def run(mode, cfg, emit, output=None):
+    """
+    Processa o vídeo inteiro de cfg["video"] chamando emit(evento) para cada
+    evento. Retorna o evento de resumo (também emitido no final).
+    output: arquivo onde emit() escreve (a posição vai para o checkpoint).
+    """
+    cap = cv2.VideoCapture(cfg["video"])
+    if not cap.isOpened():
+        raise IOError(f"Erro ao abrir o vídeo de entrada: {cfg['video']}")
+
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                  int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    cap_fps = cap.get(cv2.CAP_PROP_FPS) or None
+    prof = profiler.StageProfiler(enabled=bool(cfg["profile"]), dump_path=cfg["profile"],
+                                  dump_every=cfg["profile_every"])
+    processor = FrameProcessor(mode, cfg, frame_size, prof, cap_fps)
+
+    checkpointer = None
+    if cfg["checkpoint"]:
+        checkpointer = checkpoint.Checkpointer(cfg["checkpoint"], cfg["checkpoint_every"],
+                                               checkpoint.fingerprint(mode, cfg), output)
+        if cfg["resume"]:
+            resume(cap, processor, checkpointer, cfg["resume_seed"], cfg["resume_warmup"])
+    # Frames já processados antes da retomada ficam fora do fps
+    first_frame = processor.frame_index
+
+    def sink(events):
+        for event in events:
+            snapshot = event.pop("snapshot", None)
+            emit(event)
+            if snapshot is not None:
+                checkpointer.save(event["frame"], *snapshot)
+
+    pacer = None
+    if cfg["adaptive_stride"]:
+        if cfg["pipeline"]:
+            raise ValueError("adaptive_stride não funciona com pipeline (use queue_policy="
+                             "drop-oldest: os frames descartados viram o passo do processamento)")
+        pacer = stride.AdaptiveStride(cap_fps, True, cfg["max_stride"], cfg["latency_ceiling"])
+
+    # Com reuse_buffers, o frame decodificado é escrito sempre no mesmo array
+    frame = None
+    reuse = cfg["reuse_buffers"]
+    start = time.perf_counter()
+    if pacer is not None:
+        while True:
+            t0 = time.perf_counter()
+            step = pacer.step()
+            with prof.stage("decode"):
+                ok, frame = stride.advance(cap, step, frame if reuse else None)
+            if not ok:
+                break
+            sink(processor.process(frame, step))
+            pacer.done(step, time.perf_counter() - t0)
+            prof.tick()
+    elif cfg["pipeline"]:
+        frame_pipeline = pipeline.FramePipeline(cap, processor.process, sink, cfg["queue_size"],
+                                                cfg["queue_policy"], prof, reuse, steps=True)
+        frame_pipeline.run()
+    else:
+        while True:
+            with prof.stage("decode"):
+                ok, frame = cap.read(frame if reuse else None)
+            if not ok:
+                break
+            sink(processor.process(frame))
+            prof.tick()
+    elapsed = time.perf_counter() - start
+    prof.close()
+    processor.close()
+    cap.release()
+
+    summary = processor.counts()
+    summary["event"] = "summary"
+    summary["video"] = cfg["video"]
+    summary["frames"] = processor.frame_index
+    summary["seconds"] = round(elapsed, 3)
+    summary["fps"] = round((processor.frame_index - first_frame) / elapsed, 1) if elapsed > 0 else 0.0
+    if cfg["gate"]:
+        summary["gate"] = processor.gate.stats(cap_fps)
+    if processor.proximity is not None:
+        summary["proximity"] = processor.proximity.stats()
+    if processor.coarse is not None:
+        summary["coarse"] = processor.coarse.stats()
+    if pacer is not None:
+        summary["stride"] = pacer.stats()
+    if cfg["pipeline"] and pacer is None:
+        summary["dropped"] = frame_pipeline.dropped
+    if checkpointer is not None:
+        summary["checkpoint"] = checkpointer.stats()
+    if processor.store is not None:
+        summary["count_store"] = processor.store.stats()
+    emit(summary)
+    return summary
+
+
+def resume(cap, processor, checkpointer, seed, warmup):
+    """
+    Restaura o último checkpoint (se houver) e posiciona o vídeo nele:
+    semeia o BGS com a imagem de fundo (e, no modo coarse, o fundo nativo)
+    e pré-aquece com `warmup` frames.
+    """
+    saved = checkpointer.load()
+    if saved is None:
+        return
+    state, background, fine = saved
+    processor.restore(state)
+    target = processor.frame_index
+
+    if background is not None:
+        processor.seed(background, seed)
+    if fine is not None:
+        processor.seedFine(fine)
+
+    start = max(0, target - warmup)
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        # Alguns codecs não posicionam exatamente: usa a posição real
+        start = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if start > target:
+        raise IOError(f"Não foi possível posicionar o vídeo no frame {target}")
+
+    for _ in range(target - start):
+        ok, frame = cap.read()
+        if not ok:
+            raise IOError(f"O vídeo terminou antes do frame {target} do checkpoint")
+        processor.warm(frame)
+
+
+def buildConfig(mode, *overrides):
+    """
+    Parte dos padrões do modo e aplica, em ordem, cada dicionário de
+    sobrescrita (valores None são ignorados).
+    """
+    cfg = dict(DEFAULTS[mode])
+    cfg.update(GENERAL_DEFAULTS)
+
+    for override in overrides:
+        for key, value in override.items():
+            if value is not None:
+                cfg[key] = value
+
+    if cfg["bgs"] not in BGS_TYPES:
+        raise ValueError(f"Detector inválido: {cfg['bgs']}")
+    if cfg["bgs_params"] is None:
+        cfg["bgs_params"] = BGS_PARAMS[mode].get(cfg["bgs"])
+    return cfg
+
+
+def loadConfig(mode, args):
+    """
+    Mescla (em ordem de prioridade) linha de comando > perfil de câmera >
+    arquivo JSON > padrões. O perfil (autotune.py) vem de --camera-profile
+    ou da chave "camera_profile" do arquivo.
+    """
+    from_file = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            from_file = json.load(f)
+
+    from_cli = {k: v for k, v in vars(args).items() if k not in ("mode", "config")}
+    from_profile = {}
+    profile_path = from_cli.get("camera_profile") or from_file.get("camera_profile")
+    if profile_path:
+        from_profile = engine.loadProfile(profile_path)
+    return buildConfig(mode, from_file, from_profile, from_cli)
+
+
+def buildParser():
+    parser = argparse.ArgumentParser(description="Detecção de movimentos sem interface gráfica.")
+    parser.add_argument("mode", choices=sorted(DEFAULTS))
+    parser.add_argument("--config", help="arquivo JSON com a configuração")
+    parser.add_argument("--video", help="vídeo de entrada")
+    parser.add_argument("--bgs", choices=BGS_TYPES, help="tipo de background subtractor")
+    parser.add_argument("--roi", type=parseROI, help="ROI como x,y,w,h")
+    parser.add_argument("--zones", type=parseZones,
+                        help="arquivo JSON com zonas nomeadas e linhas/polígonos (contador)")
+    parser.add_argument("--min-area", type=float, help="área mínima do contorno")
+    parser.add_argument("--max-area", type=float, help="área máxima (contador) / aviso (distanciamento)")
+    parser.add_argument("--truck-area-threshold", type=float, help="área a partir da qual é caminhão")
+    parser.add_argument("--scale", type=float, help="fator de redimensionamento do frame")
+    parser.add_argument("--output", help="arquivo de saída JSON Lines ('-' = stdout)")
+    parser.add_argument("--counts-every", type=int, help="emite contagens a cada N frames")
+    parser.add_argument("--no-detections", dest="detections", action="store_const", const=False,
+                        help="não emite eventos por detecção")
+    parser.add_argument("--pipeline", action="store_const", const=True,
+                        help="lê o vídeo numa thread separada")
+    parser.add_argument("--queue-size", type=int)
+    parser.add_argument("--queue-policy", choices=pipeline.QUEUE_POLICIES)
+    parser.add_argument("--profile", help="grava latência por estágio neste arquivo (.json/.csv)")
+    parser.add_argument("--profile-every", type=float, help="segundos entre snapshots do profiler")
+    parser.add_argument("--gate", action="store_const", const=True,
+                        help="pula morfologia/contornos em frames sem movimento")
+    parser.add_argument("--gate-min-fraction", type=float,
+                        help="fração mínima de pixels em movimento (padrão 0.001)")
+    parser.add_argument("--gate-hold", type=int, help="frames processados após o último movimento")
+    parser.add_argument("--no-reuse-buffers", dest="reuse_buffers", action="store_const", const=False,
+                        help="aloca arrays novos a cada frame (sem buffers pré-alocados)")
+    parser.add_argument("--extraction", choices=blobs.EXTRACTION_BACKENDS,
+                        help="extração dos blobs: findContours ou connectedComponentsWithStats")
+    parser.add_argument("--min-distance", type=float,
+                        help="distância mínima entre pessoas (distanciamento; 0 = desligado)")
+    parser.add_argument("--homography", type=parseHomography,
+                        help="homografia imagem -> chão: 9 números ou arquivo JSON")
+    parser.add_argument("--proximity-method", choices=proximity.PROXIMITY_METHODS)
+    parser.add_argument("--camera-profile", help="perfil de câmera gerado pelo autotune.py")
+    parser.add_argument("--iterations", type=int, help="passadas de cada operação morfológica (padrão 2)")
+    parser.add_argument("--tiles", type=parseGrid,
+                        help="processa em blocos paralelos: COLUNASxLINHAS (ex.: 2x2)")
+    parser.add_argument("--tile-workers", type=int, help="threads dos blocos (padrão: uma por bloco)")
+    parser.add_argument("--coarse", type=float,
+                        help="BGS reduzido por este fator + blobs refinados em resolução nativa (ex.: 0.25)")
+    parser.add_argument("--coarse-threshold", type=int,
+                        help="diferença mínima para o fundo nativo no refinamento (padrão 25)")
+    parser.add_argument("--coarse-min-area", type=int,
+                        help="área mínima (px reduzidos) de uma região candidata (padrão 4)")
+    parser.add_argument("--count-store", help="pasta das contagens por intervalo de tempo (contador)")
+    parser.add_argument("--count-interval", type=float, help="segundos por bucket das contagens (padrão 60)")
+    parser.add_argument("--count-start", type=float,
+                        help="timestamp (s) do frame 0 nas contagens (padrão: hora de início)")
+    parser.add_argument("--checkpoint", help="pasta dos checkpoints periódicos")
+    parser.add_argument("--checkpoint-every", type=int, help="frames entre checkpoints (padrão 1000)")
+    parser.add_argument("--resume", action="store_const", const=True,
+                        help="retoma do último checkpoint da pasta --checkpoint")
+    parser.add_argument("--resume-seed", type=int, help="aplicações da imagem de fundo salva (padrão 20)")
+    parser.add_argument("--resume-warmup", type=int,
+                        help="frames antes do checkpoint usados só para o BGS (padrão 500)")
+    parser.add_argument("--adaptive-stride", action="store_const", const=True,
+                        help="pula frames quando o processamento não acompanha o vídeo")
+    parser.add_argument("--max-stride", type=int, help="passo máximo em regime normal (padrão 4)")
+    parser.add_argument("--latency-ceiling", type=float,
+                        help="atraso máximo em segundos antes de um salto de catch-up")
+    return parser
+
+
+def main(argv=None):
+    args = buildParser().parse_args(argv)
+    cfg = loadConfig(args.mode, args)
+
+    # Na retomada, a saída é truncada na posição gravada no checkpoint; o
+    # checkpoint é conferido antes, para não truncar a saída de outra execução
+    offset = None
+    if cfg["checkpoint"] and cfg["resume"]:
+        meta = checkpoint.loadMeta(cfg["checkpoint"], checkpoint.fingerprint(args.mode, cfg))
+        offset = meta["output_offset"] if meta else None
+
+    out = sys.stdout if cfg["output"] == "-" else checkpoint.openOutput(cfg["output"], offset)
+    try:
+        def emit(event):
+            out.write(json.dumps(event) + "\n")
+
+        run(args.mode, cfg, emit, None if out is sys.stdout else out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# pipeline.py
+import queue
+import threading
+
+import profiler                  # usa profiler.DISABLED
+
+# Políticas da fila de frames decodificados (a de resultados sempre espera)
+# - "block": o decoder espera haver espaço (não perde frames)
+# - "drop-oldest": descarta o frame mais antigo da fila (prioriza latência)
+QUEUE_POLICIES = ["block", "drop-oldest"]
+
+# Marcador de fim de fluxo entre os estágios
+_END = object()
+
+
+class FramePipeline:
+    """
+    Pipeline em 3 estágios ligados por filas limitadas:
+
+        decoder (thread)  ->  processamento (thread)  ->  render/sink (thread principal)
+
+    - O decoder só faz cap.read().
+    - O processamento chama process(frame) (ou process(frame, step), ver
+      `steps`) e repassa o resultado.
+    - O render chama render(resultado) na thread principal (cv2.imshow
+      precisa rodar nela). Se render retornar False, o pipeline para.
+    - Uma exceção em cap.read() ou em process() para o pipeline e é
+      relançada por run() na thread principal.
+
+    Como o OpenCV libera o GIL em read/apply/morfologia, a leitura do vídeo,
+    o processamento e a exibição se sobrepõem em máquinas com vários núcleos.
+    """
+
+    def __init__(self, cap, process, render, queue_size=4, policy="block", prof=None,
+                 reuse_frames=False, steps=False):
+        """
+        Parâmetros:
+            cap       : cv2.VideoCapture já aberto
+            process   : função frame -> resultado (estado do BGS fica nela)
+            render    : função resultado -> bool (False encerra)
+            queue_size: capacidade de cada fila entre estágios
+            policy    : "block" ou "drop-oldest" (só a fila de frames
+                        decodificados descarta; resultados nunca se perdem)
+            prof      : profiler.StageProfiler (filas, descartes e tempos
+                        de decode/render); None = desligado
+            reuse_frames: decodifica num rodízio fixo de arrays em vez de
+                        alocar um frame novo por leitura. O rodízio cobre
+                        todos os frames que podem estar em uso ao mesmo tempo
+                        (2 filas + 1 em cada estágio); process/render não
+                        podem guardar o frame além disso. Ignorado com
+                        "drop-oldest": ali o decoder não espera os outros
+                        estágios e daria a volta no rodízio, sobrescrevendo
+                        frames ainda em uso.
+            steps     : chama process(frame, step), com step - 1 = frames
+                        descartados pelo "drop-oldest" antes deste (como
+                        o passo adaptativo); False = process(frame)
+        """
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Política de fila inválida: {policy}")
+
+        self.cap = cap
+        self.process = process
+        self.render = render
+        self.policy = policy
+        self.prof = prof or profiler.DISABLED
+        self.steps = steps
+
+        self.decoded = queue.Queue(maxsize=queue_size)
+        self.processed = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        reuse_frames = reuse_frames and policy == "block"
+        self.frames = [None] * (2 * queue_size + 3 if reuse_frames else 1)
+
+        # Estatísticas simples
+        self.frames_read = 0
+        self.frames_rendered = 0
+        self.dropped = 0
+
+        # Primeira exceção de um estágio (relançada por run())
+        self.error = None
+
+    # -----------------------------
+    # Filas com política configurável
+    # -----------------------------
+    def _put(self, q, item, droppable=False):
+        """
+        Insere na fila. Com `droppable` e a política "drop-oldest", abre
+        espaço descartando o item mais antigo; senão espera por espaço.
+        """
+        if droppable and self.policy == "drop-oldest":
+            while not self.stop_event.is_set():
+                try:
+                    q.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                        self.dropped += 1
+                        self.prof.count("dropped_frames")
+                    except queue.Empty:
+                        pass
+            return
+
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q):
+        """
+        Retira da fila; devolve _END se o pipeline foi interrompido.
+        """
+        while not self.stop_event.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    # -----------------------------
+    # Estágios
+    # -----------------------------
+    def _stage(self, loop, out):
+        """
+        Roda o laço de um estágio. Uma exceção é guardada e para o
+        pipeline; em qualquer caso o estágio seguinte recebe _END (com o
+        pipeline parado, _get() já devolve _END).
+        """
+        try:
+            loop()
+        except BaseException as exc:
+            if self.error is None:
+                self.error = exc
+            self.stop_event.set()
+        finally:
+            self._put(out, _END)
+
+    def _decode_loop(self):
+        slot = 0
+        while not self.stop_event.is_set():
+            with self.prof.stage("decode"):
+                ok, frame = self.cap.read(self.frames[slot])
+            if not ok:
+                break
+            if len(self.frames) > 1:
+                self.frames[slot] = frame
+                slot = (slot + 1) % len(self.frames)
+            self.frames_read += 1
+            # Índice do frame no vídeo: o processamento calcula o passo
+            self._put(self.decoded, (self.frames_read, frame), droppable=True)
+            self.prof.gauge("decoded_queue", self.decoded.qsize())
+
+    def _process_loop(self):
+        last = 0
+        while True:
+            item = self._get(self.decoded)
+            if item is _END:
+                break
+            index, frame = item
+            if self.steps:
+                result = self.process(frame, index - last)
+            else:
+                result = self.process(frame)
+            last = index
+            self._put(self.processed, result)
+            self.prof.gauge("processed_queue", self.processed.qsize())
+
+    def run(self):
+        """
+        Executa o pipeline até o fim do vídeo ou até render retornar False.
+        Relança a exceção de um estágio que tenha falhado.
+        """
+        workers = [
+            threading.Thread(target=self._stage, args=(self._decode_loop, self.decoded),
+                             name="decoder", daemon=True),
+            threading.Thread(target=self._stage, args=(self._process_loop, self.processed),
+                             name="process", daemon=True),
+        ]
+        for t in workers:
+            t.start()
+
+        try:
+            while True:
+                result = self._get(self.processed)
+                if result is _END:
+                    break
+                self.frames_rendered += 1
+                with self.prof.stage("render"):
+                    keep_going = self.render(result)
+                self.prof.tick()
+                if keep_going is False:
+                    break
+        finally:
+            self.stop_event.set()
+            for t in workers:
+                t.join()
+
+        if self.error is not None:
+            raise self.error
+        return self.frames_rendered
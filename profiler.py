@@ -0,0 +1,248 @@
+# profiler.py
+"""
+Instrumentação dos estágios do processamento (latência, FPS, filas).
+
+Uso típico:
+    prof = profiler.StageProfiler(enabled=True, dump_path="profile.json")
+
+    with prof.stage("bgs"):
+        fgmask = bg.apply(roi)
+    ...
+    prof.tick()            # fim do frame (conta FPS e grava periodicamente)
+    prof.close()           # grava o último snapshot
+
+Cada estágio guarda um histograma de latência com faixas logarítmicas fixas
+(de 1 µs a ~10 s), então a memória é constante e p50/p95/p99 saem direto do
+histograma. Com enabled=False, stage() devolve sempre o mesmo contexto vazio
+e tick()/gauge()/count() retornam imediatamente — custo praticamente nulo.
+
+O arquivo de saída é JSON (um snapshot por linha) ou CSV (uma linha por
+estágio por snapshot), escolhido pela extensão de dump_path.
+"""
+import bisect
+import contextlib
+import csv
+import json
+import os
+import threading
+import time
+
+# Limites superiores das faixas do histograma (segundos): 1 µs .. ~10 s,
+# 10 faixas por década
+BUCKETS = [1e-6 * 10 ** (i / 10) for i in range(71)]
+
+# Contexto reutilizado quando o profiler está desligado
+_NULL = contextlib.nullcontext()
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências com faixas logarítmicas fixas.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """
+        Limite superior da faixa que contém o percentil p (0-100),
+        limitado ao máximo observado.
+        """
+        if self.total == 0:
+            return 0.0
+        target = p / 100.0 * self.total
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self):
+        """
+        Resumo em milissegundos.
+        """
+        return {
+            "count": self.total,
+            "mean_ms": round(1000 * self.sum / self.total, 4) if self.total else 0.0,
+            "p50_ms": round(1000 * self.percentile(50), 4),
+            "p95_ms": round(1000 * self.percentile(95), 4),
+            "p99_ms": round(1000 * self.percentile(99), 4),
+            "max_ms": round(1000 * self.max, 4),
+        }
+
+
+class _Timer:
+    """
+    Contexto que mede um estágio e registra no profiler.
+    """
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class StageProfiler:
+    """
+    Coleta latência por estágio, FPS, profundidade de filas e contadores
+    (ex.: frames descartados) e grava snapshots periódicos.
+    """
+
+    def __init__(self, enabled=False, dump_path=None, dump_every=10.0):
+        """
+        Parâmetros:
+            enabled   : liga/desliga toda a coleta
+            dump_path : arquivo .json (JSON Lines) ou .csv; None = não grava
+            dump_every: intervalo (s) entre snapshots gravados
+        """
+        self.enabled = enabled
+        self.dump_path = dump_path
+        self.dump_every = dump_every
+
+        self.stages = {}
+        self.gauges = {}
+        self.counters = {}
+        self.frames = 0
+
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._last_dump = self._start
+        self._last_frames = 0
+
+    # -----------------------------
+    # Coleta
+    # -----------------------------
+    def stage(self, name):
+        """
+        Contexto que mede o tempo do bloco como o estágio `name`.
+        """
+        if not self.enabled:
+            return _NULL
+        return _Timer(self, name)
+
+    def record(self, name, seconds):
+        """
+        Registra uma medida de latência (segundos) para o estágio.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self.stages.get(name)
+            if hist is None:
+                hist = self.stages[name] = LatencyHistogram()
+            hist.add(seconds)
+
+    def gauge(self, name, value):
+        """
+        Guarda o valor atual e o máximo de uma métrica (ex.: tamanho da fila).
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            current = self.gauges.get(name)
+            peak = value if current is None else max(current[1], value)
+            self.gauges[name] = (value, peak)
+
+    def count(self, name, n=1):
+        """
+        Incrementa um contador (ex.: frames descartados).
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def tick(self):
+        """
+        Marca o fim de um frame; grava um snapshot se o intervalo venceu.
+        """
+        if not self.enabled:
+            return
+        self.frames += 1
+        if self.dump_path and time.perf_counter() - self._last_dump >= self.dump_every:
+            self.dump()
+
+    # -----------------------------
+    # Saída
+    # -----------------------------
+    def snapshot(self):
+        """
+        Estado atual: FPS (total e desde o último snapshot), estágios, filas
+        e contadores.
+        """
+        now = time.perf_counter()
+        elapsed = now - self._start
+        interval = now - self._last_dump
+        with self._lock:
+            stages = {name: h.summary() for name, h in self.stages.items()}
+            gauges = {k: {"current": v, "max": m} for k, (v, m) in self.gauges.items()}
+            counters = dict(self.counters)
+        return {
+            "time": time.time(),
+            "frames": self.frames,
+            "fps": round(self.frames / elapsed, 2) if elapsed > 0 else 0.0,
+            "interval_fps": round((self.frames - self._last_frames) / interval, 2) if interval > 0 else 0.0,
+            "stages": stages,
+            "gauges": gauges,
+            "counters": counters,
+        }
+
+    def dump(self):
+        """
+        Acrescenta um snapshot ao arquivo de saída.
+        """
+        if not (self.enabled and self.dump_path):
+            return
+        snap = self.snapshot()
+        self._last_dump = time.perf_counter()
+        self._last_frames = self.frames
+
+        if self.dump_path.endswith(".csv"):
+            new_file = not os.path.exists(self.dump_path)
+            with open(self.dump_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(["time", "frames", "fps", "stage", "count",
+                                     "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+                for name, s in snap["stages"].items():
+                    writer.writerow([snap["time"], snap["frames"], snap["fps"], name,
+                                     s["count"], s["mean_ms"], s["p50_ms"],
+                                     s["p95_ms"], s["p99_ms"], s["max_ms"]])
+                for name, g in snap["gauges"].items():
+                    writer.writerow([snap["time"], snap["frames"], snap["fps"], f"gauge:{name}",
+                                     g["current"], "", "", "", "", g["max"]])
+                for name, n in snap["counters"].items():
+                    writer.writerow([snap["time"], snap["frames"], snap["fps"], f"counter:{name}",
+                                     n, "", "", "", "", ""])
+        else:
+            with open(self.dump_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(snap) + "\n")
+
+    def close(self):
+        """
+        Grava o snapshot final.
+        """
+        self.dump()
+
+
+# Profiler desligado compartilhado (padrão quando nenhum é informado)
+DISABLED = StageProfiler(enabled=False)
@@ -0,0 +1,187 @@
+# proximity.py
+"""
+Proximidade entre pessoas (distanciamento social de verdade).
+
+Cada detecção vira um ponto no chão: o centro da base da bounding box
+(x + w/2, y + h), que é onde a pessoa pisa. Com uma homografia (matriz 3x3
+da imagem para o plano do chão, por exemplo em metros), os pontos são
+projetados e as distâncias passam a ser reais; sem ela, a distância é em
+pixels.
+
+Os pares mais próximos que `min_distance` são violações. Métodos (todos
+vetorizados):
+    - "dense": matriz de distâncias N x N (np.hypot), triângulo superior.
+      Mais rápido para poucas pessoas.
+    - "grid":  grade com células de lado min_distance; só pares em células
+      vizinhas são comparados (metade da vizinhança, para não repetir
+      pares). Custo ~ N + pares candidatos, para centenas/milhares de
+      pessoas por frame.
+    - "auto":  "dense" até DENSE_LIMIT pontos, "grid" acima.
+"""
+import numpy as np
+import cv2
+
+PROXIMITY_METHODS = ["auto", "dense", "grid"]
+
+# Acima deste número de pontos, "auto" usa a grade
+DENSE_LIMIT = 50
+
+# Metade da vizinhança 3x3 (cada par de células vizinhas aparece uma vez)
+_HALF_NEIGHBORS = ((1, 0), (-1, 1), (0, 1), (1, 1))
+
+_NO_PAIRS = (np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0))
+
+
+def groundPoints(boxes, homography=None, offset=(0, 0)):
+    """
+    Pontos no chão (base central) das caixas (N, 4) x, y, w, h.
+
+    Parâmetros:
+        boxes     : array (N, 4)
+        homography: matriz 3x3 imagem -> chão (None = pixels)
+        offset    : somado às caixas antes da projeção (ex.: canto da ROI)
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    points = np.column_stack((boxes[:, 0] + boxes[:, 2] / 2 + offset[0],
+                              boxes[:, 1] + boxes[:, 3] + offset[1]))
+    if homography is None or len(points) == 0:
+        return points
+    H = np.asarray(homography, dtype=np.float64).reshape(3, 3)
+    return cv2.perspectiveTransform(points.reshape(-1, 1, 2), H).reshape(-1, 2)
+
+
+def homographyFromPoints(image_points, ground_points):
+    """
+    Homografia a partir de 4 pontos da imagem e suas posições no chão.
+    """
+    return cv2.getPerspectiveTransform(np.float32(image_points), np.float32(ground_points))
+
+
+def _densePairs(points, min_distance):
+    diff = points[:, None, :] - points[None, :, :]
+    dist = np.hypot(diff[..., 0], diff[..., 1])
+    i, j = np.nonzero(np.triu(dist < min_distance, k=1))
+    return i, j, dist[i, j]
+
+
+def _gridPairs(points, min_distance):
+    n = len(points)
+    cells = np.floor(points / min_distance).astype(np.int64)
+    cells -= cells.min(axis=0) - 1          # margem de 1 célula para os vizinhos
+    rows = int(cells[:, 1].max()) + 2
+    keys = cells[:, 0] * rows + cells[:, 1]
+
+    order = np.argsort(keys, kind="stable")
+    skeys = keys[order]
+    spts = points[order]
+    positions = np.arange(n)
+
+    found_i, found_j = [], []
+
+    def collect(lo, hi):
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            return
+        i = np.repeat(positions, counts)
+        starts = np.cumsum(counts) - counts
+        j = lo[i] + (np.arange(total) - starts[i])
+        found_i.append(i)
+        found_j.append(j)
+
+    # Mesma célula: só os pontos depois deste na ordenação
+    collect(positions + 1, np.searchsorted(skeys, skeys, "right"))
+
+    # Células vizinhas (metade da vizinhança)
+    for dx, dy in _HALF_NEIGHBORS:
+        target = skeys + dx * rows + dy
+        collect(np.searchsorted(skeys, target, "left"), np.searchsorted(skeys, target, "right"))
+
+    if not found_i:
+        return _NO_PAIRS
+    i = np.concatenate(found_i)
+    j = np.concatenate(found_j)
+    d = np.hypot(spts[i, 0] - spts[j, 0], spts[i, 1] - spts[j, 1])
+    keep = d < min_distance
+
+    # Volta para os índices originais, com i < j
+    a, b = order[i[keep]], order[j[keep]]
+    return np.minimum(a, b), np.maximum(a, b), d[keep]
+
+
+def closePairs(points, min_distance, method="auto"):
+    """
+    Pares (i, j) de pontos a menos de min_distance, com i < j.
+    Retorna (i, j, distâncias) como arrays.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 2:
+        return _NO_PAIRS
+    if method == "auto":
+        method = "dense" if len(points) <= DENSE_LIMIT else "grid"
+    if method == "dense":
+        return _densePairs(points, min_distance)
+    if method == "grid":
+        return _gridPairs(points, min_distance)
+    raise ValueError(f"Método de proximidade inválido: {method}")
+
+
+class ProximityEngine:
+    """
+    Violações de distância por frame + totais da execução.
+    """
+
+    def __init__(self, min_distance, homography=None, method="auto"):
+        """
+        Parâmetros:
+            min_distance: distância mínima (unidades do chão com homografia,
+                          pixels sem ela)
+            homography  : matriz 3x3 imagem -> chão (None = pixels)
+            method      : "auto", "dense" ou "grid"
+        """
+        if method not in PROXIMITY_METHODS:
+            raise ValueError(f"Método de proximidade inválido: {method}")
+        self.min_distance = min_distance
+        if homography is not None:
+            homography = np.asarray(homography, np.float64).reshape(3, 3)
+        self.homography = homography
+        self.method = method
+
+        self.frames = 0
+        self.violation_frames = 0
+        self.violations = 0
+        self.max_violations = 0
+
+    def check(self, boxes, offset=(0, 0)):
+        """
+        Analisa as caixas de um frame.
+
+        Retorna (i, j, distâncias, violadores):
+            i, j       : índices (em boxes) dos pares próximos demais
+            distâncias : distância de cada par
+            violadores : máscara booleana (N,) das caixas em algum par
+        """
+        points = groundPoints(boxes, self.homography, offset)
+        i, j, d = closePairs(points, self.min_distance, self.method)
+
+        violators = np.zeros(len(points), dtype=bool)
+        violators[i] = True
+        violators[j] = True
+
+        self.frames += 1
+        self.violations += len(i)
+        self.violation_frames += bool(len(i))
+        self.max_violations = max(self.max_violations, len(i))
+        return i, j, d, violators
+
+    def stats(self):
+        """
+        Totais para o resumo da execução.
+        """
+        return {
+            "min_distance": self.min_distance,
+            "homography": self.homography is not None,
+            "violations": self.violations,
+            "violation_frames": self.violation_frames,
+            "max_violations_per_frame": self.max_violations,
+        }
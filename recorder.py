@@ -0,0 +1,216 @@
+# recorder.py
+"""
+Gravação do vídeo anotado (caixas, rótulos, contagens) em segundo plano.
+
+O loop principal entrega uma CÓPIA de cada frame já desenhado para uma fila
+limitada; uma thread faz a codificação com cv2.VideoWriter (que libera o
+GIL) e a escrita em disco. Assim a exportação não atrasa a detecção.
+
+Opções:
+    - codec:    FourCC do cv2.VideoWriter ("mp4v", "XVID", "MJPG", "avc1", ...)
+    - every:    grava 1 a cada N frames recebidos; o vídeo sai com fps / N
+                (timelapse do tempo real, arquivo N vezes menor)
+    - segments: grava só trechos em volta dos eventos (veículo contado,
+                aviso/violação de distância, movimento): `pre` segundos antes
+                do primeiro evento até `post` segundos depois do último. Cada
+                trecho vira um arquivo <nome>-<frame inicial>.<ext>.
+
+Os frames de antes do evento ficam num anel de arrays reaproveitados (sem
+alocação por frame em regime enquanto nada acontece).
+
+Políticas quando a fila está cheia (backpressure):
+    - "block":       o loop principal espera (o vídeo sai completo)
+    - "drop-newest": descarta o frame novo (a detecção nunca espera)
+"""
+import os
+import queue
+import threading
+from collections import deque
+
+import numpy as np
+import cv2
+
+RECORD_POLICIES = ["block", "drop-newest"]
+
+# Mensagens para a thread de gravação (além dos frames)
+_OPEN = "open"
+_FRAME = "frame"
+_CLOSE = "close"
+_STOP = "stop"
+
+
+def segmentPath(path, index):
+    """
+    Nome do arquivo do trecho que começa no frame `index`.
+    """
+    stem, ext = os.path.splitext(path)
+    return f"{stem}-{index:06d}{ext}"
+
+
+class VideoRecorder:
+    """
+    Grava os frames anotados num vídeo (ou em trechos) numa thread própria.
+    """
+
+    def __init__(self, path, fps, codec="mp4v", every=1, segments=False, pre=2.0, post=3.0,
+                 queue_size=32, policy="block"):
+        """
+        Parâmetros:
+            path      : arquivo de saída (a pasta é criada aqui)
+            fps       : fps do vídeo de entrada
+            codec     : FourCC de 4 caracteres
+            every     : grava 1 a cada `every` frames recebidos
+            segments  : True = só trechos em volta dos eventos
+            pre, post : segundos gravados antes / depois dos eventos (segments)
+            queue_size: frames pendentes no máximo
+            policy    : "block" ou "drop-newest"
+        """
+        if len(codec) != 4:
+            raise ValueError(f"Codec inválido (FourCC de 4 caracteres): {codec}")
+        if policy not in RECORD_POLICIES:
+            raise ValueError(f"Política inválida: {policy}")
+        if every < 1:
+            raise ValueError("every deve ser >= 1")
+
+        self.path = path
+        self.fourcc = cv2.VideoWriter_fourcc(*codec)
+        self.every = int(every)
+        self.fps = (fps or 30.0) / self.every
+        self.segments = segments
+        self.pre_frames = round(pre * self.fps)
+        self.post_frames = round(post * self.fps)
+        self.policy = policy
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.ring = deque()          # frames antes do evento (segments)
+        self.remaining = 0           # frames ainda a gravar no trecho aberto
+        self._lock = threading.Lock()
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+        self.files = []
+        self.error = None
+        self.closed = False
+
+        self.pending = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._work, name="recorder", daemon=True)
+        self.thread.start()
+        if not segments:
+            self.pending.put((_OPEN, path))
+
+    def submit(self, frame, event=False):
+        """
+        Entrega o frame já anotado (copiado aqui: o chamador pode
+        reaproveitar o array). `event` marca um frame com evento (segments).
+        """
+        if self.closed:
+            raise RuntimeError("VideoRecorder já foi encerrado")
+
+        index = self.received
+        self.received += 1
+        keep = index % self.every == 0
+
+        if not self.segments:
+            if keep:
+                self._frame(frame.copy())
+            return
+
+        if event:
+            if self.remaining == 0:
+                # Trecho novo: começa pelos frames guardados no anel
+                start = index - len(self.ring) * self.every
+                self.pending.put((_OPEN, segmentPath(self.path, max(0, start))))
+                for buf in self.ring:
+                    self._frame(buf)
+                self.ring = deque()
+            self.remaining = self.post_frames + 1
+
+        if not keep:
+            return
+        if self.remaining:
+            self._frame(frame.copy())
+            self.remaining -= 1
+            if self.remaining == 0:
+                self.pending.put((_CLOSE, None))
+        elif self.pre_frames:
+            # Anel: reaproveita o array do frame mais antigo
+            if len(self.ring) == self.pre_frames:
+                buf = self.ring.popleft()
+                np.copyto(buf, frame)
+            else:
+                buf = frame.copy()
+            self.ring.append(buf)
+
+    def _frame(self, image):
+        if self.policy == "block":
+            self.pending.put((_FRAME, image))
+            return
+        try:
+            self.pending.put_nowait((_FRAME, image))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _open(self, path, image):
+        height, width = image.shape[:2]
+        writer = cv2.VideoWriter(path, self.fourcc, self.fps, (width, height), image.ndim == 3)
+        if not writer.isOpened():
+            self.error = f"não foi possível abrir {path} (codec indisponível?)"
+            return None
+        self.files.append(path)
+        return writer
+
+    def _work(self):
+        writer = None
+        path = None
+        while True:
+            kind, data = self.pending.get()
+            try:
+                if kind == _FRAME:
+                    if writer is None and path is not None:
+                        writer = self._open(path, data)
+                        path = None
+                    if writer is None:
+                        with self._lock:
+                            self.dropped += 1
+                        continue
+                    writer.write(data)
+                    self.written += 1
+                else:
+                    # Abertura preguiçosa: o tamanho vem do primeiro frame
+                    if writer is not None:
+                        writer.release()
+                        writer = None
+                    path = data if kind == _OPEN else None
+                    if kind == _STOP:
+                        return
+            finally:
+                self.pending.task_done()
+
+    def close(self):
+        """
+        Grava o que falta, fecha o arquivo e encerra a thread.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.pending.put((_STOP, None))
+        self.thread.join()
+
+    def stats(self):
+        return {"received": self.received, "written": self.written, "dropped": self.dropped,
+                "files": len(self.files), "fps": round(self.fps, 3), "error": self.error}
+
+    def report(self):
+        """
+        Texto curto para imprimir no fim da execução.
+        """
+        s = self.stats()
+        text = (f"[VIDEO] {s['written']}/{s['received']} frames gravados em {s['files']} arquivo(s) "
+                f"a {s['fps']:g} fps, {s['dropped']} descartados")
+        if self.error:
+            text += f" — erro: {self.error}"
+        return text
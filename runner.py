@@ -0,0 +1,171 @@
+# runner.py
+"""
+Executa o contador de veículos em vários vídeos ao mesmo tempo.
+
+Recebe um manifesto JSON com os vídeos e a configuração de cada um
+(ROI, limiares, tipo de BGS) e processa cada vídeo num processo separado,
+com no máximo N processos simultâneos (padrão: número de núcleos).
+Ao final grava um relatório com as contagens por vídeo e o throughput
+total da frota (frames por segundo somando todos os vídeos).
+
+Formato do manifesto:
+    {
+      "defaults": {"bgs": "MOG2", "truck_area_threshold": 5000},
+      "videos": [
+        {"video": "site1/cam01.mp4", "roi": [100, 200, 640, 300]},
+        {"video": "site1/cam02.mp4", "min_area": 300, "max_area": 20000,
+         "camera_profile": "profiles/cam02.json"}
+      ]
+    }
+
+"camera_profile" (autotune.py) sobrepõe o BGS e os filtros do vídeo.
+
+Uso:
+    python runner.py manifesto.json --workers 8 --report relatorio.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import engine                    # usa engine.loadProfile
+import headless                  # usa headless.run / headless.buildConfig
+
+
+def _worker(mode, cfg, progress):
+    """
+    Processa um vídeo (em processo separado) e devolve o resumo.
+    Eventos de contagem parcial são enviados pela fila de progresso.
+    """
+    import cv2
+
+    # Um núcleo por processo: o paralelismo vem do pool
+    cv2.setNumThreads(1)
+
+    def emit(event):
+        if event["event"] == "counts":
+            progress.put((cfg["video"], os.getpid(), event))
+
+    try:
+        return headless.run(mode, cfg, emit)
+    except Exception as exc:
+        return {"event": "error", "video": cfg["video"], "error": str(exc)}
+
+
+def loadManifest(path):
+    """
+    Lê o manifesto e devolve a lista de configurações (uma por vídeo).
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    defaults = manifest.get("defaults", {})
+    entries = manifest.get("videos", [])
+    if not entries:
+        raise ValueError("Manifesto sem vídeos")
+
+    return [dict(defaults, **entry) for entry in entries]
+
+
+def runAll(entries, mode="contador", workers=None, progress_every=500, log=sys.stderr):
+    """
+    Processa todos os vídeos num pool de processos.
+
+    Parâmetros:
+        entries       : lista de dicionários de configuração (um por vídeo)
+        mode          : modo do headless (padrão: "contador")
+        workers       : máximo de processos simultâneos (None = núcleos)
+        progress_every: frames entre mensagens de progresso de cada vídeo
+        log           : onde escrever o progresso (None = silencioso)
+
+    Retorna o relatório (dicionário).
+    """
+    workers = min(workers or os.cpu_count() or 1, len(entries))
+
+    configs = []
+    for entry in entries:
+        profile = engine.loadProfile(entry["camera_profile"]) if entry.get("camera_profile") else {}
+        cfg = headless.buildConfig(mode, entry, profile)
+        cfg["detections"] = False
+        cfg["pipeline"] = False
+        cfg["counts_every"] = progress_every
+        configs.append(cfg)
+
+    manager = multiprocessing.Manager()
+    progress = manager.Queue()
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_worker, mode, cfg, progress) for cfg in configs]
+        pending = set(futures)
+
+        while pending:
+            # Repassa o progresso enquanto os vídeos são processados
+            while not progress.empty():
+                video, pid, event = progress.get()
+                if log is not None:
+                    print(f"[{pid}] {video}: frame {event['frame']}", file=log)
+
+            done = [f for f in pending if f.done()]
+            for future in done:
+                pending.discard(future)
+                summary = future.result()
+                results.append(summary)
+                if log is not None:
+                    if summary["event"] == "error":
+                        print(f"[ERRO] {summary['video']}: {summary['error']}", file=log)
+                    else:
+                        print(f"[OK] {summary['video']}: {summary['fps']} fps", file=log)
+
+            if pending:
+                time.sleep(0.2)
+    elapsed = time.perf_counter() - start
+    manager.shutdown()
+
+    # Mantém a ordem do manifesto
+    order = {cfg["video"]: i for i, cfg in enumerate(configs)}
+    results.sort(key=lambda r: order.get(r["video"], 0))
+
+    ok = [r for r in results if r["event"] == "summary"]
+    total_frames = sum(r["frames"] for r in ok)
+    report = {
+        "mode": mode,
+        "workers": workers,
+        "videos": results,
+        "failed": len(results) - len(ok),
+        "total_frames": total_frames,
+        "wall_seconds": round(elapsed, 3),
+        "fleet_fps": round(total_frames / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    if mode == "contador":
+        report["cars"] = sum(r["cars"] for r in ok)
+        report["trucks"] = sum(r["trucks"] for r in ok)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Processa vários vídeos em paralelo.")
+    parser.add_argument("manifest", help="manifesto JSON com os vídeos")
+    parser.add_argument("--mode", default="contador", choices=sorted(headless.DEFAULTS))
+    parser.add_argument("--workers", type=int, help="máximo de processos simultâneos")
+    parser.add_argument("--progress-every", type=int, default=500,
+                        help="frames entre mensagens de progresso")
+    parser.add_argument("--report", default="-", help="arquivo do relatório ('-' = stdout)")
+    args = parser.parse_args(argv)
+
+    report = runAll(loadManifest(args.manifest), args.mode, args.workers, args.progress_every)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.report == "-":
+        print(text)
+    else:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# snapshots.py
+"""
+Gravação assíncrona dos recortes (snapshots) dos veículos contados.
+
+O loop principal só entrega uma CÓPIA do recorte para uma fila limitada;
+threads de trabalho fazem a codificação (cv2.imencode libera o GIL) e a
+escrita em disco. Assim um veículo contado não trava o frame em I/O.
+
+Com `store` (archive.SnapshotStore), os recortes vão para segmentos
+append-only com índice em vez de um arquivo por veículo.
+
+Uma falha ao codificar ou gravar um recorte é contada (errors, error) e
+a thread segue com os próximos: a fila continua andando e close() termina.
+
+Políticas quando a fila está cheia (backpressure):
+    - "block":       o loop principal espera haver espaço (não perde imagens)
+    - "drop-newest": descarta o recorte novo
+    - "drop-oldest": descarta o recorte mais antigo ainda não gravado
+"""
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+BACKPRESSURE_POLICIES = ["block", "drop-newest", "drop-oldest"]
+
+# Parâmetros de qualidade por formato
+_QUALITY_FLAGS = {
+    "jpg": cv2.IMWRITE_JPEG_QUALITY,
+    "webp": cv2.IMWRITE_WEBP_QUALITY,
+    "png": cv2.IMWRITE_PNG_COMPRESSION,   # 0-9 (compressão, não qualidade)
+}
+
+# Marcador de encerramento das threads
+_STOP = object()
+
+
+def cropBox(image, x, y, w, h):
+    """
+    Recorta o bounding box garantindo limites válidos.
+    Retorna None se o recorte ficar vazio.
+    """
+    h_img, w_img = image.shape[:2]
+    x0 = max(0, x)
+    y0 = max(0, y)
+    x1 = min(w_img, x + w)
+    y1 = min(h_img, y + h)
+
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return image[y0:y1, x0:x1]
+
+
+class SnapshotWriter:
+    """
+    Grava snapshots em segundo plano (fila limitada + threads de codificação).
+    """
+
+    def __init__(self, out_dir="vehicles", fmt="jpg", quality=90, workers=2,
+                 queue_size=64, policy="block", verbose=False, store=None):
+        """
+        Parâmetros:
+            out_dir   : pasta de saída (criada uma única vez aqui)
+            fmt       : "jpg", "png" ou "webp"
+            quality   : qualidade JPEG/WebP (0-100) ou compressão PNG (0-9)
+            workers   : threads de codificação/escrita
+            queue_size: recortes pendentes no máximo
+            policy    : "block", "drop-newest" ou "drop-oldest"
+            verbose   : imprime cada arquivo salvo e cada falha (desligado,
+                        só a primeira falha é impressa; o total fica em errors)
+            store     : archive.SnapshotStore; se informado, grava no arquivo
+                        de segmentos (out_dir não é usado)
+        """
+        if fmt not in _QUALITY_FLAGS:
+            raise ValueError(f"Formato inválido: {fmt}")
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Política inválida: {policy}")
+
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.params = [_QUALITY_FLAGS[fmt], int(quality)]
+        self.policy = policy
+        self.verbose = verbose
+        self.store = store
+
+        if store is None:
+            os.makedirs(out_dir, exist_ok=True)
+
+        self.pending = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self.saved = 0
+        self.dropped = 0
+        self.errors = 0
+        self.error = None     # mensagem da última falha
+        self.closed = False
+
+        self.threads = [
+            threading.Thread(target=self._work, name=f"snapshot-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, crop, vtype, vid, frame=-1, zone=None):
+        """
+        Enfileira um recorte para gravação. O recorte é copiado aqui, então
+        desenhos feitos depois na imagem original não aparecem no arquivo.
+        `zone` é o nome da zona que contou o veículo (None sem zonas).
+        Retorna False se o recorte foi descartado pela política.
+        """
+        if self.closed:
+            raise RuntimeError("SnapshotWriter já foi encerrado")
+
+        item = (crop.copy(), vtype, vid, frame, time.time(), zone)
+
+        if self.policy == "block":
+            self.pending.put(item)
+            return True
+
+        try:
+            self.pending.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+
+        if self.policy == "drop-newest":
+            self.dropped += 1
+            return False
+
+        # drop-oldest: abre espaço descartando o mais antigo
+        try:
+            self.pending.get_nowait()
+            self.pending.task_done()
+            self.dropped += 1
+        except queue.Empty:
+            pass
+        self.pending.put(item)
+        return True
+
+    def _filename(self, vtype, vid, ts, zone=None):
+        prefix = f"{zone}_" if zone else ""
+        return os.path.join(self.out_dir, f"{prefix}{vtype}_{vid}_{ts}.{self.fmt}")
+
+    def _work(self):
+        while True:
+            item = self.pending.get()
+            try:
+                if item is _STOP:
+                    return
+                self._save(*item)
+            except Exception as exc:
+                with self._lock:
+                    self.errors += 1
+                    self.error = f"{type(exc).__name__}: {exc}"
+                    first = self.errors == 1
+                if self.verbose or first:
+                    print(f"[ERRO] Snapshot não gravado: {self.error}")
+            finally:
+                self.pending.task_done()
+
+    def _save(self, crop, vtype, vid, frame, ts, zone):
+        """
+        Codifica e grava um recorte (thread de trabalho).
+        """
+        ok, encoded = cv2.imencode("." + self.fmt, crop, self.params)
+        if not ok:
+            raise ValueError(f"cv2.imencode falhou ({self.fmt}, {vtype} {vid})")
+        if self.store is not None:
+            self.store.append(encoded.tobytes(), vid, frame, vtype, ts, zone)
+            where = f"{zone} " if zone else ""
+            filename = f"{self.store.path} ({where}{vtype} {vid} frame {frame})"
+        else:
+            filename = self._filename(vtype, vid, int(ts), zone)
+            with open(filename, "wb") as f:
+                f.write(encoded.tobytes())
+        with self._lock:
+            self.saved += 1
+        if self.verbose:
+            print(f"[INFO] Veículo salvo: {filename}")
+
+    def flush(self):
+        """
+        Espera todos os recortes pendentes serem gravados.
+        """
+        self.pending.join()
+
+    def close(self):
+        """
+        Grava o que falta e encerra as threads.
+        """
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        for _ in self.threads:
+            self.pending.put(_STOP)
+        for t in self.threads:
+            t.join()
@@ -0,0 +1,132 @@
+# stride.py
+"""
+Passo (stride) adaptativo: analisa 1 a cada N frames quando a máquina não
+acompanha o vídeo ao vivo.
+
+O controlador mede o custo de cada iteração (leitura + processamento) e o
+atraso em relação ao relógio do vídeo:
+
+    atraso = tempo decorrido - frames consumidos / fps
+
+O passo é o número de frames que a iteração precisa "pagar" para andar no
+ritmo do vídeo: ceil(custo médio x fps), limitado a `max_stride`. Se mesmo
+assim o atraso passar de `latency_ceiling` segundos, a próxima iteração pula
+direto os frames necessários para voltar a metade do teto (catch-up) — esse
+salto não é limitado, é o que garante o teto de latência.
+
+Os frames pulados são descartados com cap.grab() (sem decodificar) e o
+validator recebe o passo (register_frame(..., step=N)), prevendo a posição
+dos objetos pela velocidade. Nada é perdido em silêncio: stats() informa
+quantos frames foram pulados, os saltos de catch-up e o maior atraso.
+"""
+import math
+import time
+
+
+class AdaptiveStride:
+    """
+    Decide quantos frames avançar a cada iteração do loop.
+    """
+
+    def __init__(self, fps, enabled=True, max_stride=4, latency_ceiling=1.0,
+                 smoothing=0.8, clock=time.perf_counter):
+        """
+        Parâmetros:
+            fps            : FPS do vídeo / câmera (relógio de referência)
+            enabled        : False = passo sempre 1 (só coleta estatísticas)
+            max_stride     : passo máximo em regime normal
+            latency_ceiling: atraso máximo tolerado (segundos)
+            smoothing      : peso do custo anterior na média exponencial
+            clock          : função de tempo (substituível em testes)
+        """
+        self.fps = fps or 30.0
+        self.enabled = enabled
+        self.max_stride = max(1, int(max_stride))
+        self.latency_ceiling = latency_ceiling
+        self.smoothing = smoothing
+        self.clock = clock
+
+        self.cost = None       # custo médio de uma iteração (s)
+        self.position = 0      # frames consumidos (analisados + pulados)
+        self.processed = 0
+        self.skipped = 0
+        self.catchups = 0
+        self.max_lag = 0.0
+        self.histogram = {}    # passo -> iterações
+        self._start = None
+
+    def lag(self):
+        """
+        Atraso atual (s) em relação ao relógio do vídeo.
+        """
+        if self._start is None:
+            return 0.0
+        return (self.clock() - self._start) - self.position / self.fps
+
+    def step(self):
+        """
+        Quantos frames avançar agora (1 = o próximo frame, sem pular nada).
+        """
+        if self._start is None:
+            self._start = self.clock()
+        if not self.enabled or self.cost is None:
+            return 1
+
+        step = min(self.max_stride, max(1, math.ceil(self.cost * self.fps)))
+
+        lag = self.lag()
+        self.max_lag = max(self.max_lag, lag)
+        if lag > self.latency_ceiling:
+            # Volta para metade do teto de uma vez
+            catch_up = math.ceil((lag - self.latency_ceiling / 2) * self.fps)
+            if catch_up > step:
+                step = catch_up
+                self.catchups += 1
+        return step
+
+    def done(self, step, seconds):
+        """
+        Registra uma iteração que consumiu `step` frames em `seconds`.
+        """
+        self.position += step
+        self.processed += 1
+        self.skipped += step - 1
+        self.histogram[step] = self.histogram.get(step, 0) + 1
+        if self.cost is None:
+            self.cost = seconds
+        else:
+            self.cost = self.smoothing * self.cost + (1 - self.smoothing) * seconds
+
+    def stats(self):
+        """
+        Estatísticas para o resumo da execução.
+        """
+        return {
+            "frames": self.position,
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "catchups": self.catchups,
+            "max_lag_s": round(self.max_lag, 3),
+            "avg_cost_ms": round(1000 * (self.cost or 0.0), 3),
+            "strides": {str(k): v for k, v in sorted(self.histogram.items())},
+        }
+
+    def report(self):
+        """
+        Texto curto para imprimir no fim da execução.
+        """
+        s = self.stats()
+        return (f"[STRIDE] {s['processed']}/{s['frames']} frames analisados, "
+                f"{s['skipped']} pulados ({s['catchups']} saltos de catch-up), "
+                f"atraso máximo {s['max_lag_s']:.2f} s")
+
+
+def advance(cap, step, image=None):
+    """
+    Descarta step - 1 frames (grab, sem decodificar) e lê o seguinte.
+    Retorna (ok, frame) como cap.read(); `image` é reaproveitado se informado.
+    """
+    for _ in range(step - 1):
+        if not cap.grab():
+            return False, None
+    return cap.read(image)
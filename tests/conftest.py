@@ -0,0 +1,6 @@
+# tests/conftest.py
+# Os módulos ficam na raiz do repositório (sem pacote)
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,134 @@
+# tests/test_countstore.py
+"""
+Testes do CountStore: soma por bucket, gravação colunar (flush/close e
+reabertura), reagrupamento, janelas móveis e escrita concorrente.
+"""
+import threading
+
+import numpy as np
+
+import countstore                # usa countstore.CountStore
+
+T0 = 1_700_000_040.0             # múltiplo de 60: origem = T0
+
+
+def test_add_sums_per_bucket_and_series():
+    store = countstore.CountStore(interval=60)
+    store.add(T0 + 1, "norte", "car")
+    store.add(T0 + 59.9, "norte", "car")
+    store.add(T0 + 60, "norte", "car")
+    store.add(T0 + 61, "norte", "truck", n=2)
+    store.add(T0 + 200, "sul", "car", "faixa1", "desce")
+
+    stamps, totals = store.series(zone="norte")
+    assert stamps.tolist() == [T0, T0 + 60, T0 + 120, T0 + 180]
+    assert totals.tolist() == [2, 3, 0, 0]
+    assert store.total(vtype="truck") == 2
+    # counter=None: só veículos contados; ANY: só cruzamentos
+    assert store.total() == 5
+    assert store.total(counter=countstore.ANY) == 1
+    assert store.breakdown(counter="faixa1") == {"sul/faixa1/desce/car": 1}
+
+
+def test_flush_close_and_reopen(tmp_path):
+    store = countstore.CountStore(str(tmp_path), interval=60, flush_rows=2)
+    for b in range(7):
+        store.add(T0 + 60 * b + 5, "norte", "car", n=b + 1)
+    assert store.rows > 0                      # flush automático
+    store.add(T0 + 60 * 6 + 30, "norte", "truck")
+    store.close()
+
+    reader = countstore.CountStore(str(tmp_path), readonly=True)
+    assert reader.series(vtype="car")[1].tolist() == [1, 2, 3, 4, 5, 6, 7]
+    assert reader.total(vtype="truck") == 1
+
+    # Reabrir para escrita: o último bucket volta para a memória e continua somando
+    writer = countstore.CountStore(str(tmp_path))
+    writer.add(T0 + 60 * 6 + 40, "norte", "car")
+    writer.add(T0 + 60 * 8, "norte", "car")
+    writer.close()
+    reader.refresh()
+    assert reader.series(vtype="car")[1].tolist() == [1, 2, 3, 4, 5, 6, 8, 0, 1]
+
+
+def test_late_events_are_only_counted(tmp_path):
+    store = countstore.CountStore(str(tmp_path), interval=60)
+    store.add(T0 + 10, "norte", "car")
+    store.add(T0 + 130, "norte", "car")
+    store.flush()                              # grava os buckets 0 e 1
+    store.add(T0 + 20, "norte", "car")
+    assert store.late == 1
+    assert store.total() == 2
+
+
+def test_series_step_regroups():
+    store = countstore.CountStore(interval=60)
+    for b in range(5):
+        store.add(T0 + 60 * b, "norte", "car", n=b)
+    stamps, totals = store.series(step=120)
+    assert stamps.tolist() == [T0, T0 + 120, T0 + 240]
+    assert totals.tolist() == [1, 5, 4]
+
+
+def test_rolling_window_boundaries():
+    store = countstore.CountStore(interval=60)
+    for b in range(10):
+        store.add(T0 + 60 * b + 30, "norte", "car", n=b + 1)
+    assert store.lastEnd() == T0 + 600
+
+    # Janela até o fim do último bucket: buckets inteiros
+    assert store.rolling(60) == 10
+    assert store.rolling(120) == 10 + 9
+    assert store.rolling(600) == sum(range(1, 11))
+    assert store.rolling(6000) == sum(range(1, 11))
+
+    # Bordas no meio de um bucket: o bucket inteiro que contém cada borda entra
+    assert store.rolling(60, end=T0 + 300) == 5
+    assert store.rolling(30, end=T0 + 330) == 6
+    assert store.rolling(90, end=T0 + 330) == 5 + 6
+    assert store.total(T0 + 60, T0 + 120) == 2
+
+
+def test_rolling_on_empty_store():
+    store = countstore.CountStore(interval=60)
+    assert store.lastEnd() == 0.0
+    assert store.rolling(3600) == 0
+
+
+def test_concurrent_appends_and_queries(tmp_path):
+    store = countstore.CountStore(str(tmp_path), interval=1, flush_rows=4)
+    writers, events = 8, 500
+    errors = []
+
+    def write(k):
+        rng = np.random.default_rng(k)
+        for i in range(events):
+            # Quase em ordem (como vários validators no mesmo relógio)
+            store.add(T0 + i * 0.1 + rng.uniform(0, 0.5), f"z{k % 2}", "car")
+
+    def read(stop):
+        try:
+            while not stop.is_set():
+                store.rolling(10)
+                store.series(step=5)
+                store.breakdown()
+        except Exception as exc:
+            errors.append(exc)
+
+    stop = threading.Event()
+    readers = [threading.Thread(target=read, args=(stop,)) for _ in range(2)]
+    threads = [threading.Thread(target=write, args=(k,)) for k in range(writers)]
+    for t in readers + threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    for t in readers:
+        t.join()
+    store.close()
+
+    assert not errors
+    assert store.total() + store.late == writers * events
+    reader = countstore.CountStore(str(tmp_path), readonly=True)
+    assert reader.total() == store.total()
+    assert sum(reader.breakdown().values()) == store.total()
@@ -0,0 +1,205 @@
+# tests/test_validator.py
+"""
+Testes do SimpleValidator: associação 1-para-1, previsão com frames
+pulados, expiração, contadores (linha/polígono) e get_state/set_state.
+"""
+import json
+
+import numpy as np
+
+import validator                 # usa validator.SimpleValidator
+import zones                     # usa zones.CountingLine / zones.CountingPolygon
+
+AREA = 1000
+
+
+def frame(v, points, step=1, area=AREA):
+    """
+    register_frame() com todas as detecções da mesma área; devolve as listas.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    types, counted, ids = v.register_frame(points, np.full(len(points), area), step)
+    return list(types), list(counted), list(ids)
+
+
+# -----------------------------
+# Associação
+# -----------------------------
+def test_match_follows_nearest_regardless_of_detection_order():
+    v = validator.SimpleValidator(min_area=100)
+    _, _, (a, b) = frame(v, [(100, 100), (160, 100)])
+    _, _, ids = frame(v, [(158, 104), (103, 102)])
+    assert ids == [b, a]
+
+
+def test_two_detections_do_not_share_an_object():
+    v = validator.SimpleValidator(min_area=100, predict=False)
+    _, _, (a, b) = frame(v, [(100, 100), (150, 100)])
+    # (130, 100) está mais perto de b (20) que (175, 100) (25): fica com b;
+    # (175, 100) não pode usar b de novo e está longe de a -> objeto novo
+    _, _, ids = frame(v, [(175, 100), (130, 100)])
+    assert ids[1] == b
+    assert ids[0] not in (a, b)
+    assert len(set(ids)) == 2
+
+
+def test_small_areas_are_ignored():
+    v = validator.SimpleValidator(min_area=500)
+    types, counted, ids = frame(v, [(50, 50)], area=100)
+    assert types == ["ignore"] and counted == [False] and ids == [-1]
+    assert not v.objects
+
+
+def test_prediction_keeps_track_across_skipped_frames():
+    v = validator.SimpleValidator(min_area=100, match_radius=30)
+    _, _, (oid,) = frame(v, [(100, 20)])
+    _, _, ids = frame(v, [(100, 40)])           # 20 px/frame
+    assert ids == [oid]
+    # 4 frames depois: 80 px, bem além do raio, mas perto da posição prevista
+    _, _, ids = frame(v, [(100, 121)], step=4)
+    assert ids == [oid]
+
+
+def test_grid_and_full_matrix_match_identically():
+    class Dense(validator.SimpleValidator):
+        def _pairs(self, pts, track_ids, last_pos, track_pos, radius):
+            dist = np.hypot(pts[:, None, 0] - track_pos[None, :, 0],
+                            pts[:, None, 1] - track_pos[None, :, 1])
+            det_idx, trk_idx = np.nonzero(dist < radius[None, :])
+            return det_idx, trk_idx, dist[det_idx, trk_idx]
+
+    rng = np.random.default_rng(0)
+    grid, dense = validator.SimpleValidator(min_area=100), Dense(min_area=100)
+    active = np.zeros((0, 2))
+    for _ in range(120):
+        step = int(rng.integers(1, 4))
+        active = np.vstack([active, np.c_[rng.uniform(0, 20000, 5), rng.uniform(0, 50, 5)]])
+        active[:, 1] += 8 * step
+        active = active[active[:, 1] < 600]
+        noise = rng.uniform((0, 0), (20000, 600), (rng.poisson(30), 2))
+        points = np.vstack([active + rng.normal(0, 2, active.shape), noise])
+        assert frame(grid, points, step) == frame(dense, points, step)
+    # Com centenas de objetos espalhados, a grade foi de fato usada
+    assert len(grid.objects) > 32 * 9
+
+
+# -----------------------------
+# Expiração e regra de entrada
+# -----------------------------
+def test_objects_expire_after_max_missed():
+    v = validator.SimpleValidator(min_area=100, max_missed=3)
+    frame(v, [(100, 100)])
+    for _ in range(3):
+        frame(v, [])
+    assert len(v.objects) == 1
+    frame(v, [])
+    assert not v.objects and not v.grid
+
+
+def test_objects_expire_after_max_age():
+    v = validator.SimpleValidator(min_area=100, max_age=2)
+    _, _, (oid,) = frame(v, [(100, 100)])
+    frame(v, [(100, 102)])
+    frame(v, [(100, 104)])
+    _, _, ids = frame(v, [(100, 106)])
+    assert ids != [oid]
+
+
+def test_entry_rule_counts_once():
+    v = validator.SimpleValidator(min_area=100, truck_area_threshold=5000)
+    _, counted, _ = frame(v, [(100, 3)])        # acima da borda
+    assert counted == [False]
+    _, counted, _ = frame(v, [(100, 15)])       # entrou
+    assert counted == [True]
+    _, counted, _ = frame(v, [(100, 27)])
+    assert counted == [False]
+    assert v.get_counts() == (1, 0)
+
+
+def test_truck_by_area():
+    v = validator.SimpleValidator(min_area=100, truck_area_threshold=5000)
+    types, counted, _ = frame(v, [(100, 50)], area=6000)
+    assert types == ["truck"] and counted == [True]
+    assert v.get_counts() == (0, 1)
+
+
+# -----------------------------
+# Contadores
+# -----------------------------
+def test_line_crossing_direction():
+    line = zones.CountingLine("faixa", (0, 100), (200, 100), ("desce", "sobe"))
+    v = validator.SimpleValidator(min_area=100, counters=[line])
+    frame(v, [(50, 94)])
+    _, counted, _ = frame(v, [(50, 104)])
+    assert counted == [True]
+    assert [c[1:] for c in v.frame_crossings] == [("faixa", "desce", "car")]
+    _, counted, ids = frame(v, [(50, 96)])
+    assert counted == [True] and ids == [1]
+    assert [c[1:] for c in v.frame_crossings] == [("faixa", "sobe", "car")]
+    assert v.get_crossings() == {"faixa": {"desce": {"car": 1, "truck": 0},
+                                           "sobe": {"car": 1, "truck": 0}}}
+    # O objeto é somado nos totais uma vez só
+    assert v.get_counts() == (1, 0)
+
+
+def test_line_ignores_crossing_outside_segment():
+    line = zones.CountingLine("faixa", (0, 100), (200, 100))
+    v = validator.SimpleValidator(min_area=100, counters=[line])
+    frame(v, [(250, 80)])
+    _, counted, _ = frame(v, [(250, 110)])
+    assert counted == [False]
+    assert v.get_counts() == (0, 0)
+
+
+def test_polygon_enter_and_exit():
+    square = zones.CountingPolygon("praca", [(100, 100), (200, 100), (200, 200), (100, 200)])
+    v = validator.SimpleValidator(min_area=100, counters=[square])
+    frame(v, [(80, 150)])
+    frame(v, [(110, 150)])
+    assert [c[2] for c in v.frame_crossings] == ["in"]
+    frame(v, [(150, 150)])
+    assert v.frame_crossings == []
+    frame(v, [(190, 150)])
+    frame(v, [(215, 150)])
+    assert [c[2] for c in v.frame_crossings] == ["out"]
+
+
+# -----------------------------
+# Estado
+# -----------------------------
+def _scene(v, frames, seed):
+    rng = np.random.default_rng(seed)
+    out = []
+    for f in range(frames):
+        points = [(40 + 60 * lane, -20 + 9 * ((f + 7 * lane) % 40)) for lane in range(4)]
+        points = np.asarray(points, dtype=np.float64) + rng.normal(0, 1, (4, 2))
+        out.append(frame(v, points, step=1 + f % 2))
+    return out
+
+
+def test_state_round_trip_continues_identically():
+    def make():
+        line = zones.CountingLine("meio", (0, 150), (300, 150))
+        return validator.SimpleValidator(min_area=100, counters=[line])
+
+    original = make()
+    _scene(original, 50, seed=1)
+    state = json.loads(json.dumps(original.get_state()))
+
+    restored = make()
+    restored.set_state(state)
+    assert restored.get_state() == state
+    assert restored.grid == original.grid
+
+    assert _scene(restored, 50, seed=2) == _scene(original, 50, seed=2)
+    assert restored.get_counts() == original.get_counts()
+    assert restored.get_crossings() == original.get_crossings()
+
+
+def test_state_round_trip_entry_rule():
+    original = validator.SimpleValidator(min_area=100)
+    _scene(original, 30, seed=3)
+    restored = validator.SimpleValidator(min_area=100)
+    restored.set_state(json.loads(json.dumps(original.get_state())))
+    assert _scene(restored, 30, seed=4) == _scene(original, 30, seed=4)
+    assert restored.get_counts() == original.get_counts()
@@ -0,0 +1,180 @@
+# tiles.py
+"""
+Processamento em blocos (tiles) para vídeos de alta resolução (4K).
+
+O frame (ou a ROI) é dividido numa grade cols x rows. Cada bloco tem o seu
+próprio background subtractor e roda em uma thread de um pool (o OpenCV
+libera o GIL em apply/morfologia, então os blocos rodam em paralelo nos
+núcleos; processos não serviriam, porque o estado do BGS não é
+serializável).
+
+Duas fases por frame:
+    1. apply():  cada bloco aplica o BGS no SEU pedaço e escreve na máscara
+                 bruta inteira. Os modelos de fundo são por pixel, então o
+                 resultado é o mesmo de um BGS no frame todo. O GMG suaviza
+                 a própria saída com um blur mediano; para ele o pedaço
+                 ganha uma margem (bgsReach) e só o miolo é escrito.
+    2. clean():  cada bloco filtra (morfologia + blur mediano) o seu pedaço
+                 COM uma margem de `reach` pixels lida da máscara bruta
+                 inteira, e escreve só o miolo na máscara limpa. A margem
+                 cobre o alcance dos filtros, então as costuras não mudam nada.
+
+A extração dos blobs roda depois sobre a máscara limpa inteira: um blob que
+atravessa a costura entre blocos é um único blob, sem etapa de junção.
+Entre as duas fases o chamador pode consultar a máscara bruta (gate de
+movimento).
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import cv2
+
+import buffers                   # usa buffers.FrameBuffers
+
+
+def splitTiles(width, height, cols, rows):
+    """
+    Retângulos (x0, y0, x1, y1) de uma grade cols x rows cobrindo a imagem.
+    """
+    xs = [round(i * width / cols) for i in range(cols + 1)]
+    ys = [round(j * height / rows) for j in range(rows + 1)]
+    return [(xs[i], ys[j], xs[i + 1], ys[j + 1]) for j in range(rows) for i in range(cols)]
+
+
+def filterReach(kernels, median_blur=0, iterations=2):
+    """
+    Alcance (px) da cadeia closing -> opening -> dilation (+ blur mediano):
+    até onde um pixel da máscara bruta influencia a máscara limpa.
+    closing/opening com `iterations` fazem 2 x iterations passadas cada;
+    closing = None (sem closing) não soma nada.
+    """
+    closing, (oh, ow), (dh, dw) = kernels
+    ch, cw = closing or (0, 0)
+    reach = 2 * iterations * (max(ch, cw) // 2)
+    reach += 2 * iterations * (max(oh, ow) // 2)
+    reach += iterations * (max(dh, dw) // 2)
+    reach += median_blur // 2 if median_blur else 0
+    return reach
+
+
+def bgsReach(bgs):
+    """
+    Alcance (px) espacial do próprio BGS: o raio de suavização do GMG,
+    0 para os modelos puramente por pixel (MOG, MOG2, KNN, CNT).
+    """
+    if hasattr(bgs, "getSmoothingRadius"):
+        return bgs.getSmoothingRadius() // 2
+    return 0
+
+
+def _pad(rect, reach, width, height):
+    x0, y0, x1, y1 = rect
+    return (max(0, x0 - reach), max(0, y0 - reach), min(width, x1 + reach), min(height, y1 + reach))
+
+
+class TiledMask:
+    """
+    BGS + limpeza da máscara em blocos paralelos.
+    """
+
+    def __init__(self, width, height, grid, make_bgs, clean, reach, workers=None):
+        """
+        Parâmetros:
+            width, height: tamanho da imagem (frame ou ROI)
+            grid         : (cols, rows)
+            make_bgs     : função sem argumentos que cria um BGS (um por bloco)
+            clean        : função (máscara, buffers) -> máscara limpa
+            reach        : margem (px) lida em volta de cada bloco na limpeza
+            workers      : threads (None = um por bloco)
+        """
+        cols, rows = grid
+        self.width = width
+        self.height = height
+        self.tiles = splitTiles(width, height, cols, rows)
+        self.clean_fn = clean
+        self.reach = reach
+
+        self.bgs = [make_bgs() for _ in self.tiles]
+        self.tile_buffers = [buffers.FrameBuffers() for _ in self.tiles]
+
+        # Margens de cada bloco (BGS e limpeza), limitadas pela borda da imagem
+        bgs_reach = bgsReach(self.bgs[0])
+        self.bgs_padded = [_pad(rect, bgs_reach, width, height) for rect in self.tiles]
+        self.padded = [_pad(rect, reach, width, height) for rect in self.tiles]
+
+        self.pool = ThreadPoolExecutor(max_workers=workers or len(self.tiles),
+                                       thread_name_prefix="tile")
+        self._image = None
+        self._raw = None
+        self._out = None
+
+    def _apply(self, t):
+        x0, y0, x1, y1 = self.tiles[t]
+        px0, py0, px1, py1 = self.bgs_padded[t]
+        mask = self.bgs[t].apply(self._image[py0:py1, px0:px1],
+                                 fgmask=self.tile_buffers[t].get("fgmask", (py1 - py0, px1 - px0)))
+        self._out[y0:y1, x0:x1] = mask[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+
+    def _clean(self, t):
+        x0, y0, x1, y1 = self.tiles[t]
+        px0, py0, px1, py1 = self.padded[t]
+        out = self.clean_fn(self._raw[py0:py1, px0:px1], self.tile_buffers[t])
+        self._out[y0:y1, x0:x1] = out[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+
+    def _output(self, out):
+        if out is None:
+            return np.empty((self.height, self.width), np.uint8)
+        return out
+
+    def apply(self, image, out=None):
+        """
+        Fase 1: máscara bruta da imagem inteira.
+
+        As duas fases escrevem em `out` (ex.: um buffer de FrameBuffers) ou,
+        com out=None, num array novo.
+        """
+        self._image, self._out = image, self._output(out)
+        list(self.pool.map(self._apply, range(len(self.tiles))))
+        out, self._image, self._out = self._out, None, None
+        return out
+
+    def clean(self, raw, out=None):
+        """
+        Fase 2: máscara limpa da imagem inteira a partir da bruta.
+        """
+        self._raw, self._out = raw, self._output(out)
+        list(self.pool.map(self._clean, range(len(self.tiles))))
+        out, self._raw, self._out = self._out, None, None
+        return out
+
+    def backgroundImage(self):
+        """
+        Imagem de fundo aprendida, costurada a partir dos blocos (None se
+        o BGS não fornece uma, como MOG e GMG).
+        """
+        image = None
+        for t, bgs in enumerate(self.bgs):
+            try:
+                part = bgs.getBackgroundImage()
+            except cv2.error:
+                return None
+            if part is None:
+                return None
+            if image is None:
+                image = np.zeros((self.height, self.width) + part.shape[2:], part.dtype)
+            x0, y0, x1, y1 = self.tiles[t]
+            px0, py0 = self.bgs_padded[t][:2]
+            image[y0:y1, x0:x1] = part[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+        return image
+
+    def seed(self, image, times):
+        """
+        Aplica a imagem de fundo `times` vezes no BGS de cada bloco.
+        """
+        for t, bgs in enumerate(self.bgs):
+            px0, py0, px1, py1 = self.bgs_padded[t]
+            for _ in range(times):
+                bgs.apply(image[py0:py1, px0:px1])
+
+    def close(self):
+        self.pool.shutdown()
@@ -2,6 +2,8 @@
 # validator.py
 import math
 
+import numpy as np
+
 class SimpleValidator:
     """
     Validador simples para estudo.
@@ -16,22 +18,75 @@ class SimpleValidator:
     Observações:
     - Não altera sua pipeline (ROI + contornos + MOG2).
     - Retorna (tipo, counted, id) no register() para permitir salvar a imagem.
+    - Objetos não vistos há mais de `max_missed` frames (ou mais velhos que
+      `max_age` frames) são descartados em next_frame(), e o matching usa uma
+      grade espacial com células do tamanho do raio de busca. Assim o custo de
+      register()/register_frame() não cresce com o tempo de vídeo nem com
+      o número de objetos longe da detecção.
+    - Cada objeto tem uma velocidade estimada (modelo de velocidade constante,
+      suavizada). O matching compara a detecção com a posição PREVISTA para o
+      frame atual, então a associação continua funcionando quando só um a
+      cada N frames é analisado (register_frame(..., step=N)). Enquanto um
+      objeto não tem velocidade medida, o raio de busca cresce com a raiz
+      do número de frames pulados. A grade guarda a última posição vista;
+      register() e register_frame() alargam a busca nela pelo maior
+      deslocamento previsto e usam o mesmo raio por objeto (_radius()).
+    - Com `counters` (linhas/polígonos de zones.py), a regra da borda
+      superior é substituída: conta-se cada vez que o deslocamento de um
+      objeto entre dois frames analisados cruza um contador, por contador,
+      sentido e tipo (get_crossings()). Os totais de get_counts() contam
+      cada objeto uma vez só, no primeiro cruzamento.
     """
 
-    def __init__(self, min_area, truck_area_threshold=5000):
+    def __init__(self, min_area, truck_area_threshold=5000, match_radius=50,
+                 max_missed=30, max_age=None, predict=True, velocity_smoothing=0.5,
+                 counters=None):
         """
         Parâmetros:
             min_area: área mínima para considerar um contorno como veículo (evita ruído).
             truck_area_threshold: área a partir da qual é considerado "truck".
                                   (ajuste conforme seu vídeo/ROI; 5000 é um bom ponto de partida)
+            match_radius: distância máxima (px) para associar uma detecção a um objeto.
+            max_missed: frames sem ser visto até o objeto ser descartado.
+            max_age: idade máxima (em frames) de um objeto; None = sem limite.
+            predict: usa a posição prevista (velocidade constante) no matching.
+            velocity_smoothing: peso da velocidade anterior na suavização (0 a 1).
+            counters: linhas/polígonos de contagem (zones.CountingLine /
+                      CountingPolygon, em coordenadas da ROI); None = regra
+                      de entrada pela borda superior.
         """
         self.min_area = min_area
         self.truck_area_threshold = truck_area_threshold
+        self.match_radius = match_radius
+        self.max_missed = max_missed
+        self.max_age = max_age
+        self.predict = predict
+        self.velocity_smoothing = velocity_smoothing
 
         # Armazena a última posição (cx, cy) dos objetos rastreados de forma simples
         # Mapeamento: object_id -> (cx, cy)
         self.objects = {}
 
+        # Frame de criação e último frame em que cada objeto foi visto
+        # Mapeamento: object_id -> frame_index
+        self.first_seen = {}
+        self.last_seen = {}
+
+        # Velocidade estimada (px por frame) de cada objeto
+        # Mapeamento: object_id -> (vx, vy)
+        self.velocity = {}
+        self._moved = set()   # objetos que já têm velocidade medida
+
+        # Grade espacial: (gx, gy) -> conjunto de object_ids naquela célula
+        self.grid = {}
+
+        # Distância máxima entre a última posição de um objeto e uma detecção
+        # que pode ser associada a ele no frame atual (None = recalcular)
+        self._reach = None
+
+        # Frame corrente (avançado por next_frame())
+        self.frame_index = 0
+
         # ID incremental para novos objetos
         self.next_id = 1
 
@@ -39,21 +94,161 @@ class SimpleValidator:
         self.cars = 0
         self.trucks = 0
 
+        # Contadores de cruzamento: nome -> sentido -> tipo -> total
+        self.counters = list(counters) if counters else None
+        self.crossings = {}
+        for counter in self.counters or ():
+            self.crossings[counter.name] = {d: {"car": 0, "truck": 0} for d in counter.directions}
+        self._counted = set()         # objetos já somados em cars/trucks
+        self.frame_crossings = []     # (id, contador, sentido, tipo) do frame atual
+
+    # -----------------------------
+    # Grade espacial e expiração
+    # -----------------------------
+    def _cell(self, cx, cy):
+        """
+        Célula da grade que contém o ponto (lado = match_radius).
+        """
+        return int(cx // self.match_radius), int(cy // self.match_radius)
+
+    def _place(self, oid, cx, cy):
+        """
+        Cria ou move o objeto para (cx, cy), mantendo a grade atualizada.
+        """
+        if oid in self.objects:
+            px, py = self.objects[oid]
+            old_cell = self._cell(px, py)
+            new_cell = self._cell(cx, cy)
+            if old_cell != new_cell:
+                self._unlink(oid, old_cell)
+                self.grid.setdefault(new_cell, set()).add(oid)
+
+            # Atualiza a velocidade (média exponencial)
+            dt = self.frame_index - self.last_seen[oid]
+            if dt > 0:
+                vx, vy = self.velocity[oid]
+                a = self.velocity_smoothing if oid in self._moved else 0.0
+                self.velocity[oid] = (a * vx + (1 - a) * (cx - px) / dt,
+                                      a * vy + (1 - a) * (cy - py) / dt)
+                self._moved.add(oid)
+        else:
+            self.grid.setdefault(self._cell(cx, cy), set()).add(oid)
+            self.first_seen[oid] = self.frame_index
+            self.velocity[oid] = (0.0, 0.0)
+
+        self.objects[oid] = (cx, cy)
+        self.last_seen[oid] = self.frame_index
+
+    def _unlink(self, oid, cell):
+        """
+        Remove o objeto de uma célula (e a célula, se ficar vazia).
+        """
+        bucket = self.grid.get(cell)
+        if bucket is None:
+            return
+        bucket.discard(oid)
+        if not bucket:
+            del self.grid[cell]
+
+    def _remove(self, oid):
+        """
+        Descarta completamente um objeto rastreado.
+        """
+        self._unlink(oid, self._cell(*self.objects[oid]))
+        del self.objects[oid]
+        del self.first_seen[oid]
+        del self.last_seen[oid]
+        del self.velocity[oid]
+        self._moved.discard(oid)
+        self._counted.discard(oid)
+
+    def _radius(self, oid):
+        """
+        Raio de busca do objeto no frame atual: enquanto ele não tem
+        velocidade medida, cresce com a raiz dos frames desde que foi visto.
+        """
+        if self.predict and oid not in self._moved:
+            return self.match_radius * math.sqrt(max(self.frame_index - self.last_seen[oid], 1))
+        return float(self.match_radius)
+
+    def predicted(self, oid):
+        """
+        Posição prevista do objeto no frame atual (velocidade constante).
+        """
+        px, py = self.objects[oid]
+        if not self.predict:
+            return px, py
+        dt = self.frame_index - self.last_seen[oid]
+        vx, vy = self.velocity[oid]
+        return px + vx * dt, py + vy * dt
+
+    def next_frame(self, step=1):
+        """
+        Avança o contador de frames e descarta objetos expirados.
+        Deve ser chamado uma vez por frame, antes dos register() daquele frame.
+        Com step > 1, avança vários frames de uma vez (frames não analisados).
+        Retorna a quantidade de objetos descartados.
+        """
+        self.frame_index += step
+        self.frame_crossings = []
+        self._reach = None
+
+        expired = []
+        for oid, seen in self.last_seen.items():
+            if self.frame_index - seen > self.max_missed:
+                expired.append(oid)
+            elif self.max_age is not None and \
+                    self.frame_index - self.first_seen[oid] > self.max_age:
+                expired.append(oid)
+
+        for oid in expired:
+            self._remove(oid)
+
+        return len(expired)
+
     # -----------------------------
     # Matching simples por distância
     # -----------------------------
+    def _searchReach(self):
+        """
+        Maior distância, entre objetos, da última posição vista até o limite
+        do raio de busca em torno da posição prevista.
+        """
+        reach = float(self.match_radius)
+        for oid, (px, py) in self.objects.items():
+            qx, qy = self.predicted(oid)
+            reach = max(reach, math.hypot(qx - px, qy - py) + self._radius(oid))
+        return reach
+
     def _match(self, cx, cy):
         """
-        Tenta associar (cx, cy) ao objeto existente mais próximo,
-        desde que esteja a menos de 50 px de distância.
+        Tenta associar (cx, cy) ao objeto existente mais próximo (pela
+        posição prevista), desde que esteja a menos do raio de busca do
+        objeto (_radius(), o mesmo de register_frame()). Consulta as
+        células da grade até o maior deslocamento previsto + raio (as 9
+        vizinhas quando ninguém se move).
         Retorna: object_id correspondente, ou None se não houver match.
         """
         best_id = None
-        best_dist = 9999.0
+        best_dist = math.inf
 
-        for oid, (px, py) in self.objects.items():
+        # Objetos criados/movidos neste frame têm dt = 0: o alcance calculado
+        # no início do frame continua valendo como limite
+        if self._reach is None:
+            self._reach = self._searchReach()
+        rings = math.ceil(self._reach / self.match_radius)
+
+        if (2 * rings + 1) ** 2 >= len(self.grid):
+            candidates = self.objects
+        else:
+            gx, gy = self._cell(cx, cy)
+            candidates = [oid for dx in range(-rings, rings + 1) for dy in range(-rings, rings + 1)
+                          for oid in self.grid.get((gx + dx, gy + dy), ())]
+
+        for oid in candidates:
+            px, py = self.predicted(oid)
             dist = math.hypot(cx - px, cy - py)
-            if dist < best_dist and dist < 50:  # tolerância
+            if dist < self._radius(oid) and dist < best_dist:
                 best_dist = dist
                 best_id = oid
 
@@ -92,40 +287,202 @@ class SimpleValidator:
         # Tenta associar com algum objeto existente
         oid = self._match(cx, cy)
 
+        return self._update(oid, cx, cy, area)
+
+    def _update(self, oid, cx, cy, area):
+        """
+        Cria (oid=None) ou atualiza um objeto e aplica a regra de ENTRADA.
+        Retorna (tipo, counted, object_id) como register().
+        """
+        vtype = self._type_by_area(area)
+
+        if self.counters is not None:
+            return self._updateCrossings(oid, cx, cy, vtype)
+
         # Caso seja um novo objeto
         if oid is None:
             oid = self.next_id
-            self.objects[oid] = (cx, cy)
+            self._place(oid, cx, cy)
             self.next_id += 1
 
             # Checagem de ENTRADA na criação do objeto:
             # centróide já "dentro" da ROI?
             if cy > 10:  # tolerância baixa para borda superior
-                vtype = self._type_by_area(area)
-                if vtype == "truck":
-                    self.trucks += 1
-                else:
-                    self.cars += 1
+                self._count(vtype)
                 return vtype, True, oid
 
             # Ainda não entrou (está acima da borda)
-            return self._type_by_area(area), False, oid
+            return vtype, False, oid
 
         # Atualiza objeto existente
         prev_y = self.objects[oid][1]
-        self.objects[oid] = (cx, cy)
+        self._place(oid, cx, cy)
 
         # Cruzou a borda superior agora?
         if prev_y < 5 and cy > 10:
-            vtype = self._type_by_area(area)
-            if vtype == "truck":
-                self.trucks += 1
-            else:
-                self.cars += 1
+            self._count(vtype)
             return vtype, True, oid
 
         # Sem contagem neste frame
-        return self._type_by_area(area), False, oid
+        return vtype, False, oid
+
+    def _updateCrossings(self, oid, cx, cy, vtype):
+        """
+        Versão de _update() com contadores: compara a posição anterior e a
+        atual do objeto com cada linha/polígono.
+        """
+        if oid is None:
+            oid = self.next_id
+            self.next_id += 1
+            self._place(oid, cx, cy)
+            return vtype, False, oid
+
+        prev = self.objects[oid]
+        self._place(oid, cx, cy)
+
+        crossed = False
+        for counter in self.counters:
+            direction = counter.crossing(prev, (cx, cy))
+            if direction is None:
+                continue
+            self.crossings[counter.name][direction][vtype] += 1
+            self.frame_crossings.append((oid, counter.name, direction, vtype))
+            crossed = True
+
+        if crossed and oid not in self._counted:
+            self._counted.add(oid)
+            self._count(vtype)
+        return vtype, crossed, oid
+
+    def _count(self, vtype):
+        """
+        Incrementa o contador total do tipo.
+        """
+        if vtype == "truck":
+            self.trucks += 1
+        else:
+            self.cars += 1
+
+    # -----------------------------
+    # Registro em lote (frame inteiro)
+    # -----------------------------
+    def register_frame(self, centroids, areas, step=1):
+        """
+        Registra TODAS as detecções de um frame de uma vez.
+        Já chama next_frame(step) internamente; use step > 1 quando frames
+        foram pulados (a posição dos objetos é prevista para o frame atual).
+
+        As distâncias detecção x objeto são calculadas vetorizadas, só para
+        os objetos das células da grade ao alcance de cada detecção
+        (_pairs()), e a associação é 1-para-1: pares são aceitos do
+        mais próximo para o mais distante, e cada objeto/detecção só pode
+        ser usado uma vez (duas detecções não "roubam" o mesmo objeto).
+
+        Entradas:
+            centroids: array (N, 2) com (cx, cy) de cada detecção
+            areas    : array (N,) com a área de cada contorno
+            step     : frames avançados desde a chamada anterior
+
+        Retorna:
+            (tipos, counted, ids) — arrays de tamanho N
+              - tipos: "car", "truck" ou "ignore" (dtype object)
+              - counted: bool, True se a detecção gerou contagem
+              - ids: ID do objeto (-1 para detecções ignoradas)
+        """
+        self.next_frame(step)
+
+        centroids = np.asarray(centroids, dtype=np.float64).reshape(-1, 2)
+        areas = np.asarray(areas, dtype=np.float64).reshape(-1)
+        n = len(areas)
+
+        types = np.full(n, "ignore", dtype=object)
+        counted = np.zeros(n, dtype=bool)
+        ids = np.full(n, -1, dtype=np.int64)
+
+        # Ignorar ruídos
+        valid = np.flatnonzero(areas >= self.min_area)
+        if len(valid) == 0:
+            return types, counted, ids
+
+        # Associação global 1-para-1 com os objetos existentes
+        matched = {}
+        if self.objects:
+            track_ids = np.fromiter(self.objects.keys(), dtype=np.int64, count=len(self.objects))
+            track_pos = np.array(list(self.objects.values()), dtype=np.float64)
+            last_pos = track_pos.copy()
+            if self.predict:
+                velocity = np.array([self.velocity[oid] for oid in self.objects], dtype=np.float64)
+                dt = np.array([self.frame_index - self.last_seen[oid] for oid in self.objects],
+                              dtype=np.float64)
+                track_pos += velocity * dt[:, None]
+
+                # Objeto visto uma única vez ainda não tem velocidade: a
+                # incerteza da posição cresce com os frames pulados
+                unmeasured = np.fromiter((oid not in self._moved for oid in self.objects),
+                                         dtype=bool, count=len(self.objects))
+                # (mesma regra de _radius())
+                radius = np.where(unmeasured, self.match_radius * np.sqrt(np.maximum(dt, 1.0)),
+                                  self.match_radius)
+            else:
+                radius = np.full(len(track_ids), float(self.match_radius))
+
+            det_idx, trk_idx, dist = self._pairs(centroids[valid], track_ids, last_pos,
+                                                 track_pos, radius)
+            order = np.argsort(dist, kind="stable")
+
+            used_tracks = set()
+            for k in order:
+                d, t = det_idx[k], trk_idx[k]
+                if d in matched or t in used_tracks:
+                    continue
+                matched[d] = int(track_ids[t])
+                used_tracks.add(t)
+
+        for d, i in enumerate(valid):
+            cx, cy = centroids[i]
+            vtype, was_counted, oid = self._update(matched.get(d), float(cx), float(cy), areas[i])
+            types[i] = vtype
+            counted[i] = was_counted
+            ids[i] = oid
+
+        return types, counted, ids
+
+    def _pairs(self, pts, track_ids, last_pos, track_pos, radius):
+        """
+        Pares (detecção, objeto) a menos do raio do objeto, com a distância,
+        em ordem de detecção e depois de objeto. Os objetos de cada detecção
+        vêm das células da grade até o maior deslocamento previsto + raio
+        (como em _match()). Com poucos objetos, a matriz detecção x objeto
+        inteira (numpy) sai mais barata que consultar as células em Python.
+        """
+        shift = np.hypot(*(track_pos - last_pos).T)
+        reach = max(float(self.match_radius), float(np.max(shift + radius)))
+        rings = math.ceil(reach / self.match_radius)
+        cells = (2 * rings + 1) ** 2
+
+        # Uma célula consultada custa ~30 distâncias calculadas na matriz
+        if cells >= len(self.grid) or len(track_ids) <= 32 * cells:
+            dist = np.hypot(pts[:, None, 0] - track_pos[None, :, 0],
+                            pts[:, None, 1] - track_pos[None, :, 1])
+            det_idx, trk_idx = np.nonzero(dist < radius[None, :])
+            return det_idx, trk_idx, dist[det_idx, trk_idx]
+
+        column = {int(oid): j for j, oid in enumerate(track_ids)}
+        det_idx, trk_idx = [], []
+        for d, (gx, gy) in enumerate(np.floor_divide(pts, self.match_radius).astype(np.int64).tolist()):
+            for dx in range(-rings, rings + 1):
+                for dy in range(-rings, rings + 1):
+                    for oid in self.grid.get((gx + dx, gy + dy), ()):
+                        det_idx.append(d)
+                        trk_idx.append(column[oid])
+        det_idx = np.array(det_idx, dtype=np.int64)
+        trk_idx = np.array(trk_idx, dtype=np.int64)
+        order = np.lexsort((trk_idx, det_idx))
+        det_idx, trk_idx = det_idx[order], trk_idx[order]
+
+        dist = np.hypot(pts[det_idx, 0] - track_pos[trk_idx, 0], pts[det_idx, 1] - track_pos[trk_idx, 1])
+        keep = dist < radius[trk_idx]
+        return det_idx[keep], trk_idx[keep], dist[keep]
 
     # -----------------------------
     # Totais
@@ -135,3 +492,57 @@ class SimpleValidator:
         Retorna a quantidade total de carros e caminhões que ENTRARAM.
         """
         return self.cars, self.trucks
+
+    # -----------------------------
+    # Estado (checkpoint / retomada)
+    # -----------------------------
+    def get_state(self):
+        """
+        Estado completo do rastreamento e das contagens, serializável em JSON.
+        """
+        return {
+            "frame_index": self.frame_index,
+            "next_id": self.next_id,
+            "cars": self.cars,
+            "trucks": self.trucks,
+            "objects": [[oid, cx, cy, self.first_seen[oid], self.last_seen[oid],
+                         *self.velocity[oid], oid in self._moved, oid in self._counted]
+                        for oid, (cx, cy) in self.objects.items()],
+            "crossings": self.get_crossings(),
+        }
+
+    def set_state(self, state):
+        """
+        Restaura o estado salvo por get_state() (a grade é reconstruída).
+        Os contadores (counters) vêm do construtor, não do estado.
+        """
+        self.frame_index = state["frame_index"]
+        self.next_id = state["next_id"]
+        self.cars = state["cars"]
+        self.trucks = state["trucks"]
+
+        self.objects, self.first_seen, self.last_seen, self.velocity = {}, {}, {}, {}
+        self._moved, self._counted, self.grid = set(), set(), {}
+        self._reach = None
+        for oid, cx, cy, first, last, vx, vy, moved, counted in state["objects"]:
+            self.objects[oid] = (cx, cy)
+            self.first_seen[oid] = first
+            self.last_seen[oid] = last
+            self.velocity[oid] = (vx, vy)
+            self.grid.setdefault(self._cell(cx, cy), set()).add(oid)
+            if moved:
+                self._moved.add(oid)
+            if counted:
+                self._counted.add(oid)
+
+        for name, dirs in state["crossings"].items():
+            if name in self.crossings:
+                self.crossings[name] = {d: dict(types) for d, types in dirs.items()}
+        self.frame_crossings = []
+
+    def get_crossings(self):
+        """
+        Cruzamentos por contador, sentido e tipo (com counters); {} sem eles.
+        """
+        return {name: {d: dict(types) for d, types in dirs.items()}
+                for name, dirs in self.crossings.items()}
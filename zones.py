@@ -0,0 +1,191 @@
+# zones.py
+"""
+Zonas de contagem: várias ROIs nomeadas num único decode.
+
+Cada zona tem a sua ROI, o seu validator (rastreamento independente) e
+contadores próprios:
+    - CountingLine:    segmento start -> end. Conta quando o deslocamento
+                       de um objeto entre dois frames analisados cruza o
+                       segmento. directions[0] = do lado esquerdo para o
+                       direito (olhando de start para end, na imagem);
+                       directions[1] = o contrário. Numa linha horizontal
+                       desenhada da esquerda para a direita, directions[0]
+                       é "descendo".
+    - CountingPolygon: conta a entrada (directions[0]) e a saída
+                       (directions[1]) do centróide no polígono.
+
+O background subtraction roda uma vez só, sobre o retângulo que envolve
+todas as ROIs (unionROI); cada zona extrai os blobs do seu pedaço da
+máscara limpa.
+
+Coordenadas (ROIs, linhas, polígonos) são do frame processado (já
+redimensionado por "scale", como a ROI). Na configuração (JSON):
+    "zones": [
+        {"name": "norte", "roi": [0, 0, 640, 360],
+         "lines": [{"name": "faixa1", "start": [0, 200], "end": [320, 200],
+                    "directions": ["desce", "sobe"]}],
+         "polygons": [{"name": "pedagio", "points": [[400, 50], [600, 50], [600, 300], [400, 300]]}],
+         "min_area": 900}
+    ]
+Uma zona sem linhas nem polígonos usa a regra de entrada pela borda
+superior do SimpleValidator.
+"""
+import numpy as np
+
+DEFAULT_DIRECTIONS = ("in", "out")
+
+
+def _side(a, b, p):
+    """
+    Lado de p em relação à reta a -> b: > 0 direita, < 0 esquerda (y para baixo).
+    """
+    return (b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0])
+
+
+class CountingLine:
+    """
+    Linha (segmento) de contagem com dois sentidos.
+    """
+
+    def __init__(self, name, start, end, directions=DEFAULT_DIRECTIONS):
+        self.name = name
+        self.start = (float(start[0]), float(start[1]))
+        self.end = (float(end[0]), float(end[1]))
+        self.directions = tuple(directions)
+
+    def shifted(self, dx, dy):
+        """
+        Cópia deslocada (ex.: para coordenadas da ROI).
+        """
+        return CountingLine(self.name, (self.start[0] + dx, self.start[1] + dy),
+                            (self.end[0] + dx, self.end[1] + dy), self.directions)
+
+    def crossing(self, prev, cur):
+        """
+        Sentido em que o deslocamento prev -> cur cruza a linha, ou None.
+        """
+        # Troca de lado (um ponto em cima da linha conta como lado esquerdo,
+        # então encostar e voltar não conta duas vezes)
+        right0 = _side(self.start, self.end, prev) > 0
+        right1 = _side(self.start, self.end, cur) > 0
+        if right0 == right1:
+            return None
+        # ... dentro do segmento, não no prolongamento da reta
+        if _side(prev, cur, self.start) * _side(prev, cur, self.end) > 0:
+            return None
+        return self.directions[0] if right1 else self.directions[1]
+
+
+class CountingPolygon:
+    """
+    Polígono de contagem: entrada e saída do centróide.
+    """
+
+    def __init__(self, name, points, directions=DEFAULT_DIRECTIONS):
+        self.name = name
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(self.points) < 3:
+            raise ValueError(f"Polígono '{name}' precisa de pelo menos 3 pontos")
+        self.directions = tuple(directions)
+
+    def shifted(self, dx, dy):
+        return CountingPolygon(self.name, self.points + (dx, dy), self.directions)
+
+    def contains(self, p):
+        """
+        Ponto dentro do polígono (regra par-ímpar, vetorizada nas arestas).
+        """
+        x, y = p
+        xs, ys = self.points[:, 0], self.points[:, 1]
+        xn, yn = np.roll(xs, -1), np.roll(ys, -1)
+        spans = (ys > y) != (yn > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cross_x = xs + (y - ys) * (xn - xs) / (yn - ys)
+        return bool(np.count_nonzero(spans & (x < cross_x)) % 2)
+
+    def crossing(self, prev, cur):
+        """
+        directions[0] ao entrar, directions[1] ao sair, None caso contrário.
+        """
+        was_in, is_in = self.contains(prev), self.contains(cur)
+        if was_in == is_in:
+            return None
+        return self.directions[0] if is_in else self.directions[1]
+
+
+class Zone:
+    """
+    ROI nomeada com validator e contadores próprios.
+    """
+
+    def __init__(self, name, roi, counters=(), min_area=None, max_area=None,
+                 truck_area_threshold=None):
+        """
+        Parâmetros:
+            name     : nome da zona (aparece nos eventos)
+            roi      : (x, y, w, h) no frame processado
+            counters : CountingLine / CountingPolygon em coordenadas do frame
+            min_area, max_area, truck_area_threshold: limiares próprios
+                       (None = os da configuração geral)
+        """
+        self.name = name
+        self.roi = tuple(int(v) for v in roi)
+        self.counters = list(counters)
+        self.min_area = min_area
+        self.max_area = max_area
+        self.truck_area_threshold = truck_area_threshold
+        self.validator = None
+
+    def localCounters(self):
+        """
+        Contadores em coordenadas da ROI (as do validator).
+        """
+        x, y = self.roi[:2]
+        return [c.shifted(-x, -y) for c in self.counters]
+
+    def view(self, image, origin=(0, 0)):
+        """
+        Pedaço da imagem desta zona; `origin` é o canto (x, y) de `image`
+        no frame (ex.: a ROI de união).
+        """
+        x, y, w, h = self.roi
+        x, y = x - origin[0], y - origin[1]
+        return image[y:y + h, x:x + w]
+
+
+def buildZones(specs):
+    """
+    Zonas a partir da configuração (lista de dicionários, ver o módulo).
+    """
+    zones = []
+    names = set()
+    for spec in specs:
+        name = spec["name"]
+        if name in names:
+            raise ValueError(f"Zona repetida: {name}")
+        names.add(name)
+
+        counters = []
+        for line in spec.get("lines", ()):
+            counters.append(CountingLine(line["name"], line["start"], line["end"],
+                                         line.get("directions", DEFAULT_DIRECTIONS)))
+        for poly in spec.get("polygons", ()):
+            counters.append(CountingPolygon(poly["name"], poly["points"],
+                                            poly.get("directions", DEFAULT_DIRECTIONS)))
+        if len({c.name for c in counters}) != len(counters):
+            raise ValueError(f"Contadores com nome repetido na zona {name}")
+
+        zones.append(Zone(name, spec["roi"], counters, spec.get("min_area"),
+                          spec.get("max_area"), spec.get("truck_area_threshold")))
+    return zones
+
+
+def unionROI(zones):
+    """
+    Retângulo (x, y, w, h) que envolve as ROIs de todas as zonas.
+    """
+    x0 = min(z.roi[0] for z in zones)
+    y0 = min(z.roi[1] for z in zones)
+    x1 = max(z.roi[0] + z.roi[2] for z in zones)
+    y1 = max(z.roi[1] + z.roi[3] for z in zones)
+    return x0, y0, x1 - x0, y1 - y0